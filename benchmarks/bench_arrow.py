@@ -0,0 +1,19 @@
+"""Export of packets to Arrow record batches (requires pyarrow)."""
+
+from common import best, fixture_packets, report
+
+from voeventparse import arrow
+
+N_COPIES = 1000
+
+
+def main():
+    packets = fixture_packets() * N_COPIES
+    report(
+        f"record_batches, {len(packets)} packets",
+        best(lambda: list(arrow.record_batches(packets)), number=1),
+    )
+
+
+if __name__ == "__main__":
+    main()
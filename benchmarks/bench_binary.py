@@ -0,0 +1,41 @@
+"""Binary interchange format (voeventparse.binary) against XML.
+
+Compares encoded size, and the cost of reading the summary fields from
+each form.
+"""
+
+from common import best, fixture_bytes, report
+
+import voeventparse as vp
+from voeventparse import binary
+
+
+def main():
+    raw = fixture_bytes()
+    v = vp.loads(raw)
+    encoded = binary.encode(v)
+    uncompressed = binary.encode(v, compress_level=0)
+    print(
+        f"Size: XML {len(vp.dumps(v))} B, binary {len(encoded)} B "
+        f"(uncompressed body: {len(uncompressed)} B)"
+    )
+
+    def xml_summary():
+        tree = vp.loads(raw)
+        vp.get_event_time_as_utc(tree)
+        vp.get_event_position(tree)
+
+    report("dumps", best(lambda: vp.dumps(v)))
+    report("binary.encode", best(lambda: binary.encode(v)))
+    report(
+        "binary.encode (no compression)",
+        best(lambda: binary.encode(v, compress_level=0)),
+    )
+    report("loads", best(lambda: vp.loads(raw)))
+    report("binary.decode", best(lambda: binary.decode(encoded)))
+    report("loads + time and position extractors", best(xml_summary))
+    report("binary.decode_header", best(lambda: binary.decode_header(encoded)))
+
+
+if __name__ == "__main__":
+    main()
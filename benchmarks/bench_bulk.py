@@ -0,0 +1,89 @@
+"""Bulk packet authoring (voeventparse.bulk): packets per second.
+
+Compares the template path of author_packets with building and serializing
+each packet from scratch (build_packet, dumps), on a synthetic table.
+"""
+
+import datetime
+import os
+import time
+
+import numpy as np
+
+import voeventparse as vp
+from voeventparse.bulk import Column, PacketSpec, author_packets, build_packet
+
+N_ROWS = 5000
+
+
+def make_table(n_rows):
+    rng = np.random.default_rng(42)
+    start = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+    return {
+        "id": np.arange(n_rows),
+        "ra": rng.uniform(0, 360, n_rows),
+        "dec": rng.uniform(-90, 90, n_rows),
+        "err": rng.uniform(0, 0.1, n_rows),
+        "mag": rng.uniform(10, 20, n_rows),
+        "filter": rng.choice(["g", "r", "i"], n_rows),
+        "detected": [
+            start + datetime.timedelta(seconds=int(s))
+            for s in rng.integers(0, 10**7, n_rows)
+        ],
+    }
+
+
+def make_spec():
+    return PacketSpec(
+        stream="voevent.example.org/SURVEY",
+        stream_id=Column("id"),
+        role="observation",
+        author_ivorn="voevent.example.org",
+        date=Column("detected"),
+        position=vp.Position2D(
+            ra=Column("ra"),
+            dec=Column("dec"),
+            err=Column("err"),
+            units="deg",
+            system="UTC-ICRS-GEO",
+        ),
+        obs_time=Column("detected"),
+        observatory_location="GEOSURFACE",
+        params=[
+            {"name": "mag", "value": Column("mag"), "unit": "mag"},
+            {"name": "filter", "value": Column("filter")},
+        ],
+    )
+
+
+def rate(func):
+    start = time.perf_counter()
+    n = sum(1 for _ in func())
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    spec, table = make_spec(), make_table(N_ROWS)
+    columns = {name: list(np.asarray(col).tolist()) for name, col in table.items()}
+    rows = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    print(f"{N_ROWS} rows, {os.cpu_count()} CPU(s)")
+    paths = [
+        (
+            "build_packet + dumps per row",
+            lambda: (vp.dumps(build_packet(spec, r)) for r in rows),
+        ),
+        ("author_packets", lambda: author_packets(spec, table)),
+    ]
+    if (os.cpu_count() or 1) > 1:
+        paths.append(
+            (
+                f"author_packets, processes={os.cpu_count()}",
+                lambda: author_packets(spec, table, processes=os.cpu_count()),
+            )
+        )
+    for label, func in paths:
+        print(f"{label:<50} {max(rate(func) for _ in range(3)):10.0f} packets/s")
+
+
+if __name__ == "__main__":
+    main()
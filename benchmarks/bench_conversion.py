@@ -0,0 +1,20 @@
+"""to_dict / from_dict (voeventparse.conversion) against dumps / loads."""
+
+from common import best, fixture_bytes, report
+
+import voeventparse as vp
+from voeventparse.conversion import from_dict, to_dict
+
+
+def main():
+    raw = fixture_bytes()
+    v = vp.loads(raw)
+    d = to_dict(v)
+    report("dumps", best(lambda: vp.dumps(v)))
+    report("loads", best(lambda: vp.loads(raw)))
+    report("to_dict", best(lambda: to_dict(v)))
+    report("from_dict", best(lambda: from_dict(d)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""loads(..., mode="etree") against the default objectify mode.
+
+Times parsing, the convenience extractors, and dotted access to every
+Param value, for each mode.
+"""
+
+import functools
+
+from common import best, fixture_bytes, report
+
+import voeventparse as vp
+
+
+def param_values(v):
+    return [p.attrib["value"] for p in v.What.Param]
+
+
+def main():
+    raw = fixture_bytes()
+    trees = {mode: vp.loads(raw, mode=mode) for mode in ("objectify", "etree")}
+    for mode in trees:
+        report(f"{mode}: loads", best(functools.partial(vp.loads, raw, mode=mode)))
+    for func in (
+        vp.get_event_position,
+        vp.get_event_time_as_utc,
+        vp.get_toplevel_params,
+        vp.get_grouped_params,
+        param_values,
+    ):
+        for mode, v in trees.items():
+            report(f"{mode}: {func.__name__}", best(func, v, number=1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""parse_isotime_array against parsing timestamp by timestamp."""
+
+import datetime
+
+from common import best, report
+
+from voeventparse.isotime import parse_isotime, parse_isotime_array
+
+N = 10000
+
+
+def main():
+    start = datetime.datetime(2020, 1, 1)
+    naive = [
+        (start + datetime.timedelta(seconds=17 * i, microseconds=i)).isoformat()
+        for i in range(N)
+    ]
+    with_zone = [s + "+00:00" for s in naive]
+    report(
+        f"parse_isotime x {N}",
+        best(lambda: [parse_isotime(s) for s in naive], number=5),
+    )
+    report(
+        f"parse_isotime_array, {N} naive",
+        best(lambda: parse_isotime_array(naive), number=5),
+    )
+    report(
+        f"parse_isotime_array, {N} with timezone",
+        best(lambda: parse_isotime_array(with_zone), number=5),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""Pickling of packet trees, against a dumps / loads wrapper."""
+
+import pickle
+
+from common import best, fixture_bytes, report
+
+import voeventparse as vp
+
+
+def main():
+    raw = fixture_bytes()
+    v = vp.loads(raw)
+    view = vp.loads(raw, mode="etree")
+    print(f"Size: raw {len(raw)} B, pickled {len(pickle.dumps(v))} B")
+    report("pickle round trip, objectify", best(lambda: pickle.loads(pickle.dumps(v))))
+    report(
+        "pickle round trip, etree view", best(lambda: pickle.loads(pickle.dumps(view)))
+    )
+    report("dumps / loads round trip", best(lambda: vp.loads(vp.dumps(v))))
+    report("loads of the raw bytes", best(lambda: vp.loads(raw)))
+
+
+if __name__ == "__main__":
+    main()
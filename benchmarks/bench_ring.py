@@ -0,0 +1,121 @@
+"""Fan-out latency: PacketRing against a multiprocessing.Queue per consumer.
+
+A producer sends N_PACKETS copies of the Swift example packet, INTERVAL
+seconds apart, to N_CONSUMERS spawned processes. Each consumer reads the
+summary fields of every packet (from the ring header, or by parsing its
+own copy from the queue) and reports the latency since the packet was
+sent, per time.monotonic.
+"""
+
+import multiprocessing
+import statistics
+import time
+
+from common import best, fixture_bytes, report
+
+import voeventparse as vp
+from voeventparse.ring import PacketRing
+
+N_CONSUMERS = 3
+N_PACKETS = 2000
+INTERVAL = 0.0002
+
+
+def ring_consumer(name, slot, ready, results):
+    ring = PacketRing.attach(name)
+    consumer = ring.consumer(slot)
+    ready.wait()
+    latencies = []
+    while len(latencies) < N_PACKETS:
+        record = consumer.get(timeout=5)
+        if record is None:
+            break
+        record.header  # noqa: B018
+        latencies.append(time.monotonic() - record.put_time)
+    del record  # Records must be released before closing the ring.
+    results.put((latencies, consumer.lost))
+    consumer.close()
+    ring.close()
+
+
+def queue_consumer(queue, ready, results):
+    ready.wait()
+    latencies = []
+    for _ in range(N_PACKETS):
+        put_time, raw = queue.get()
+        v = vp.loads(raw)
+        vp.get_event_time_as_utc(v)
+        vp.get_event_position(v)
+        latencies.append(time.monotonic() - put_time)
+    results.put((latencies, 0))
+
+
+def summarize(label, results):
+    latencies, lost = [], 0
+    for _ in range(N_CONSUMERS):
+        consumer_latencies, consumer_lost = results.get()
+        latencies.extend(consumer_latencies)
+        lost += consumer_lost
+    latencies.sort()
+    median = statistics.median(latencies)
+    p99 = latencies[int(0.99 * (len(latencies) - 1))]
+    print(
+        f"{label:<20} median {median * 1e6:8.0f} us, p99 {p99 * 1e6:8.0f} us, "
+        f"{len(latencies)} received, {lost} lost"
+    )
+
+
+def run_ring(ctx, raw, v):
+    ring = PacketRing.create(capacity=16 * 2**20, consumers=N_CONSUMERS)
+    ready, results = ctx.Barrier(N_CONSUMERS + 1), ctx.Queue()
+    procs = [
+        ctx.Process(target=ring_consumer, args=(ring.name, i, ready, results))
+        for i in range(N_CONSUMERS)
+    ]
+    for p in procs:
+        p.start()
+    ready.wait()
+    for _ in range(N_PACKETS):
+        ring.put(raw)
+        time.sleep(INTERVAL)
+    summarize("PacketRing", results)
+    for p in procs:
+        p.join()
+    report(
+        "PacketRing.put, pre-parsed tree",
+        best(lambda: ring.put(raw, voevent=v), number=1000),
+    )
+    ring.close()
+    ring.unlink()
+
+
+def run_queues(ctx, raw):
+    queues = [ctx.Queue() for _ in range(N_CONSUMERS)]
+    ready, results = ctx.Barrier(N_CONSUMERS + 1), ctx.Queue()
+    procs = [
+        ctx.Process(target=queue_consumer, args=(q, ready, results)) for q in queues
+    ]
+    for p in procs:
+        p.start()
+    ready.wait()
+    for _ in range(N_PACKETS):
+        put_time = time.monotonic()
+        for q in queues:
+            q.put((put_time, raw))
+        time.sleep(INTERVAL)
+    summarize("Queue + loads", results)
+    for p in procs:
+        p.join()
+
+
+def main():
+    raw = fixture_bytes()
+    v = vp.loads(raw)
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{N_CONSUMERS} consumers, {N_PACKETS} packets, {INTERVAL * 1e3} ms apart")
+    run_ring(ctx, raw, v)
+    run_queues(ctx, raw)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Structural pre-check (voeventparse.validation) against schema validation."""
+
+import copy
+
+from common import best, fixture_bytes, report
+
+import voeventparse as vp
+from voeventparse.validation import TieredValidator, structural_errors
+
+
+def main():
+    v = vp.loads(fixture_bytes())
+    large = copy.deepcopy(v)
+    large.What.extend(
+        vp.param(name=f"extra_{i}", value=str(i), ucd="meta.number")
+        for i in range(2000)
+    )
+    for label, packet in (("Swift", v), ("Swift + 2000 Params", large)):
+        number = 100 if packet is v else 10
+        report(
+            f"{label}: structural_errors",
+            best(structural_errors, packet, number=number),
+        )
+        report(
+            f"{label}: valid_as_v2_0",
+            best(vp.valid_as_v2_0, packet, number=number),
+        )
+
+    for rate in (1.0, 0.1):
+        validator = TieredValidator(sample_rate=rate, seed=0)
+        report(
+            f"TieredValidator, sample_rate={rate}",
+            best(validator.validate, v, number=1000),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Shared helpers for the benchmark scripts."""
+
+import timeit
+
+import voeventparse as vp
+from voeventparse.fixtures import datapaths
+
+
+def best(func, *args, number=100, repeat=7):
+    """Best (minimum) time per call of ``func(*args)``, in seconds.
+
+    The minimum over ``repeat`` runs is the least affected by other load on
+    the machine.
+    """
+    times = timeit.repeat(lambda: func(*args), number=number, repeat=repeat)
+    return min(times) / number
+
+
+def report(label, seconds):
+    if seconds >= 1e-3:
+        print(f"{label:<50} {seconds * 1e3:10.2f} ms")
+    else:
+        print(f"{label:<50} {seconds * 1e6:10.1f} us")
+
+
+def fixture_bytes(path=datapaths.swift_bat_grb_pos_v2):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def fixture_packets():
+    """The example packets used across the benchmarks, as trees."""
+    packets = []
+    for path in (
+        datapaths.swift_bat_grb_pos_v2,
+        datapaths.moa_lensing_event_path,
+        datapaths.gaia_alert_16aac_direct,
+        datapaths.asassn_scraped_example,
+    ):
+        packets.append(vp.loads(fixture_bytes(path)))
+    return packets
@@ -10,10 +10,21 @@ except PackageNotFoundError:
     # Package is not installed
     __version__ = "unknown"
 
+import voeventparse.binary as binary
+import voeventparse.bulk as bulk
 import voeventparse.definitions as definitions
+import voeventparse.diff as diff
+import voeventparse.elements as elements
+import voeventparse.hashing as hashing
+import voeventparse.reorder as reorder
+import voeventparse.ring as ring
+import voeventparse.timescales as timescales
+from voeventparse.archive import PacketArchive, iter_directory
+from voeventparse.cache import CacheStats, PacketCache
 from voeventparse.convenience import (
     get_event_position,
     get_event_time_as_utc,
+    get_event_trajectory,
     get_grouped_params,
     get_toplevel_params,
     prettystr,
@@ -21,8 +32,18 @@ from voeventparse.convenience import (
     pull_isotime,
     pull_params,
 )
+from voeventparse.conversion import from_dict, plain_attrib, to_dict
+from voeventparse.feed import VoeventFeedParser
+from voeventparse.index import ParamIndex, param_index
+from voeventparse.isotime import (
+    format_isotime,
+    parse_isotime,
+    parse_isotime_array,
+)
+from voeventparse.limits import ParseLimitError, ParseLimits
 from voeventparse.misc import (
     Position2D,
+    Trajectory,
     citation,
     event_ivorn,
     group,
@@ -30,6 +51,22 @@ from voeventparse.misc import (
     param,
     reference,
 )
+from voeventparse.partial import PartialVoevent, loads_partial
+from voeventparse.reorder import ReorderBuffer
+from voeventparse.scheduling import PacketQueue
+from voeventparse.sniff import (
+    sniff_cite_types,
+    sniff_importance,
+    sniff_ivorn,
+    sniff_root_attributes,
+)
+from voeventparse.spool import SpoolWatcher
+from voeventparse.validation import (
+    TieredValidator,
+    structural_errors,
+    structurally_valid,
+)
+from voeventparse.view import ElementView
 from voeventparse.voevent import (
     add_citations,
     add_how,
@@ -50,25 +87,75 @@ from voeventparse.voevent import (
 __all__ = [
     # Version
     "__version__",
-    # Definitions module
+    # Submodules
+    "binary",
+    "bulk",
     "definitions",
+    "diff",
+    "elements",
+    "hashing",
+    "reorder",
+    "ring",
+    "timescales",
+    # Archive readers
+    "PacketArchive",
+    "iter_directory",
     # Convenience functions
     "get_event_position",
     "get_event_time_as_utc",
+    "get_event_trajectory",
     "get_grouped_params",
     "get_toplevel_params",
     "prettystr",
     "pull_astro_coords",
     "pull_isotime",
     "pull_params",
+    # Caching and sniffing
+    "CacheStats",
+    "PacketCache",
+    "sniff_cite_types",
+    "sniff_importance",
+    "sniff_ivorn",
+    "sniff_root_attributes",
+    # Dict conversion
+    "from_dict",
+    "plain_attrib",
+    "to_dict",
+    # Param index
+    "ParamIndex",
+    "param_index",
+    # Incremental parsing
+    "VoeventFeedParser",
+    # Timestamps
+    "format_isotime",
+    "parse_isotime",
+    "parse_isotime_array",
+    # Parse limits
+    "ParseLimitError",
+    "ParseLimits",
     # Misc classes and functions
     "Position2D",
+    "Trajectory",
     "citation",
     "event_ivorn",
     "group",
     "inference",
     "param",
     "reference",
+    # Partial loading and read-only views
+    "ElementView",
+    "PartialVoevent",
+    "loads_partial",
+    # Priority scheduling
+    "PacketQueue",
+    # Reordering
+    "ReorderBuffer",
+    # Spool directory ingest
+    "SpoolWatcher",
+    # Structural validation
+    "TieredValidator",
+    "structural_errors",
+    "structurally_valid",
     # VOEvent functions
     "add_citations",
     "add_how",
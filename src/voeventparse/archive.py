@@ -0,0 +1,149 @@
+"""Routines for reading packets from on-disk archives without copying.
+
+Two archive layouts are supported:
+
+* A single file holding many concatenated VOEvent packets, as produced by
+  appending each packet to a log file. See :class:`PacketArchive`.
+* A directory holding one packet per ``.xml`` file, as in the
+  ``voeventparse.fixtures`` directory. See :func:`iter_directory`.
+
+In both cases files are memory-mapped and lxml parses directly from slices
+of the mapping, so the raw bytes are never copied into Python objects.
+"""
+
+import mmap
+import os
+import re
+from array import array
+
+from voeventparse.voevent import loads
+
+# Matches the closing tag of a VOEvent root element, with or without a
+# namespace prefix, e.g. ``</voe:VOEvent>`` or ``</VOEvent>`` (as group 1).
+# Comments, CDATA sections and processing instructions are matched too, so
+# that the scan skips over their contents - which may contain anything.
+_root_end_tag = re.compile(
+    rb"<!--.*?-->|<!\[CDATA\[.*?\]\]>|<\?.*?\?>"
+    rb"|(</(?:[A-Za-z_][\w.\-]*:)?VOEvent\s*>)",
+    re.DOTALL,
+)
+_leading_whitespace = re.compile(rb"\s*")
+
+
+class PacketArchive:
+    """Random access to packets stored in a concatenated archive file.
+
+    On opening, the file is memory-mapped and scanned once for the end of
+    each packet's root element, building an index of byte offsets. The scan
+    is a regular-expression search over the mapping (skipping comments and
+    CDATA sections), so packets are not parsed (or even copied) until
+    requested. Thereafter, access to packet ``n`` is O(1)::
+
+        with PacketArchive('/path/to/archive.xml') as archive:
+            print(len(archive))
+            v = archive[42]
+            for v in archive:
+                ...
+
+    Args:
+        path (str): Path to the archive file.
+        check_version (bool): (Default=True) Passed on to
+            :py:func:`.loads` when packets are accessed.
+    """
+
+    def __init__(self, path, check_version=True):
+        self.path = path
+        self.check_version = check_version
+        # Held open (and mapped) until close() is called:
+        self._file = open(path, "rb")  # noqa: SIM115
+        self._mmap = None
+        # Unsigned 64-bit offsets, two per packet (start, end).
+        self._offsets = array("Q")
+        if os.fstat(self._file.fileno()).st_size:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._build_index()
+
+    def _build_index(self):
+        start = 0
+        for match in _root_end_tag.finditer(self._mmap):
+            if match.group(1) is None:
+                continue
+            start = _leading_whitespace.match(self._mmap, start).end()
+            self._offsets.append(start)
+            self._offsets.append(match.end())
+            start = match.end()
+
+    def __len__(self):
+        return len(self._offsets) // 2
+
+    def _span(self, n):
+        count = len(self)
+        if n < 0:
+            n += count
+        if not 0 <= n < count:
+            raise IndexError("packet index out of range")
+        return self._offsets[2 * n], self._offsets[2 * n + 1]
+
+    def offsets(self, n):
+        """Return the ``(start, end)`` byte offsets of packet ``n``."""
+        return self._span(n)
+
+    def raw(self, n):
+        """Return the raw bytes of packet ``n`` as a zero-copy memoryview.
+
+        The caller should release the view (or use it as a context manager)
+        before closing the archive, otherwise :meth:`close` raises
+        :py:obj:`BufferError`.
+        """
+        start, end = self._span(n)
+        return memoryview(self._mmap)[start:end]
+
+    def __getitem__(self, n):
+        with self.raw(n) as buf:
+            return loads(buf, self.check_version)
+
+    def __iter__(self):
+        for n in range(len(self)):
+            yield self[n]
+
+    def close(self):
+        """Unmap and close the underlying archive file."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def iter_directory(path, suffix=".xml", check_version=True):
+    """Iterate over the packets stored as individual files in a directory.
+
+    Files are visited in sorted filename order. Each file is memory-mapped
+    and parsed directly from the mapping; empty files are skipped.
+
+    Args:
+        path (str): Path to the directory.
+        suffix (str): Only filenames ending with this suffix are loaded.
+        check_version (bool): (Default=True) Passed on to :py:func:`.loads`.
+    Yields:
+        tuple: ``(filepath, voevent)`` pairs.
+    """
+    for filename in sorted(os.listdir(path)):
+        if not filename.endswith(suffix):
+            continue
+        filepath = os.path.join(path, filename)
+        with open(filepath, "rb") as f:
+            if not os.fstat(f.fileno()).st_size:
+                continue
+            v = _load_mapped(f, check_version)
+        yield filepath, v
+
+
+def _load_mapped(f, check_version):
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as buf:
+        return loads(buf, check_version)
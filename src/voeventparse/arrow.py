@@ -0,0 +1,379 @@
+"""Export of packet batches to Apache Arrow and Parquet, for analytics.
+
+Requires `pyarrow <https://arrow.apache.org/docs/python/>`_, which is an
+optional dependency (``pip install voevent-parse[arrow]``).
+
+Packets are converted into Arrow record batches with a fixed schema (see
+:data:`schema`): one column per header field, plus a nested ``params``
+column listing every Param in the ``What`` section along with the name of
+its enclosing Group, if any. Values are appended straight into per-column
+buffers, so no intermediate per-packet dicts are built. Event times and
+positions are buffered as text, and converted a batch at a time (see
+:py:func:`.parse_isotime_array` and :py:func:`.to_utc_datetime64`).
+"""
+
+import contextlib
+import os
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError as e:  # pragma: no cover
+    raise ImportError(
+        "voeventparse.arrow requires pyarrow, "
+        "install with e.g. 'pip install voevent-parse[arrow]'"
+    ) from e
+
+from voeventparse import timescales
+from voeventparse.convenience import find_section, first_child
+from voeventparse.isotime import parse_isotime_array
+from voeventparse.voevent import loads
+
+_param_type = pa.struct(
+    [
+        ("group", pa.string()),
+        ("name", pa.string()),
+        ("value", pa.string()),
+        ("unit", pa.string()),
+        ("ucd", pa.string()),
+        ("data_type", pa.string()),
+    ]
+)
+
+#: Schema of the record batches produced by :func:`record_batches`.
+schema = pa.schema(
+    [
+        ("ivorn", pa.string()),
+        ("role", pa.string()),
+        ("version", pa.string()),
+        ("author_ivorn", pa.string()),
+        ("who_date", pa.string()),
+        ("event_time", pa.timestamp("us", tz="UTC")),
+        ("ra", pa.float64()),
+        ("dec", pa.float64()),
+        ("err", pa.float64()),
+        ("units", pa.string()),
+        ("coord_system", pa.string()),
+        ("params", pa.list_(_param_type)),
+    ]
+)
+
+
+def _child_text(parent, tag):
+    if parent is None:
+        return None
+    child = first_child(parent, tag)
+    if child is None:
+        return None
+    return child.text
+
+
+_param_fields = ("group", "name", "value", "unit", "ucd", "data_type")
+_param_attribs = ("name", "value", "unit", "ucd", "dataType")
+# Columns appended as they are, as opposed to converted on flush:
+_direct_columns = ("ivorn", "role", "version", "author_ivorn", "who_date")
+_position_columns = ("ra", "dec", "err", "units", "coord_system")
+_NAT = np.datetime64("NaT", "us")
+
+
+def _parse_isotimes(strings):
+    """As parse_isotime_array, but giving NaT for any unparseable string."""
+    try:
+        return parse_isotime_array(strings)
+    except ValueError:
+        pass
+    result = np.full(len(strings), _NAT)
+    for i, s in enumerate(strings):
+        with contextlib.suppress(ValueError):
+            result[i] = parse_isotime_array([s])[0]
+    return result
+
+
+def _to_float64(texts):
+    return pc.cast(pc.utf8_trim_whitespace(pa.array(texts, pa.string())), pa.float64())
+
+
+class _ColumnBuffer:
+    """Accumulates packet fields column-wise, ready to build a record batch.
+
+    The ``params`` column is held as flat child columns (one per struct
+    field) plus list offsets, assembled into a list-of-struct array on
+    :meth:`flush`. Times and positions are held as text (or, for a
+    TimeOffset, microseconds in the packet's time scale) and converted for
+    the whole batch on :meth:`flush`.
+    """
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self.columns = {name: [] for name in _direct_columns + _position_columns}
+        self.isotimes = []
+        self.offset_times = []
+        self.time_scales = []
+        self.param_columns = [[] for _ in _param_fields]
+        self.param_offsets = [0]
+
+    def __len__(self):
+        return len(self.columns["ivorn"])
+
+    def _append_params(self, what):
+        group_col, *attrib_cols = self.param_columns
+        if what is not None:
+            for child in what.iterchildren("{*}Param", "{*}Group"):
+                if child.tag.endswith("Param"):
+                    group_name, params = None, (child,)
+                else:
+                    group_name, params = (
+                        child.get("name"),
+                        child.iterchildren("{*}Param"),
+                    )
+                for p in params:
+                    group_col.append(group_name)
+                    get = p.get
+                    for col, attrib in zip(attrib_cols, _param_attribs):
+                        col.append(get(attrib))
+        self.param_offsets.append(len(group_col))
+
+    def _append_time(self, ac):
+        """Buffer the time of the first ObsDataLocation, as for
+        :py:func:`.get_event_time_as_utc`."""
+        isotime = offset_time = scale = None
+        time = None if ac is None else first_child(ac, "Time")
+        instant = None if time is None else first_child(time, "TimeInstant")
+        if instant is not None:
+            scale = ac.get("coord_system_id", "").split("-")[0]
+            isotime = first_child(instant, "ISOTime")
+            if isotime is not None:
+                isotime = isotime.text
+            else:
+                offset = first_child(instant, "TimeOffset")
+                scale_origin = first_child(instant, "TimeScale")
+                with contextlib.suppress(AttributeError, TypeError, ValueError):
+                    offset_time = timescales.time_offset_to_us(
+                        float(offset.text),
+                        time.get("unit", "s"),
+                        "MJD" if scale_origin is None else scale_origin.text,
+                    )
+        self.isotimes.append(isotime)
+        self.offset_times.append(offset_time)
+        self.time_scales.append(scale)
+
+    def _append_position(self, ol, ac):
+        """Buffer the position of the first ObsDataLocation, as for
+        :py:func:`.get_event_position` (all null if incomplete)."""
+        ac_sys = None if ol is None else first_child(ol, "AstroCoordSystem")
+        pos = None if ac is None else first_child(ac, "Position2D")
+        value2 = None if pos is None else first_child(pos, "Value2")
+        row = None
+        if ac_sys is not None and value2 is not None:
+            elements = (
+                first_child(value2, "C1"),
+                first_child(value2, "C2"),
+                first_child(pos, "Error2Radius"),
+            )
+            if None not in elements:
+                row = [e.text for e in elements]
+                row += [pos.get("unit"), ac_sys.get("id")]
+        cols = self.columns
+        for i, name in enumerate(_position_columns):
+            cols[name].append(None if row is None else row[i])
+
+    def append(self, voevent):
+        cols = self.columns
+        attrib = voevent.attrib
+        cols["ivorn"].append(attrib.get("ivorn"))
+        cols["role"].append(attrib.get("role"))
+        cols["version"].append(attrib.get("version"))
+        who = find_section(voevent, "Who")
+        cols["author_ivorn"].append(_child_text(who, "AuthorIVORN"))
+        cols["who_date"].append(_child_text(who, "Date"))
+        where_when = find_section(voevent, "WhereWhen")
+        od = ol = ac = None
+        if where_when is not None:
+            od = first_child(where_when, "ObsDataLocation")
+        if od is not None:
+            ol = first_child(od, "ObservationLocation")
+        if ol is not None:
+            ac = first_child(ol, "AstroCoords")
+        self._append_time(ac)
+        self._append_position(ol, ac)
+        self._append_params(find_section(voevent, "What"))
+
+    def _event_times(self):
+        labels = _parse_isotimes(self.isotimes)
+        offsets = [us is not None for us in self.offset_times]
+        labels[offsets] = np.array(
+            [us for us in self.offset_times if us is not None], dtype=np.int64
+        ).astype("datetime64[us]")
+        nat = np.isnat(labels)
+        scales = np.array(self.time_scales, dtype=object)
+        times = np.full(len(labels), _NAT)
+        # Unrecognised time scales give null, as do unparseable times.
+        for scale in set(scales[~nat]).intersection(timescales.SCALES):
+            mask = ~nat & (scales == scale)
+            times[mask] = timescales.to_utc_datetime64(labels[mask], scale)
+        return times
+
+    def _params_array(self):
+        children = pa.StructArray.from_arrays(
+            [pa.array(col, type=pa.string()) for col in self.param_columns],
+            fields=list(_param_type),
+        )
+        return pa.ListArray.from_arrays(
+            pa.array(self.param_offsets, type=pa.int32()), children
+        )
+
+    def flush(self):
+        """Return the buffered rows as a record batch, and reset the buffer."""
+        arrays = []
+        for field in schema:
+            if field.name == "params":
+                arrays.append(self._params_array())
+            elif field.name == "event_time":
+                arrays.append(pa.array(self._event_times(), type=field.type))
+            elif field.name in ("ra", "dec", "err"):
+                arrays.append(_to_float64(self.columns[field.name]))
+            else:
+                arrays.append(pa.array(self.columns[field.name], type=field.type))
+        batch = pa.RecordBatch.from_arrays(arrays, schema=schema)
+        self._reset()
+        return batch
+
+
+def _as_voevent(packet):
+    if isinstance(packet, (bytes, bytearray, memoryview)):
+        return loads(packet)
+    return packet
+
+
+def record_batches(packets, batch_size=1024):
+    """Convert an iterable of packets into Arrow record batches.
+
+    Args:
+        packets: Iterable of :py:class:`Voevent` trees, or of raw XML bytes
+            (which are passed through :py:func:`.loads`).
+        batch_size (int): Maximum number of rows per record batch.
+    Yields:
+        pyarrow.RecordBatch: Batches conforming to :data:`schema`.
+    """
+    buf = _ColumnBuffer()
+    for packet in packets:
+        buf.append(_as_voevent(packet))
+        if len(buf) >= batch_size:
+            yield buf.flush()
+    if len(buf):
+        yield buf.flush()
+
+
+def _partition_keys(batch):
+    dates = pc.cast(batch.column("event_time"), pa.date32())
+    return pc.fill_null(pc.cast(dates, pa.string()), "unknown")
+
+
+def write_parquet(
+    packets,
+    root_path,
+    batch_size=1024,
+    basename_template=None,
+    max_open_files=64,
+    **writer_kwargs,
+):
+    """Stream packets into a Parquet dataset, partitioned by event date.
+
+    Files are laid out Hive-style, i.e.
+    ``root_path/event_date=YYYY-MM-DD/part-<uuid>-0.parquet``, so the dataset
+    can be read back with ``pyarrow.dataset.dataset(root_path,
+    partitioning='hive')``. Packets without an event time are stored under
+    ``event_date=unknown``. As with :py:func:`pyarrow.dataset.write_dataset`,
+    each call writes new files (named per ``basename_template``), so
+    repeated calls add to the dataset rather than overwrite it.
+
+    Packets are converted ``batch_size`` at a time (see
+    :py:func:`record_batches`), and the resulting rows buffered per partition,
+    each partition being written out as a row group whenever its buffer
+    reaches ``batch_size`` rows. At most ``max_open_files`` partitions are
+    held open (buffer and file) at once; beyond that, the least recently used
+    partition is flushed and its file closed - a later packet for that
+    partition starts a new file. So memory use and open
+    file handles are bounded, regardless of the number of packets or of
+    distinct dates.
+
+    Args:
+        packets: Iterable of :py:class:`Voevent` trees, or of raw XML bytes.
+        root_path (str): Directory in which to write the dataset.
+        batch_size (int): Number of packets converted at a time, and of rows
+            buffered per partition before writing.
+        basename_template (str): (Default=None) Template for file names,
+            which must contain ``{i}``, replaced by a counter per partition.
+            Defaults to ``'part-<uuid>-{i}.parquet'``, with a UUID unique to
+            this call.
+        max_open_files (int): Maximum number of partitions held open.
+        **writer_kwargs: Passed on to :py:class:`pyarrow.parquet.ParquetWriter`
+            (e.g. ``compression='zstd'``).
+    Returns:
+        dict: Mapping of partition value to number of rows written.
+    """
+    if basename_template is None:
+        basename_template = "part-" + uuid.uuid4().hex + "-{i}.parquet"
+    elif "{i}" not in basename_template:
+        raise ValueError("basename_template must contain '{i}'")
+    # Partition key -> [buffered batches, writer or None], least recently
+    # used first:
+    partitions = OrderedDict()
+    file_counts = {}
+    counts = {}
+
+    def write_partition(key, partition):
+        batches, writer = partition
+        if not batches:
+            return
+        if writer is None:
+            partition_dir = os.path.join(root_path, "event_date=" + key)
+            os.makedirs(partition_dir, exist_ok=True)
+            i = file_counts.get(key, 0)
+            file_counts[key] = i + 1
+            writer = pq.ParquetWriter(
+                os.path.join(partition_dir, basename_template.format(i=i)),
+                schema,
+                **writer_kwargs,
+            )
+            partition[1] = writer
+        writer.write_table(pa.Table.from_batches(batches, schema))
+        batches.clear()
+
+    def close_partition(key, partition):
+        try:
+            write_partition(key, partition)
+        finally:
+            if partition[1] is not None:
+                partition[1].close()
+
+    try:
+        for batch in record_batches(packets, batch_size):
+            keys = _partition_keys(batch)
+            for key in pc.unique(keys).to_pylist():
+                rows = batch.filter(pc.equal(keys, key))
+                partition = partitions.get(key)
+                if partition is None:
+                    if len(partitions) >= max_open_files:
+                        close_partition(*partitions.popitem(last=False))
+                    partition = partitions[key] = [[], None]
+                else:
+                    partitions.move_to_end(key)
+                partition[0].append(rows)
+                counts[key] = counts.get(key, 0) + rows.num_rows
+                if sum(b.num_rows for b in partition[0]) >= batch_size:
+                    write_partition(key, partition)
+        while partitions:
+            close_partition(*partitions.popitem(last=False))
+    finally:
+        for _, writer in partitions.values():
+            if writer is not None:
+                writer.close()
+    return counts
@@ -0,0 +1,243 @@
+"""A compact binary interchange format for VOEvent packets.
+
+Each encoded packet consists of a small fixed-size preamble, a header
+holding pre-extracted summary fields, and the body - the packet as
+serialised by :py:func:`.dumps`, optionally zlib-compressed::
+
+    preamble:  magic (4s) | format version (B) | flags (B) |
+               header length (I) | body length (I)
+    header:    ivorn | role | event time | position
+    body:      dumps(voevent)
+
+All integers are little-endian. Strings are UTF-8, prefixed by their length
+as an unsigned short. The event time is stored as integer microseconds since
+the Unix epoch (UTC), the position as three doubles plus units and
+coordinate-system strings.
+
+Consumers only interested in the summary fields can call
+:func:`decode_header`, which never touches the body. :func:`decode` restores
+a full :py:class:`Voevent`, equal (as serialised by :py:func:`.dumps`) to the
+one originally encoded.
+"""
+
+import datetime
+import struct
+import zlib
+from collections import namedtuple
+
+import pytz
+
+from voeventparse.convenience import get_event_position, get_event_time_as_utc
+from voeventparse.misc import Position2D
+from voeventparse.voevent import dumps, loads
+
+MAGIC = b"VOEB"
+FORMAT_VERSION = 1
+
+_preamble = struct.Struct("<4sBBII")
+_str_len = struct.Struct("<H")
+_time = struct.Struct("<q")
+_position = struct.Struct("<ddd")
+
+_FLAG_COMPRESSED = 1
+_FLAG_HAS_TIME = 2
+_FLAG_HAS_POSITION = 4
+
+_epoch = datetime.datetime(1970, 1, 1, tzinfo=pytz.UTC)
+
+
+class PacketHeader(namedtuple("PacketHeader", "ivorn role time position")):
+    """Summary fields stored in the header of an encoded packet.
+
+    Args:
+        ivorn (str): IVORN of the packet.
+        role (str): Role of the packet, cf :class:`.definitions.Roles`.
+        time (datetime.datetime): Event time as returned by
+            :py:func:`.get_event_time_as_utc`, or ``None``.
+        position (:py:class:`.Position2D`): Event position as returned by
+            :py:func:`.get_event_position`, or ``None``.
+    """
+
+    pass  # Just wrapping a namedtuple so we can assign a docstring.
+
+
+def _pack_str(s):
+    b = s.encode("utf-8")
+    if len(b) > 0xFFFF:
+        raise ValueError(
+            f"Header string too long to encode ({len(b)} bytes, max 65535): "
+            f"{s[:40]!r}..."
+        )
+    return _str_len.pack(len(b)) + b
+
+
+def _unpack_str(buf, offset):
+    (length,) = _str_len.unpack_from(buf, offset)
+    offset += _str_len.size
+    return str(buf[offset : offset + length], "utf-8"), offset + length
+
+
+def extract_header(voevent):
+    """Extract the summary fields stored in the header of an encoded packet.
+
+    Args:
+        voevent (:class:`Voevent`): Root node of the VOevent etree (or any
+            tree the convenience routines accept).
+    Returns:
+        :class:`PacketHeader`: The fields.
+    """
+    try:
+        time = get_event_time_as_utc(voevent)
+    except (NotImplementedError, ValueError):
+        time = None
+    try:
+        position = get_event_position(voevent)
+    except (AttributeError, IndexError):
+        position = None
+    return PacketHeader(
+        ivorn=voevent.attrib.get("ivorn", ""),
+        role=voevent.attrib.get("role", ""),
+        time=time,
+        position=position,
+    )
+
+
+def pack_header(header):
+    """Returns the flags and bytes representing a :class:`PacketHeader`.
+
+    Args:
+        header (:class:`PacketHeader`): The summary fields.
+    Returns:
+        tuple: The preamble flags (int) and the encoded header (bytes).
+    Raises:
+        ValueError: If a string is too long to encode.
+    """
+    flags = 0
+    parts = [_pack_str(header.ivorn), _pack_str(header.role)]
+    if header.time is not None:
+        flags |= _FLAG_HAS_TIME
+        delta = header.time - _epoch
+        micros = (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+        parts.append(_time.pack(micros))
+    if header.position is not None:
+        flags |= _FLAG_HAS_POSITION
+        pos = header.position
+        parts.append(_position.pack(pos.ra, pos.dec, pos.err))
+        parts.append(_pack_str(pos.units))
+        parts.append(_pack_str(pos.system))
+    return flags, b"".join(parts)
+
+
+def encode(voevent, compress_level=6):
+    """Encode a voevent in the binary interchange format.
+
+    Args:
+        voevent (:class:`Voevent`): Root node of the VOevent etree.
+        compress_level (int): zlib compression level applied to the body,
+            from 1 (fastest) to 9 (smallest). Pass 0 to store the body
+            uncompressed.
+    Returns:
+        bytes: The encoded packet.
+    Raises:
+        ValueError: If a header string (e.g. the IVORN) is longer than 65535
+            bytes, once UTF-8 encoded. The body has no such limit.
+    """
+    flags, header_bytes = pack_header(extract_header(voevent))
+
+    body = dumps(voevent)
+    if compress_level:
+        flags |= _FLAG_COMPRESSED
+        body = zlib.compress(body, compress_level)
+
+    preamble = pack_preamble(flags, len(header_bytes), len(body))
+    return b"".join((preamble, header_bytes, body))
+
+
+def pack_preamble(flags, header_length, body_length):
+    """Returns the preamble of an encoded packet.
+
+    Args:
+        flags (int): As returned by :func:`pack_header` - plus the
+            compression flag, for a compressed body.
+        header_length (int): Length of the encoded header, in bytes.
+        body_length (int): Length of the body (as stored), in bytes.
+    Returns:
+        bytes: The preamble.
+    """
+    return _preamble.pack(MAGIC, FORMAT_VERSION, flags, header_length, body_length)
+
+
+def _read_preamble(data):
+    magic, version, flags, header_len, body_len = _preamble.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not an encoded VOEvent packet (bad magic bytes)")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported binary format version: {version}")
+    return flags, header_len, body_len
+
+
+def decode_header(data):
+    """Read the summary fields of an encoded packet, without decoding the body.
+
+    Args:
+        data (bytes): An encoded packet (any buffer, e.g. a memoryview, will do).
+    Returns:
+        :class:`PacketHeader`: The pre-extracted summary fields.
+    """
+    flags, _, _ = _read_preamble(data)
+    offset = _preamble.size
+    ivorn, offset = _unpack_str(data, offset)
+    role, offset = _unpack_str(data, offset)
+    time = None
+    if flags & _FLAG_HAS_TIME:
+        (micros,) = _time.unpack_from(data, offset)
+        offset += _time.size
+        time = _epoch + datetime.timedelta(microseconds=micros)
+    position = None
+    if flags & _FLAG_HAS_POSITION:
+        ra, dec, err = _position.unpack_from(data, offset)
+        offset += _position.size
+        units, offset = _unpack_str(data, offset)
+        system, offset = _unpack_str(data, offset)
+        position = Position2D(ra=ra, dec=dec, err=err, units=units, system=system)
+    return PacketHeader(ivorn=ivorn, role=role, time=time, position=position)
+
+
+def stored_body(data):
+    """Returns the flags and the body of an encoded packet, as stored.
+
+    Args:
+        data (bytes): An encoded packet (or any buffer).
+    Returns:
+        tuple: The preamble flags (int), and the body (a slice of ``data``,
+        compressed if so flagged).
+    """
+    flags, header_len, body_len = _read_preamble(data)
+    start = _preamble.size + header_len
+    return flags, data[start : start + body_len]
+
+
+def decode_body(data):
+    """Return the XML body of an encoded packet, as produced by :py:func:`.dumps`.
+
+    Args:
+        data (bytes): An encoded packet.
+    Returns:
+        bytes: Raw XML of the packet.
+    """
+    flags, body = stored_body(data)
+    if flags & _FLAG_COMPRESSED:
+        return zlib.decompress(body)
+    return bytes(body)
+
+
+def decode(data, check_version=True):
+    """Decode an encoded packet back into a :py:class:`Voevent`.
+
+    Args:
+        data (bytes): An encoded packet.
+        check_version (bool): (Default=True) Passed on to :py:func:`.loads`.
+    Returns:
+        :py:class:`Voevent`: Root-node of the etree.
+    """
+    return loads(decode_body(data), check_version)
@@ -0,0 +1,461 @@
+"""Bulk authoring of packets from tabular data, e.g. one packet per table row.
+
+Describe how columns of the table map onto packet fields with a
+:class:`PacketSpec`, marking values taken from the table with
+:class:`Column`. Anything else is a constant, shared by every packet::
+
+    spec = PacketSpec(
+        stream="voevent.example.org/SURVEY",
+        stream_id=Column("id"),
+        role="observation",
+        author_ivorn="voevent.example.org",
+        date=Column("detected"),
+        position=vp.Position2D(
+            ra=Column("ra"), dec=Column("dec"), err=Column("err"),
+            units="deg", system="UTC-ICRS-GEO",
+        ),
+        obs_time=Column("detected"),
+        observatory_location="GEOSURFACE",
+        params=[
+            {"name": "mag", "value": Column("mag"), "unit": "mag"},
+        ],
+    )
+    for packet_bytes in author_packets(spec, dataframe, processes=4):
+        ...
+
+Each packet is identical to the output of the equivalent calls to
+:py:func:`.voevent`, :py:func:`.set_who`, :py:func:`.add_where_when`,
+:py:func:`.param` etc, followed by :py:func:`.dumps` (see
+:func:`build_packet`). However, rather than build each packet from scratch,
+:func:`author_packets` builds a template packet once, then for each row
+updates only the values taken from the table before serializing. Rows which
+would change the structure of the packet (e.g. a missing value, which means
+an attribute is omitted) fall back to building the packet from scratch.
+"""
+
+import multiprocessing
+from collections import namedtuple
+
+from lxml import etree
+
+from voeventparse.conversion import set_text
+from voeventparse.isotime import format_isotime
+from voeventparse.misc import Position2D, group, param, param_attributes
+from voeventparse.voevent import (
+    add_where_when,
+    add_why,
+    dumps,
+    loads,
+    reinsert_root_tag_prefix,
+    set_who,
+    utc_naive_obs_time,
+    voevent,
+)
+
+_param_keys = ("name", "value", "unit", "ucd", "data_type", "utype", "ac")
+
+
+class Column(namedtuple("Column", "name")):
+    """Marks a :class:`PacketSpec` value as taken from the named table column.
+
+    Args:
+        name (str): Column name.
+    """
+
+    pass  # Just wrapping a namedtuple so we can assign a docstring.
+
+
+class PacketSpec:
+    """Describes how to build a packet from a row of a table.
+
+    Each argument may be a constant, or a :class:`Column`.
+
+    Args:
+        stream (str): See :py:func:`.voevent`.
+        stream_id: See :py:func:`.voevent`.
+        role (str): See :py:func:`.voevent`.
+        author_ivorn (str): See :py:func:`.set_who`.
+        date (datetime.datetime): See :py:func:`.set_who`.
+        position (:py:class:`.Position2D`): The sky position, for the
+            WhereWhen section - the individual fields may be Columns.
+            See :py:func:`.add_where_when`.
+        obs_time (datetime.datetime): See :py:func:`.add_where_when`.
+        observatory_location (str): See :py:func:`.add_where_when`.
+        allow_tz_naive_datetime (bool): See :py:func:`.add_where_when`.
+            (Must be a constant.)
+        params: Sequence of dicts of keyword arguments for
+            :py:func:`.param`, one per Param to add to the What section.
+        groups: Sequence of dicts of keyword arguments for
+            :py:func:`.group`, with ``params`` given as for ``params`` above.
+        importance (float): See :py:func:`.add_why`.
+        expires (datetime.datetime): See :py:func:`.add_why`.
+    """
+
+    def __init__(
+        self,
+        stream,
+        stream_id,
+        role,
+        author_ivorn=None,
+        date=None,
+        position=None,
+        obs_time=None,
+        observatory_location=None,
+        allow_tz_naive_datetime=False,
+        params=(),
+        groups=(),
+        importance=None,
+        expires=None,
+    ):
+        self.stream = stream
+        self.stream_id = stream_id
+        self.role = role
+        self.author_ivorn = author_ivorn
+        self.date = date
+        self.position = position
+        self.obs_time = obs_time
+        self.observatory_location = observatory_location
+        self.allow_tz_naive_datetime = allow_tz_naive_datetime
+        self.params = [dict(p) for p in params]
+        self.groups = [dict(g, params=[dict(p) for p in g["params"]]) for g in groups]
+        self.importance = importance
+        self.expires = expires
+
+    def column_names(self):
+        """Return the names of all columns referenced by this spec."""
+        values = [
+            self.stream,
+            self.stream_id,
+            self.role,
+            self.author_ivorn,
+            self.date,
+            self.obs_time,
+            self.observatory_location,
+            self.importance,
+            self.expires,
+        ]
+        if self.position is not None:
+            values.extend(self.position)
+        for p in self.params:
+            values.extend(p.values())
+        for g in self.groups:
+            values.extend(v for k, v in g.items() if k != "params")
+            for p in g["params"]:
+                values.extend(p.values())
+        names = []
+        for value in values:
+            if isinstance(value, Column) and value.name not in names:
+                names.append(value.name)
+        return names
+
+
+def _resolve(value, row):
+    if isinstance(value, Column):
+        return row[value.name]
+    return value
+
+
+def _param_kwargs(spec_param, row):
+    return {key: _resolve(value, row) for key, value in spec_param.items()}
+
+
+def build_packet(spec, row):
+    """Build a single packet, the straightforward way.
+
+    Args:
+        spec (:class:`PacketSpec`): The packet spec.
+        row: Mapping of column name to value.
+    Returns:
+        :py:class:`Voevent`: Root-node of the packet etree.
+    """
+    v = voevent(
+        stream=_resolve(spec.stream, row),
+        stream_id=_resolve(spec.stream_id, row),
+        role=_resolve(spec.role, row),
+    )
+    set_who(
+        v,
+        date=_resolve(spec.date, row),
+        author_ivorn=_resolve(spec.author_ivorn, row),
+    )
+    if spec.position is not None:
+        add_where_when(
+            v,
+            coords=Position2D(*[_resolve(f, row) for f in spec.position]),
+            obs_time=_resolve(spec.obs_time, row),
+            observatory_location=_resolve(spec.observatory_location, row),
+            allow_tz_naive_datetime=spec.allow_tz_naive_datetime,
+        )
+    for p in spec.params:
+        v.What.append(param(**_param_kwargs(p, row)))
+    for g in spec.groups:
+        v.What.append(
+            group(
+                [param(**_param_kwargs(p, row)) for p in g["params"]],
+                name=_resolve(g.get("name"), row),
+                type=_resolve(g.get("type"), row),
+            )
+        )
+    importance = _resolve(spec.importance, row)
+    expires = _resolve(spec.expires, row)
+    if importance is not None or expires is not None:
+        add_why(v, importance=importance, expires=expires)
+    return v
+
+
+def _objectify_text(value):
+    # As set by objectify, when assigning a value to a child element.
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _ivorn(spec, row):
+    stream_id = _resolve(spec.stream_id, row)
+    if not isinstance(stream_id, str):
+        stream_id = repr(stream_id)
+    return "".join(("ivo://", _resolve(spec.stream, row), "#", stream_id))
+
+
+def _group_attribute(value):
+    # NB group() omits empty values:
+    return lambda row: _resolve(value, row) or None
+
+
+def _optional(func, value):
+    return None if value is None else func(value)
+
+
+class _Template:
+    """A packet built from one row, updated in-place for subsequent rows.
+
+    Each 'slot' is a field of the packet which depends on the table values:
+    a text or attribute value, or (for Params) the full set of attributes.
+    """
+
+    def __init__(self, spec, row):
+        self.spec = spec
+        # Round-trip, so the tree is as it would be for output by dumps:
+        self.root = loads(dumps(build_packet(spec, row)), check_version=False)
+        reinsert_root_tag_prefix(self.root)
+        self.slots = []
+        self._add_slots()
+        self.current = [func(row) for _, _, func in self.slots]
+
+    def _add(self, columns, element, attribute, func):
+        """Register a slot, if it depends on any columns."""
+        if any(isinstance(c, Column) for c in columns):
+            self.slots.append((element, attribute, func))
+
+    def _add_slots(self):
+        spec = self.spec
+        root = self.root
+        self._add(
+            (spec.stream, spec.stream_id), root, "ivorn", lambda row: _ivorn(spec, row)
+        )
+        self._add((spec.role,), root, "role", lambda row: _resolve(spec.role, row))
+        self._add(
+            (spec.author_ivorn,),
+            root.find("Who/AuthorIVORN"),
+            None,
+            lambda row: _optional(
+                lambda a: "ivo://" + a, _resolve(spec.author_ivorn, row)
+            ),
+        )
+        self._add(
+            (spec.date,),
+            root.find("Who/Date"),
+            None,
+            lambda row: _optional(
+                lambda d: format_isotime(d, utc=False, microseconds=False),
+                _resolve(spec.date, row),
+            ),
+        )
+        if spec.position is not None:
+            self._add_where_when_slots()
+        what = root.find("What")
+        params = list(what.iterchildren("Param"))
+        for element, p in zip(params, spec.params):
+            self._add_param_slot(element, p)
+        for group_element, g in zip(what.iterchildren("Group"), spec.groups):
+            for attribute in ("name", "type"):
+                value = g.get(attribute)
+                self._add((value,), group_element, attribute, _group_attribute(value))
+            for element, p in zip(group_element.iterchildren("Param"), g["params"]):
+                self._add_param_slot(element, p)
+        why = root.find("Why")
+        self._add(
+            (spec.importance,),
+            why,
+            "importance",
+            lambda row: _optional(str, _resolve(spec.importance, row)),
+        )
+        self._add(
+            (spec.expires,),
+            why,
+            "expires",
+            lambda row: _optional(
+                lambda d: format_isotime(d, utc=False, microseconds=False),
+                _resolve(spec.expires, row),
+            ),
+        )
+
+    def _add_where_when_slots(self):
+        spec = self.spec
+        od = self.root.find("WhereWhen/ObsDataLocation")
+        ol = od.find("ObservationLocation")
+        ac = ol.find("AstroCoords")
+        pos = ac.find("Position2D")
+        position = spec.position
+
+        def text_of(value):
+            # NB a missing value gives a nil element, so a different structure.
+            return lambda row: _optional(_objectify_text, _resolve(value, row))
+
+        self._add(
+            (spec.observatory_location,),
+            od.find("ObservatoryLocation"),
+            "id",
+            text_of(spec.observatory_location),
+        )
+        self._add(
+            (position.system,),
+            ol.find("AstroCoordSystem"),
+            "id",
+            text_of(position.system),
+        )
+        self._add((position.system,), ac, "coord_system_id", text_of(position.system))
+        self._add(
+            (spec.obs_time,),
+            ac.find("Time/TimeInstant/ISOTime"),
+            None,
+            lambda row: format_isotime(
+                utc_naive_obs_time(
+                    _resolve(spec.obs_time, row), spec.allow_tz_naive_datetime
+                )
+            ),
+        )
+        self._add((position.units,), pos, "unit", text_of(position.units))
+        self._add((position.ra,), pos.find("Value2/C1"), None, text_of(position.ra))
+        self._add((position.dec,), pos.find("Value2/C2"), None, text_of(position.dec))
+        self._add(
+            (position.err,), pos.find("Error2Radius"), None, text_of(position.err)
+        )
+
+    def _add_param_slot(self, element, spec_param):
+        def attributes(row):
+            kwargs = dict.fromkeys(_param_keys)
+            kwargs["ac"] = True
+            kwargs.update(_param_kwargs(spec_param, row))
+            return param_attributes(**kwargs)
+
+        # The attribute order depends on which are present, so a Param slot
+        # covers all of its attributes:
+        self._add(spec_param.values(), element, dict, attributes)
+
+    def update(self, row):
+        """Update the template for the given row.
+
+        Returns:
+            bool: True if successful, False if the row needs a packet of
+            different structure (which must be built from scratch).
+        """
+        values = [func(row) for _, _, func in self.slots]
+        for (_, attribute, _), value, current in zip(self.slots, values, self.current):
+            if attribute is dict:
+                if list(value) != list(current):
+                    return False
+            elif (value is None) != (current is None):
+                return False
+        for (element, attribute, _), value in zip(self.slots, values):
+            if value is None:
+                continue
+            if attribute is None:
+                set_text(element, value)
+            elif attribute is dict:
+                for key, att_value in value.items():
+                    element.set(key, att_value)
+            else:
+                element.set(attribute, value)
+        self.current = values
+        return True
+
+    def tostring(self, pretty_print=False):
+        return etree.tostring(
+            self.root,
+            pretty_print=pretty_print,
+            xml_declaration=True,
+            encoding="UTF-8",
+        )
+
+
+def _rows(columns):
+    names = list(columns)
+    for values in zip(*[columns[name] for name in names]):
+        yield dict(zip(names, values))
+
+
+def _author_chunk(args):
+    spec, columns, pretty_print = args
+    packets = []
+    template = None
+    for row in _rows(columns):
+        if template is None:
+            template = _Template(spec, row)
+        elif template.update(row):
+            pass
+        else:
+            packets.append(dumps(build_packet(spec, row), pretty_print=pretty_print))
+            continue
+        packets.append(template.tostring(pretty_print))
+    return packets
+
+
+def _as_list(column):
+    # NB tolist() converts NumPy scalars to the equivalent Python types.
+    if hasattr(column, "tolist"):
+        return column.tolist()
+    return list(column)
+
+
+def author_packets(spec, table, processes=1, chunk_size=1000, pretty_print=False):
+    """Generate packets from the rows of a table.
+
+    Args:
+        spec (:class:`PacketSpec`): Describes how to build each packet.
+        table: Columnar data, e.g. a :py:class:`pandas.DataFrame`, a NumPy
+            structured array, or a dict of lists - anything which returns a
+            column when indexed by column name.
+        processes (int): (Default 1) Number of worker processes. If greater
+            than one, rows are distributed across a
+            :py:class:`multiprocessing.Pool` in chunks. ``None`` uses as many
+            processes as there are CPUs.
+        chunk_size (int): Number of rows per chunk.
+        pretty_print (bool): See :py:func:`.dumps`.
+    Yields:
+        bytes: One packet per row, in order, as returned by
+        :py:func:`.dumps`.
+    """
+    names = spec.column_names()
+    if not names:
+        raise ValueError("PacketSpec does not reference any table columns")
+    columns = {name: _as_list(table[name]) for name in names}
+    n_rows = len(columns[names[0]])
+    chunks = (
+        (
+            spec,
+            {
+                name: column[start : start + chunk_size]
+                for name, column in columns.items()
+            },
+            pretty_print,
+        )
+        for start in range(0, n_rows, chunk_size)
+    )
+    if processes == 1:
+        for args in chunks:
+            yield from _author_chunk(args)
+        return
+    with multiprocessing.Pool(processes) as pool:
+        for packets in pool.imap(_author_chunk, chunks):
+            yield from packets
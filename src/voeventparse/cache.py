@@ -0,0 +1,156 @@
+"""A size-bounded LRU cache of parsed packets, placed in front of loads."""
+
+import copy
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+from voeventparse.sniff import sniff_ivorn
+from voeventparse.voevent import assert_supported_version, loads
+
+
+class CacheStats(
+    namedtuple("CacheStats", "hits misses evictions entries size_bytes max_bytes")
+):
+    """A namedtuple of :class:`PacketCache` counters.
+
+    Args:
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups which required a parse.
+        evictions (int): Number of entries evicted to respect ``max_bytes``.
+        entries (int): Current number of cached packets.
+        size_bytes (int): Current estimated size of the cache contents.
+        max_bytes (int): Size bound of the cache.
+    """
+
+    pass  # Just wrapping a namedtuple so we can assign a docstring.
+
+
+class PacketCache:
+    """Thread-safe LRU cache of parsed packets.
+
+    Use in place of :py:func:`.loads` where the same packets are parsed
+    repeatedly::
+
+        cache = PacketCache(max_bytes=64 * 2**20)
+        v = cache.loads(raw_bytes)
+
+    Entries are keyed either by a digest of the raw bytes (the default), or
+    by the packet IVORN, which is extracted from the raw bytes without
+    parsing (see :py:func:`.sniff_ivorn`). Keying by IVORN is cheaper, but
+    assumes that distinct packets never share an IVORN - as they should not,
+    per the VOEvent spec.
+
+    The size of each entry is estimated as the length of the raw bytes it was
+    parsed from; least recently used entries are evicted once the total
+    exceeds ``max_bytes``. Note that a parsed tree generally occupies several
+    times the size of its source, so ``max_bytes`` should be chosen
+    accordingly.
+
+    By default each lookup returns a private deep copy of the cached tree,
+    which the caller is free to modify. With ``shared=True`` the cached tree
+    itself is returned, saving the copy - callers must then treat it as
+    read-only, since changes would be seen by all subsequent lookups.
+
+    Args:
+        max_bytes (int): Bound on the total estimated size of cached packets.
+        key (str): ``'digest'`` or ``'ivorn'``, see above.
+        shared (bool): (Default=False) Return cached trees without copying.
+    """
+
+    def __init__(self, max_bytes=64 * 2**20, key="digest", shared=False):
+        if key not in ("digest", "ivorn"):
+            raise ValueError("key must be one of 'digest', 'ivorn'")
+        self.max_bytes = max_bytes
+        self.key = key
+        self.shared = shared
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _key(self, s):
+        if self.key == "ivorn":
+            ivorn = sniff_ivorn(s)
+            if ivorn is not None:
+                return ivorn
+        return hashlib.sha1(s).digest()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def _put(self, key, v, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            self._entries[key] = (v, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self._evictions += 1
+
+    def loads(self, s, check_version=True):
+        """Load VOEvent from bytes, via the cache.
+
+        Args:
+            s (bytes): Bytes containing raw XML.
+            check_version (bool): Passed on to :py:func:`.loads`.
+        Returns:
+            :py:class:`Voevent`: Root-node of the etree.
+        """
+        key = self._key(s)
+        v = self._get(key)
+        if v is None:
+            v = loads(s, check_version)
+            self._put(key, v, len(s))
+        elif check_version:
+            assert_supported_version(v)
+        if not self.shared:
+            v = copy.deepcopy(v)
+        return v
+
+    def load(self, file, check_version=True):
+        """Load VOEvent from file object, via the cache.
+
+        See :py:func:`.load`.
+        """
+        return self.loads(file.read(), check_version)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self):
+        """Empty the cache. The hit / miss / eviction counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        """Return the current counters.
+
+        Returns:
+            :class:`CacheStats`: Snapshot of the cache counters.
+        """
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._entries),
+                size_bytes=self._size,
+                max_bytes=self.max_bytes,
+            )
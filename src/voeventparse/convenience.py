@@ -3,13 +3,83 @@
 from collections import OrderedDict
 from copy import deepcopy
 
-import astropy.time
-import iso8601
 import lxml
-import pytz
+import numpy as np
 from orderedmultidict import omdict
 
-from voeventparse.misc import Position2D
+from voeventparse import timescales
+from voeventparse.conversion import plain_attrib
+from voeventparse.isotime import parse_isotime
+from voeventparse.misc import Position2D, Trajectory
+from voeventparse.partial import PartialVoevent
+from voeventparse.view import ElementView
+
+# NB the routines below use only the lxml.etree element API (iterchildren,
+# get, ...), so work equally on objectify and plain etree trees - see
+# find_section. Children are matched by local name, i.e. in any namespace,
+# so that e.g. packets with the VOEvent namespace as the default namespace
+# (left on the root tag, and so applying to every element) are handled.
+
+
+def find_section(voevent, name):
+    """Return the named top-level section as an lxml element, or None.
+
+    Args:
+        voevent: Root node of the packet - an objectify tree, an
+            :py:class:`.ElementView` (as returned by
+            ``loads(..., mode='etree')``) or a :py:class:`.PartialVoevent`.
+        name (str): The section name, e.g. ``'What'``.
+    Returns:
+        The section element (never a view), or ``None`` if absent.
+    """
+    if isinstance(voevent, ElementView):
+        voevent = voevent.element
+    elif isinstance(voevent, PartialVoevent):
+        voevent.load_section(name)
+        voevent = voevent.voevent
+    return first_child(voevent, name)
+
+
+def first_child(element, name):
+    """Return the first child of the given local name, in any namespace.
+
+    Args:
+        element: An lxml element.
+        name (str): The child's local name.
+    Returns:
+        The child element, or ``None`` if there is none.
+    """
+    # Faster than element.find(tag), which goes via ElementPath.
+    return next(element.iterchildren("{*}" + name), None)
+
+
+def _first_text(element, name, default=None):
+    child = first_child(element, name)
+    if child is None:
+        return default
+    return child.text or ""
+
+
+def _child(element, name):
+    """As for objectify attribute access: raise AttributeError if missing."""
+    child = first_child(element, name)
+    if child is None:
+        raise AttributeError(f"no such child: {name}")
+    return child
+
+
+def _section(voevent, name):
+    section = find_section(voevent, name)
+    if section is None:
+        raise AttributeError(f"no such child: {name}")
+    return section
+
+
+def _obs_data_location(voevent, index):
+    ods = list(_section(voevent, "WhereWhen").iterchildren("{*}ObsDataLocation"))
+    if not ods:
+        raise AttributeError("no such child: ObsDataLocation")
+    return ods[index]
 
 
 def get_event_time_as_utc(voevent, index=0):
@@ -27,13 +97,14 @@ def get_event_time_as_utc(voevent, index=0):
     moving over time. Most packets will have only one, however, so the
     default is to access the first.
 
-    This function now implements conversion from the
-    TDB (Barycentric Dynamical Time) time scale in ISOTime format,
-    since this is the format used by GAIA VOEvents.
-    (See also http://docs.astropy.org/en/stable/time/#time-scale )
-
-    Other timescales (i.e. TT, GPS) will presumably be formatted as a
-    TimeOffset, parsing this format is not yet implemented.
+    Times in any of the VOEvent time scales (UTC, TDB, TT, GPS - as
+    given by the ``coord_system_id``) are converted to UTC, see
+    :py:mod:`voeventparse.timescales`. The time may be given either as an
+    ISOTime, or as a TimeOffset. In the latter case, the offset is in the
+    units given by the ``unit`` attribute of the ``Time`` element (default
+    seconds), from the origin named by the TimeScale element: ``JD``,
+    ``MJD`` (the default, if no TimeScale is given), or an ISO-8601
+    timestamp.
 
     Args:
         voevent (:class:`voeventparse.voevent.Voevent`): Root node of the VOevent
@@ -46,28 +117,31 @@ def get_event_time_as_utc(voevent, index=0):
 
     """
     try:
-        od = voevent.WhereWhen.ObsDataLocation[index]
-        ol = od.ObservationLocation
-        coord_sys = ol.AstroCoords.attrib["coord_system_id"]
+        od = _obs_data_location(voevent, index)
+        ac = _child(_child(od, "ObservationLocation"), "AstroCoords")
+        coord_sys = ac.attrib["coord_system_id"]
         timesys_identifier = coord_sys.split("-")[0]
-
-        if timesys_identifier == "UTC":
-            isotime_str = str(ol.AstroCoords.Time.TimeInstant.ISOTime)
-            return iso8601.parse_date(isotime_str)
-        elif timesys_identifier == "TDB":
-            isotime_str = str(ol.AstroCoords.Time.TimeInstant.ISOTime)
-            isotime_dtime = iso8601.parse_date(isotime_str)
-            tdb_time = astropy.time.Time(isotime_dtime, scale="tdb")
-            return tdb_time.utc.to_datetime().replace(tzinfo=pytz.UTC)
-        elif timesys_identifier == "TT" or timesys_identifier == "GPS":
-            raise NotImplementedError(
-                "Conversion from time-system '{}' to UTC not yet implemented"
-            )
-        else:
+        if timesys_identifier not in timescales.SCALES:
             raise ValueError(
                 f"Unrecognised time-system: {timesys_identifier} (badly formatted VOEvent?)"
             )
 
+        time = _child(ac, "Time")
+        instant = _child(time, "TimeInstant")
+        isotime = first_child(instant, "ISOTime")
+        if isotime is not None:
+            isotime_dtime = parse_isotime(isotime.text)
+            if timesys_identifier == "UTC":
+                return isotime_dtime
+            return timescales.to_utc(isotime_dtime, timesys_identifier)
+        origin = _first_text(instant, "TimeScale", default="MJD")
+        return timescales.time_offset_to_utc(
+            float(_child(instant, "TimeOffset").text),
+            timesys_identifier,
+            unit=time.attrib.get("unit", "s"),
+            origin=origin,
+        )
+
     except AttributeError:
         return None
 
@@ -89,29 +163,131 @@ def get_event_position(voevent, index=0):
         Position (:py:class:`.Position2D`): The sky position defined in the
         ObsDataLocation.
     """
-    od = voevent.WhereWhen.ObsDataLocation[index]
-    ac = od.ObservationLocation.AstroCoords
-    ac_sys = voevent.WhereWhen.ObsDataLocation.ObservationLocation.AstroCoordSystem
-    sys = ac_sys.attrib["id"]
-
-    if hasattr(ac.Position2D, "Name1"):
-        assert ac.Position2D.Name1 == "RA" and ac.Position2D.Name2 == "Dec"
+    od = _obs_data_location(voevent, index)
+    ol = _child(od, "ObservationLocation")
+    sys = _child(ol, "AstroCoordSystem").attrib["id"]
+    pos = _child(_child(ol, "AstroCoords"), "Position2D")
+
+    name1 = first_child(pos, "Name1")
+    if name1 is not None:
+        assert name1.text == "RA" and _child(pos, "Name2").text == "Dec"
+    value2 = _child(pos, "Value2")
     posn = Position2D(
-        ra=float(ac.Position2D.Value2.C1),
-        dec=float(ac.Position2D.Value2.C2),
-        err=float(ac.Position2D.Error2Radius),
-        units=ac.Position2D.attrib["unit"],
+        ra=float(_child(value2, "C1").text),
+        dec=float(_child(value2, "C2").text),
+        err=float(_child(pos, "Error2Radius").text),
+        units=pos.attrib["unit"],
         system=sys,
     )
     return posn
 
 
+def _float_or_nan(text):
+    if text is None:
+        return np.nan
+    return float(text)
+
+
+def _time_label_us(time):
+    """Microseconds since 1970 (in the packet's time scale), or None."""
+    if time is None:
+        return None
+    instant = first_child(time, "TimeInstant")
+    if instant is None:
+        return None
+    isotime = _first_text(instant, "ISOTime")
+    if isotime is not None:
+        return timescales.datetime_to_us(parse_isotime(isotime, default_timezone=None))
+    offset = _first_text(instant, "TimeOffset")
+    if offset is None:
+        return None
+    return timescales.time_offset_to_us(
+        float(offset),
+        time.get("unit", "s"),
+        _first_text(instant, "TimeScale", default="MJD"),
+    )
+
+
+def get_event_trajectory(voevent):
+    """Extracts times and positions from every `WhereWhen.ObsDataLocation`.
+
+    Equivalent to calling :py:func:`.get_event_time_as_utc` and
+    :py:func:`.get_event_position` for each ObsDataLocation in turn, but
+    done in a single pass over the packet, with the time-scale conversions
+    applied to all entries at once (see :py:mod:`voeventparse.timescales`).
+    Useful for e.g. moving objects, reported as a series of locations.
+
+    Args:
+        voevent (:class:`voeventparse.voevent.Voevent`): Root node of the
+            VOEvent etree.
+
+    Returns:
+        :py:class:`.Trajectory`: Arrays of time, position, etc, one element
+        per ObsDataLocation (empty if there are none).
+    Raises:
+        ValueError: If a time is given in an unrecognised time-system.
+    """
+    labels, scales, ra, dec, err, units, systems = [], [], [], [], [], [], []
+    where_when = find_section(voevent, "WhereWhen")
+    if where_when is not None:
+        for od in where_when.iterchildren("{*}ObsDataLocation"):
+            ol = first_child(od, "ObservationLocation")
+            ac_sys = ac = None
+            if ol is not None:
+                ac_sys = first_child(ol, "AstroCoordSystem")
+                ac = first_child(ol, "AstroCoords")
+            systems.append(None if ac_sys is None else ac_sys.get("id"))
+            if ac is None:
+                labels.append(None)
+                scales.append(None)
+                pos = None
+            else:
+                labels.append(_time_label_us(first_child(ac, "Time")))
+                scales.append(ac.get("coord_system_id", "").split("-")[0])
+                pos = first_child(ac, "Position2D")
+            if pos is None:
+                ra.append(np.nan)
+                dec.append(np.nan)
+                err.append(np.nan)
+                units.append(None)
+            else:
+                value2 = first_child(pos, "Value2")
+                if value2 is None:
+                    ra.append(np.nan)
+                    dec.append(np.nan)
+                else:
+                    ra.append(_float_or_nan(_first_text(value2, "C1")))
+                    dec.append(_float_or_nan(_first_text(value2, "C2")))
+                err.append(_float_or_nan(_first_text(pos, "Error2Radius")))
+                units.append(pos.get("unit"))
+
+    nat = np.array([label is None for label in labels], dtype=bool)
+    us = np.array([label or 0 for label in labels], dtype=np.int64)
+    labels = us.astype("datetime64[us]")
+    labels[nat] = np.datetime64("NaT")
+    times = np.full(len(labels), np.datetime64("NaT"), dtype="datetime64[us]")
+    scales = np.array(scales, dtype=object)
+    for scale in set(scales[~nat]):
+        if scale not in timescales.SCALES:
+            raise ValueError(
+                f"Unrecognised time-system: {scale} (badly formatted VOEvent?)"
+            )
+        mask = ~nat & (scales == scale)
+        times[mask] = timescales.to_utc_datetime64(labels[mask], scale)
+    return Trajectory(
+        time=times,
+        ra=np.array(ra, dtype=np.float64),
+        dec=np.array(dec, dtype=np.float64),
+        err=np.array(err, dtype=np.float64),
+        units=np.array(units, dtype=object),
+        system=np.array(systems, dtype=object),
+    )
+
+
 def _get_param_children_as_omdict(subtree_element):
-    elt = subtree_element
     omd = omdict()
-    if elt.find("Param") is not None:
-        for p in elt.Param:
-            omd.add(p.attrib.get("name"), p.attrib)
+    for p in subtree_element.iterchildren("{*}Param"):
+        omd.add(p.get("name"), plain_attrib(p))
     return omd
 
 
@@ -140,11 +316,8 @@ def get_grouped_params(voevent):
 
     """
     groups_omd = omdict()
-    w = deepcopy(voevent.What)
-    lxml.objectify.deannotate(w)
-    if w.find("Group") is not None:
-        for grp in w.Group:
-            groups_omd.add(grp.attrib.get("name"), _get_param_children_as_omdict(grp))
+    for grp in _section(voevent, "What").iterchildren("{*}Group"):
+        groups_omd.add(grp.get("name"), _get_param_children_as_omdict(grp))
     return groups_omd
 
 
@@ -175,10 +348,7 @@ def get_toplevel_params(voevent):
             all_foo_vals = [atts['value'] for atts in top_params.getlist('foo')]
 
     """
-    OrderedDict()
-    w = deepcopy(voevent.What)
-    lxml.objectify.deannotate(w)
-    return _get_param_children_as_omdict(w)
+    return _get_param_children_as_omdict(_section(voevent, "What"))
 
 
 def pull_astro_coords(voevent, index=0):
@@ -264,22 +434,18 @@ def pull_params(voevent):
         stacklevel=2,
     )
     result = OrderedDict()
-    w = deepcopy(voevent.What)
-    lxml.objectify.deannotate(w)
-    if w.countchildren() == 0:
+    w = _section(voevent, "What")
+    if w.find("*") is None:
         return result
     toplevel_params = OrderedDict()
     result[None] = toplevel_params
-    if w.find("Param") is not None:
-        for p in w.Param:
-            toplevel_params[p.attrib.get("name")] = p.attrib
-    if w.find("Group") is not None:
-        for g in w.Group:
-            g_params = {}
-            result[g.attrib.get("name")] = g_params
-            if hasattr(g, "Param"):
-                for p in g.Param:
-                    g_params[p.attrib.get("name")] = p.attrib
+    for p in w.iterchildren("{*}Param"):
+        toplevel_params[p.get("name")] = plain_attrib(p)
+    for g in w.iterchildren("{*}Group"):
+        g_params = {}
+        result[g.get("name")] = g_params
+        for p in g.iterchildren("{*}Param"):
+            g_params[p.get("name")] = plain_attrib(p)
     return result
 
 
@@ -297,6 +463,8 @@ def prettystr(subtree):
     Returns:
         str: Prettyprinted string representation of the raw XML.
     """
+    if isinstance(subtree, ElementView):
+        subtree = subtree.element
     subtree = deepcopy(subtree)
     lxml.objectify.deannotate(subtree)
     lxml.etree.cleanup_namespaces(subtree)
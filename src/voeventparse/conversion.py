@@ -0,0 +1,241 @@
+"""Lossless conversion between VOEvent element trees and plain dicts.
+
+The dict representation is made only of dicts, lists and strings, so it can
+be passed straight to :py:func:`json.dumps`. Each element maps to a dict
+with the following keys, where entries with no content are omitted:
+
+``tag``
+    The element tag. Namespaced tags use Clark notation,
+    e.g. ``{http://www.ivoa.net/xml/VOEvent/v2.0}VOEvent``.
+``nsmap``
+    Namespace declarations, mapping prefix to URI. Only recorded on the
+    root element, and on descendants which use a namespace not already
+    declared by an ancestor.
+``attrib``
+    Mapping of attribute name to value, in document order.
+``text``
+    Text content preceding the first child element.
+``tail``
+    Text content following the element's closing tag.
+``children``
+    List of child dicts, in document order. Repeated children (e.g. many
+    ``Param`` entries) are simply repeated list entries, so ordering
+    relative to other children is preserved.
+
+XML comments are represented as ``{"comment": text}`` (plus ``tail``), and
+processing instructions as ``{"pi": target}`` (plus ``text``, ``tail``).
+
+lxml.objectify type annotations are not part of the packet content, so are
+dropped, as on output via :py:func:`.dumps`. Hence::
+
+    dumps(from_dict(to_dict(v))) == dumps(v)
+"""
+
+from lxml import etree, objectify
+
+from voeventparse.voevent import remove_root_tag_prefix, standard_root_tag
+
+_PYTYPE_NS = "http://codespeak.net/lxml/objectify/pytype"
+_XSD_NS = "http://www.w3.org/2001/XMLSchema"
+_XSI_TYPE = "{http://www.w3.org/2001/XMLSchema-instance}type"
+_PYTYPE_ATTRIB = "".join(("{", _PYTYPE_NS, "}pytype"))
+#: The objectify type-annotation attributes, omitted from the dict form.
+ANNOTATION_ATTRIBS = frozenset((_PYTYPE_ATTRIB, _XSI_TYPE))
+_annotation_namespaces = frozenset((_PYTYPE_NS, _XSD_NS))
+
+_parser = objectify.makeparser()
+# Objectified elements refuse assignment to ``.text``; the plain etree
+# descriptors write the underlying node directly.
+#: ``set_text(element, text)`` sets the text of any element, objectified or
+#: not, without type annotation.
+set_text = etree._Element.text.__set__
+#: ``set_tail(element, tail)``: as for :data:`set_text`, for the tail.
+set_tail = etree._Element.tail.__set__
+
+
+def clean_nsmap(nsmap):
+    """A namespace map, less the namespaces used by objectify annotations."""
+    return {
+        prefix: uri
+        for prefix, uri in nsmap.items()
+        if uri not in _annotation_namespaces
+    }
+
+
+def plain_attrib(element):
+    """Return the attributes of an element as a plain dict.
+
+    Any objectify type annotations (``py:pytype`` and ``xsi:type``
+    attributes, as added when assigning values to an objectify tree) are
+    left out.
+
+    Args:
+        element: An lxml element (objectify or plain etree).
+    Returns:
+        dict: Mapping of attribute name to value.
+    """
+    return {k: v for k, v in element.items() if k not in ANNOTATION_ATTRIBS}
+
+
+def _to_entry(element, in_scope):
+    """Build the dict for a single node, excluding its children."""
+    tag = element.tag
+    if tag is etree.Comment:
+        entry = {"comment": element.text}
+    elif tag is etree.ProcessingInstruction:
+        entry = {"pi": element.target}
+        if element.text is not None:
+            entry["text"] = element.text
+    else:
+        entry = {"tag": tag}
+        namespaced = tag[0] == "{"
+        attrib = {}
+        for key, value in element.items():
+            if key[0] == "{":
+                if key in ANNOTATION_ATTRIBS:
+                    continue
+                namespaced = True
+            attrib[key] = value
+        if namespaced:
+            declared = {
+                prefix: uri
+                for prefix, uri in clean_nsmap(element.nsmap).items()
+                if in_scope.get(prefix) != uri
+            }
+            if declared:
+                entry["nsmap"] = declared
+        if attrib:
+            entry["attrib"] = attrib
+        text = element.text
+        if text is not None:
+            entry["text"] = text
+    tail = element.tail
+    if tail is not None:
+        entry["tail"] = tail
+    return entry
+
+
+def to_dict(voevent):
+    """Convert a VOEvent etree (or any subtree) into a nested dict.
+
+    See the module docstring for a description of the mapping. The tree is
+    walked iteratively, and is not modified.
+
+    Args:
+        voevent (:class:`Voevent`): Root node of the VOEvent etree.
+    Returns:
+        dict: Nested dict representation of the tree.
+    """
+    nsmap = clean_nsmap(voevent.nsmap)
+    root = {"tag": standard_root_tag(voevent), "nsmap": nsmap}
+    attrib = plain_attrib(voevent)
+    if attrib:
+        root["attrib"] = attrib
+    if voevent.text is not None:
+        root["text"] = voevent.text
+    _add_child_entries(voevent, root, nsmap)
+    return root
+
+
+def _add_child_entries(element, entry, in_scope):
+    """Fill in the dicts for all descendants of ``element``, iteratively."""
+    stack = [(element, entry, in_scope)]
+    while stack:
+        element, entry, in_scope = stack.pop()
+        children = []
+        for child in element.iterchildren():
+            child_entry = _to_entry(child, in_scope)
+            children.append(child_entry)
+            if "tag" in child_entry:
+                stack.append((child, child_entry, _child_scope(child_entry, in_scope)))
+        if children:
+            entry["children"] = children
+
+
+def _child_scope(entry, in_scope):
+    if "nsmap" in entry:
+        return dict(in_scope, **entry["nsmap"])
+    return in_scope
+
+
+def subtree_to_dict(node, in_scope):
+    """The dict for a node and its descendants, within a larger tree.
+
+    Args:
+        node: The element (or comment, etc).
+        in_scope (dict): Namespaces declared by ancestors of ``node``.
+    Returns:
+        dict: As for :func:`to_dict`.
+    """
+    entry = _to_entry(node, in_scope)
+    if "tag" in entry:
+        _add_child_entries(node, entry, _child_scope(entry, in_scope))
+    return entry
+
+
+def _make_node(parent, entry):
+    if "comment" in entry:
+        node = etree.Comment(entry["comment"])
+        parent.append(node)
+    elif "pi" in entry:
+        node = etree.ProcessingInstruction(entry["pi"], entry.get("text"))
+        parent.append(node)
+    else:
+        node = etree.SubElement(
+            parent, entry["tag"], entry.get("attrib", {}), entry.get("nsmap")
+        )
+        if "text" in entry:
+            set_text(node, entry["text"])
+    if "tail" in entry:
+        set_tail(node, entry["tail"])
+    return node
+
+
+def _add_child_nodes(element, entry):
+    """Build all descendants of ``element`` from its dict, iteratively."""
+    stack = [(element, entry)]
+    while stack:
+        element, entry = stack.pop()
+        for child_entry in entry.get("children", ()):
+            child = _make_node(element, child_entry)
+            if "children" in child_entry:
+                stack.append((child, child_entry))
+
+
+def subtree_from_dict(parent, entry):
+    """Build a node and its descendants, appended to ``parent``.
+
+    The inverse of :func:`subtree_to_dict`.
+
+    Args:
+        parent: The element to append to.
+        entry (dict): The dict of the node, as for :func:`to_dict`.
+    Returns:
+        The new node.
+    """
+    node = _make_node(parent, entry)
+    _add_child_nodes(node, entry)
+    return node
+
+
+def from_dict(d):
+    """Build a VOEvent etree from its dict representation.
+
+    This is the inverse of :func:`to_dict`. If the root element is a
+    VOEvent, the namespace prefix is removed from its tag just as in
+    :py:func:`.loads`, so the result can be used with all the usual
+    voevent-parse routines.
+
+    Args:
+        d (dict): Nested dict representation, as returned by :func:`to_dict`.
+    Returns:
+        :py:class:`Voevent`: Root-node of the etree.
+    """
+    root = _parser.makeelement(d["tag"], d.get("attrib", {}), d.get("nsmap"))
+    if "text" in d:
+        set_text(root, d["text"])
+    _add_child_nodes(root, d)
+
+    if etree.QName(root).localname == "VOEvent":
+        remove_root_tag_prefix(root)
+    return root
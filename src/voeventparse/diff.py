@@ -0,0 +1,246 @@
+"""Structural diff and patch of VOEvent packets.
+
+:func:`diff` compares two packets element by element, and returns a list of
+operations which transform the first into the second. Each subtree is
+summarised by its content hash (see :py:mod:`.hashing`), so identical
+subtrees (typically most of a follow-up packet) are skipped without being
+walked, and changed entries among a list of siblings (e.g. Params) are
+matched up by hash.
+
+:func:`make_patch` wraps the operations with the content hashes of the
+packets before and after, and :func:`apply_patch` applies them to a copy of
+the first packet, so that::
+
+    dumps(apply_patch(a, make_patch(a, b))) == dumps(b)
+
+up to any differences in formatting (whitespace, attribute order) within
+subtrees of equal content, which are ignored.
+
+A patch is made only of dicts, lists and strings, so can be passed straight
+to :py:func:`json.dumps` - e.g. to store a chain of updates to an event as
+the first packet plus one patch per update.
+
+Operations are dicts, applied in order. Each has an ``op`` key, and a
+``path`` - the list of child indices (counting all children, including
+comments) leading from the root to the node concerned:
+
+``{"op": "attrib", "path": [...], "attrib": {...}}``
+    Set the attributes of an element (in order), replacing any others.
+``{"op": "text", "path": [...], "value": "..."}``
+    Set the text of an element (``None`` to remove).
+``{"op": "tail", "path": [...], "value": "..."}``
+    Set the tail text of a node (``None`` to remove).
+``{"op": "remove", "path": [...]}``
+    Remove a node.
+``{"op": "insert", "path": [...], "node": {...}}``
+    Insert a node, so that it has the given path. The node and its
+    descendants are represented as for :py:func:`.to_dict`.
+``{"op": "replace", "path": [...], "node": {...}}``
+    Replace a node (with an empty path: the whole packet).
+
+lxml.objectify type annotations are ignored, as on output via
+:py:func:`.dumps`.
+"""
+
+import copy
+import difflib
+import hashlib
+from itertools import islice
+
+from lxml import etree
+
+from voeventparse.conversion import (
+    clean_nsmap,
+    from_dict,
+    plain_attrib,
+    set_tail,
+    set_text,
+    subtree_from_dict,
+    subtree_to_dict,
+    to_dict,
+)
+from voeventparse.hashing import subtree_digest, subtree_hash
+from voeventparse.voevent import standard_root_tag
+
+
+def _digest(node, memo):
+    if node.tag is etree.Comment or node.tag is etree.ProcessingInstruction:
+        return hashlib.blake2b(etree.tostring(node), digest_size=16).digest()
+    return subtree_digest(node, memo)
+
+
+def _kind(node):
+    tag = node.tag
+    if tag is etree.Comment or tag is etree.ProcessingInstruction:
+        return tag, None
+    return tag, tag
+
+
+def _diff_nodes(a, b, path, in_scope, memo, ops):
+    if _kind(a) != _kind(b) or a.tag is etree.ProcessingInstruction:
+        ops.append(
+            {"op": "replace", "path": path, "node": subtree_to_dict(b, in_scope)}
+        )
+        return
+    if a.tag is not etree.Comment:
+        attrib = plain_attrib(b)
+        if list(plain_attrib(a).items()) != list(attrib.items()):
+            ops.append({"op": "attrib", "path": path, "attrib": attrib})
+    if a.text != b.text:
+        ops.append({"op": "text", "path": path, "value": b.text})
+    if a.tail != b.tail:
+        ops.append({"op": "tail", "path": path, "value": b.tail})
+    if a.tag is not etree.Comment:
+        _diff_children(a, b, path, memo, ops)
+
+
+def _diff_children(a, b, path, memo, ops):
+    old = list(a.iterchildren())
+    new = list(b.iterchildren())
+    matcher = difflib.SequenceMatcher(
+        None,
+        [_digest(c, memo) for c in old],
+        [_digest(c, memo) for c in new],
+        autojunk=False,
+    )
+    child_scope = clean_nsmap(b.nsmap)
+    # Work backwards through the children, so that operations on later
+    # children never shift the indices of earlier ones.
+    for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+        if tag == "equal":
+            continue
+        paired = min(i2 - i1, j2 - j1) if tag == "replace" else 0
+        for i in reversed(range(i1 + paired, i2)):
+            ops.append({"op": "remove", "path": path + [i]})
+        for j in range(j1 + paired, j2):
+            ops.append(
+                {
+                    "op": "insert",
+                    "path": path + [i1 + j - j1],
+                    "node": subtree_to_dict(new[j], child_scope),
+                }
+            )
+        for k in range(paired):
+            _diff_nodes(
+                old[i1 + k], new[j1 + k], path + [i1 + k], child_scope, memo, ops
+            )
+
+
+def diff(a, b, memo=None):
+    """Compute the operations which transform one packet into another.
+
+    See the module docstring for the format of the operations.
+
+    Args:
+        a (:class:`Voevent`): Root node of the original VOEvent etree.
+        b (:class:`Voevent`): Root node of the new VOEvent etree.
+        memo (dict): Optional memo of subtree hashes, see
+            :py:mod:`.hashing`. Pass the same memo to diff a series of
+            packets against ``a`` without re-hashing it each time.
+    Returns:
+        list: Operations (dicts), empty if the packets have equal content.
+    """
+    if memo is None:
+        memo = {}
+    ops = []
+    if standard_root_tag(a) != standard_root_tag(b) or list(
+        clean_nsmap(a.nsmap).items()
+    ) != list(clean_nsmap(b.nsmap).items()):
+        return [{"op": "replace", "path": [], "node": to_dict(b)}]
+    if subtree_digest(a, memo) == subtree_digest(b, memo):
+        return ops
+    attrib = plain_attrib(b)
+    if list(plain_attrib(a).items()) != list(attrib.items()):
+        ops.append({"op": "attrib", "path": [], "attrib": attrib})
+    if a.text != b.text:
+        ops.append({"op": "text", "path": [], "value": b.text})
+    _diff_children(a, b, [], memo, ops)
+    return ops
+
+
+def make_patch(a, b):
+    """Make a patch which transforms one packet into another.
+
+    Args:
+        a (:class:`Voevent`): Root node of the original VOEvent etree.
+        b (:class:`Voevent`): Root node of the new VOEvent etree.
+    Returns:
+        dict: The patch, with keys ``base`` and ``target`` (the
+        :py:func:`.subtree_hash` of ``a`` and ``b``) and ``ops`` (as returned
+        by :func:`diff`).
+    """
+    memo = {}
+    return {
+        "base": subtree_hash(a, memo),
+        "target": subtree_hash(b, memo),
+        "ops": diff(a, b, memo),
+    }
+
+
+def _child(element, index):
+    try:
+        return next(islice(element.iterchildren(), index, None))
+    except StopIteration:
+        raise IndexError(f"No child at index {index}") from None
+
+
+def _insert(parent, index, node_dict):
+    node = subtree_from_dict(parent, node_dict)
+    parent.insert(index, node)
+
+
+def apply_patch(voevent, patch, check=True):
+    """Apply a patch, as returned by :func:`make_patch`.
+
+    Args:
+        voevent (:class:`Voevent`): Root node of the original VOEvent etree.
+            This is not modified.
+        patch (dict): The patch. Alternatively, a list of operations as
+            returned by :func:`diff`.
+        check (bool): (Default True) Check that the patch applies to
+            ``voevent``, and that it gives the expected result, by comparing
+            content hashes.
+    Returns:
+        :class:`Voevent`: Root node of the new VOEvent etree.
+    Raises:
+        ValueError: If ``check`` is True and the packet hashes do not match.
+    """
+    if isinstance(patch, dict):
+        ops = patch["ops"]
+        if check and subtree_hash(voevent) != patch["base"]:
+            raise ValueError("Patch does not apply to this packet (hash mismatch)")
+    else:
+        ops, check = patch, False
+    v = copy.deepcopy(voevent)
+    for op in ops:
+        path = op["path"]
+        kind = op["op"]
+        if not path and kind == "replace":
+            v = from_dict(op["node"])
+            continue
+        parent = v
+        for index in path[:-1]:
+            parent = _child(parent, index)
+        if kind == "insert":
+            _insert(parent, path[-1], op["node"])
+            continue
+        node = _child(parent, path[-1]) if path else v
+        if kind == "attrib":
+            for key in list(plain_attrib(node)):
+                del node.attrib[key]
+            for key, value in op["attrib"].items():
+                node.set(key, value)
+        elif kind == "text":
+            set_text(node, op["value"])
+        elif kind == "tail":
+            set_tail(node, op["value"])
+        elif kind == "remove":
+            parent.remove(node)
+        elif kind == "replace":
+            parent.remove(node)
+            _insert(parent, path[-1], op["node"])
+        else:
+            raise ValueError(f"Unrecognised patch operation: {kind!r}")
+    if check and subtree_hash(v) != patch["target"]:
+        raise ValueError("Patched packet does not match the target hash")
+    return v
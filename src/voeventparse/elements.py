@@ -0,0 +1,149 @@
+"""Typed element classes for common VOEvent elements.
+
+By default, every element of a loaded packet is a generic
+:py:class:`lxml.objectify.ObjectifiedElement` (or one of its data-element
+subclasses). A parser from :func:`make_parser` instead maps a few VOEvent
+tags onto subclasses with extra, typed properties::
+
+    parser = voeventparse.elements.make_parser()
+    v = voeventparse.loads(raw_bytes, parser=parser)
+    v.What.Param[0].typed_value  # int, float or str, per 'dataType'
+    od = v.WhereWhen.ObsDataLocation
+    od.position  # Position2D
+    od.ObservationLocation.AstroCoords.Time.TimeInstant.ISOTime.datetime
+
+The subclasses otherwise behave exactly like the generic classes, and
+elements subsequently added to the tree (e.g. via :py:func:`.param`) are
+given the typed classes too - though a reference to the element taken
+before adding it keeps its original class.
+
+Note that lxml creates element proxy objects on demand, and discards them
+as soon as they go out of scope, so values cannot be cached on the element
+objects. Instead the properties are cheap to recompute: they read the
+relevant attributes and children directly, bypassing objectify's dynamic
+attribute lookup.
+
+lxml parsers may not be used from several threads at once, so create a
+parser per thread where needed.
+"""
+
+from lxml import etree, objectify
+
+from voeventparse.isotime import parse_isotime
+from voeventparse.misc import Position2D
+
+_param_converters = {
+    "int": int,
+    "float": float,
+    "string": str,
+}
+
+
+class Param(objectify.ObjectifiedElement):
+    """A ``Param`` element."""
+
+    @property
+    def typed_value(self):
+        """The ``value`` attribute, converted according to ``dataType``.
+
+        Returns an :py:obj:`int` or :py:obj:`float` for those data types, or
+        else a string. Returns ``None`` if the Param has no value (or an
+        empty value, for the numeric data types).
+
+        Raises:
+            ValueError: If the value cannot be converted to the declared
+                data type.
+        """
+        value = self.get("value")
+        convert = _param_converters.get(self.get("dataType"), str)
+        if value is None or (not value and convert is not str):
+            return None
+        return convert(value)
+
+
+class ObsDataLocation(objectify.ObjectifiedElement):
+    """An ``ObsDataLocation`` element, from the ``WhereWhen`` section."""
+
+    @property
+    def position(self):
+        """The sky position given by this ObsDataLocation.
+
+        Equivalent to :py:func:`.get_event_position` for the relevant
+        ObsDataLocation.
+
+        Returns:
+            :py:class:`.Position2D`: The sky position, or ``None`` if this
+            ObsDataLocation does not specify one.
+        """
+        ol = self.find("ObservationLocation")
+        if ol is None:
+            return None
+        ac = ol.find("AstroCoords")
+        ac_sys = ol.find("AstroCoordSystem")
+        if ac is None or ac_sys is None:
+            return None
+        pos = ac.find("Position2D")
+        if pos is None:
+            return None
+        name1 = pos.find("Name1")
+        if name1 is not None:
+            assert name1.text == "RA" and pos.findtext("Name2") == "Dec"
+        value2 = pos.find("Value2")
+        return Position2D(
+            ra=float(value2.findtext("C1")),
+            dec=float(value2.findtext("C2")),
+            err=float(pos.findtext("Error2Radius")),
+            units=pos.get("unit"),
+            system=ac_sys.get("id"),
+        )
+
+
+class ISOTime(objectify.StringElement):
+    """An ``ISOTime`` element."""
+
+    @property
+    def datetime(self):
+        """The timestamp, as a :py:class:`datetime.datetime`.
+
+        NB no time-scale conversion is applied, cf
+        :py:func:`.get_event_time_as_utc`. Timestamps without a timezone
+        designator are taken to be UTC.
+        """
+        return parse_isotime(self.text)
+
+
+#: Mapping of (un-namespaced) tag to element class.
+element_classes = {
+    "Param": Param,
+    "ObsDataLocation": ObsDataLocation,
+    "ISOTime": ISOTime,
+}
+
+
+def make_lookup():
+    """Create an element class lookup assigning the typed classes.
+
+    Tags not listed in :data:`element_classes` fall back to the usual
+    objectify lookup.
+
+    Returns:
+        lxml.etree.ElementNamespaceClassLookup: The lookup.
+    """
+    lookup = etree.ElementNamespaceClassLookup(objectify.ObjectifyElementClassLookup())
+    # The VOEvent schema leaves child elements unqualified:
+    lookup.get_namespace(None).update(element_classes)
+    return lookup
+
+
+def make_parser(**kwargs):
+    """Create an objectify parser which assigns the typed element classes.
+
+    Args:
+        **kwargs: Passed on to :py:func:`lxml.objectify.makeparser`, e.g.
+            ``huge_tree=True``.
+    Returns:
+        lxml.etree.XMLParser: A parser, for use with :py:func:`.loads`.
+    """
+    parser = objectify.makeparser(**kwargs)
+    parser.set_element_class_lookup(make_lookup())
+    return parser
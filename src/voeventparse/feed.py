@@ -0,0 +1,201 @@
+"""Incremental parsing of packets as their bytes arrive, e.g. over TCP.
+
+Rather than buffer a whole message before calling :py:func:`.loads`, a
+:class:`VoeventFeedParser` parses each chunk as it is received, using
+lxml's feed parser interface. So by the time the last chunk of a packet
+arrives most of the parsing is done, and the packet is available with
+little further delay.
+
+A single document is fed and then completed with ``close()``, as for lxml::
+
+    parser = VoeventFeedParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+    v = parser.close()
+
+For a stream of several packets the message boundaries must be marked. With
+``framed=True``, each packet is expected to be prefixed by its length in
+bytes, as a 4-byte big-endian (network order) unsigned integer - the framing
+used by the VOEvent Transport Protocol. Chunks may then split packets (or
+length prefixes) at any point, or hold several; each packet is emitted as
+soon as its last byte is fed::
+
+    parser = VoeventFeedParser(framed=True)
+    while chunk := sock.recv(65536):
+        for v in parser.feed(chunk):
+            handle(v)
+    parser.close()
+
+VOEvent Transport Protocol messages (``iamalive`` and ``ack`` / ``nak``
+messages, with a ``Transport`` root element) in the stream are emitted too,
+so that the caller can respond to them, e.g.::
+
+    if v.tag == "Transport":
+        respond(v)
+
+These are not version-checked (they carry the Transport schema version).
+"""
+
+import contextlib
+
+from lxml import etree, objectify
+
+from voeventparse.voevent import assert_supported_version, remove_root_tag_prefix
+
+#: Size in bytes of the length prefix of each framed packet.
+FRAME_HEADER_SIZE = 4
+
+
+class VoeventFeedParser:
+    """Parse packets incrementally, from chunks of bytes.
+
+    See the module docstring.
+
+    Args:
+        framed (bool): (Default=False) Expect a stream of packets, each
+            prefixed by its length (see the module docstring), rather than a
+            single document.
+        check_version (bool): (Default=True) As for :py:func:`.loads`.
+        parser (lxml.etree.XMLParser): (Default=None) An objectify parser to
+            use in place of the default, as for :py:func:`.loads`. A copy is
+            used, so the parser passed may still be used elsewhere meanwhile.
+    """
+
+    def __init__(self, framed=False, check_version=True, parser=None):
+        if parser is None:
+            parser = objectify.makeparser(remove_blank_text=True)
+        else:
+            parser = parser.copy()
+        self._parser = parser
+        self._framed = framed
+        self.assert_supported_version = check_version
+        # Framing state: the partial length prefix, or the number of bytes
+        # of the current packet still to come.
+        self._header = b""
+        self._remaining = None
+        # A parse error for the current packet, whose remainder is skipped:
+        self._error = None
+        self._started = False
+        self._unread = []
+
+    @property
+    def in_packet(self):
+        """True if part of a packet (or length prefix) has been fed."""
+        if self._framed:
+            return bool(self._header) or self._remaining is not None
+        return self._started
+
+    def _finish(self):
+        try:
+            v = self._parser.close()
+        finally:
+            self._started = False
+        remove_root_tag_prefix(v)
+        if self.assert_supported_version and etree.QName(v).localname != "Transport":
+            assert_supported_version(v)
+        return v
+
+    def _reset(self):
+        """Discard a partly parsed document."""
+        with contextlib.suppress(etree.XMLSyntaxError):
+            self._parser.close()
+        self._started = False
+
+    def feed(self, data):
+        """Parse a chunk of bytes.
+
+        Args:
+            data (bytes): The next chunk of the stream (or any buffer).
+        Returns:
+            list: The packets completed by this chunk, as :py:class:`Voevent`
+            root nodes - or Transport messages, see the module docstring.
+            (Always empty unless ``framed``.)
+        Raises:
+            lxml.etree.XMLSyntaxError: If the XML is malformed.
+            ValueError: For a packet of unsupported schema version (see
+                :py:func:`.loads`).
+
+        In ``framed`` mode, a packet which fails to parse is skipped: the
+        rest of the chunk is still parsed, then the first error is raised.
+        Any other packets completed by the chunk may then be retrieved with
+        :meth:`read_packets`.
+        """
+        if not isinstance(data, bytes):
+            data = bytes(data)
+        if not self._framed:
+            self._started = True
+            self._parser.feed(data)
+            return []
+        packets = []
+        error = None
+        pos, end = 0, len(data)
+        while pos < end:
+            if self._remaining is None:
+                needed = FRAME_HEADER_SIZE - len(self._header)
+                self._header += data[pos : pos + needed]
+                pos += needed
+                if len(self._header) < FRAME_HEADER_SIZE:
+                    break
+                self._remaining = int.from_bytes(self._header, "big")
+                self._header = b""
+                self._error = None
+            take = min(self._remaining, end - pos)
+            if take and self._error is None:
+                try:
+                    self._started = True
+                    self._parser.feed(data if take == end else data[pos : pos + take])
+                except etree.XMLSyntaxError as exc:
+                    # Skip the rest of this packet
+                    self._error = exc
+                    self._reset()
+            pos += take
+            self._remaining -= take
+            if self._remaining:
+                continue
+            self._remaining = None
+            try:
+                if self._error is not None:
+                    raise self._error
+                packets.append(self._finish())
+            except (etree.XMLSyntaxError, ValueError) as exc:
+                error = error or exc
+            self._error = None
+        if error is not None:
+            self._unread = packets
+            raise error
+        return packets
+
+    def read_packets(self):
+        """The packets completed by a call to :meth:`feed` which raised.
+
+        Returns:
+            list: :py:class:`Voevent` root nodes, those otherwise lost when
+            :meth:`feed` raised an error for another packet in the same
+            chunk. Each packet is returned once only.
+        """
+        packets, self._unread = self._unread, []
+        return packets
+
+    def close(self):
+        """Finish parsing.
+
+        Returns:
+            :py:class:`Voevent`: The root node of the document, or ``None``
+            in ``framed`` mode (when each packet is returned by
+            :meth:`feed`).
+        Raises:
+            lxml.etree.XMLSyntaxError: If the document is incomplete or
+                malformed.
+            ValueError: In ``framed`` mode, if the stream ends part-way
+                through a packet. Otherwise, for an unsupported schema
+                version.
+        """
+        if not self._framed:
+            return self._finish()
+        if self.in_packet:
+            self._header = b""
+            self._remaining = None
+            self._error = None
+            self._reset()
+            raise ValueError("Stream ended part-way through a packet")
+        return None
@@ -0,0 +1,100 @@
+"""Content hashes of packets and their subtrees, e.g. for change detection.
+
+The hash of an element covers its tag, attributes, text and (recursively)
+child elements, but not the details of how these are written out, so
+equal content gives equal hashes however the packet was loaded or authored.
+Specifically, the following are ignored:
+
+* Leading and trailing whitespace of text and tails (e.g. from pretty
+  printing).
+* Attribute order, and namespace prefixes (tags and attribute names are
+  compared in Clark notation, e.g. ``{http://...}schemaLocation``).
+* The namespace of the root VOEvent element, which may be absent.
+* lxml.objectify type annotations.
+* Comments and processing instructions.
+
+Hashes are computed Merkle-style: each element's hash is derived from those
+of its children. Pass a dict as ``memo`` to record the hash of every
+subtree visited, so that repeated hashing of the same tree (or of parts of
+it - e.g. ``What``, then the whole packet) only walks each subtree once::
+
+    memo = {}
+    what_hash = subtree_hash(v.What, memo)
+    packet_hash = subtree_hash(v, memo)  # Reuses the hash of What
+
+NB a memo is only valid while the tree is unchanged - discard it after
+modifying the tree.
+"""
+
+import hashlib
+
+from lxml import etree
+
+from voeventparse.conversion import ANNOTATION_ATTRIBS
+
+_DIGEST_SIZE = 16
+_blake2b = hashlib.blake2b
+_encode = str.encode
+# NB objectify elements override len() to count siblings.
+_len = etree._Element.__len__
+
+
+def _digest(node, memo, is_root):
+    key = id(node)
+    if memo is not None:
+        entry = memo.get(key)
+        if entry is not None:
+            return entry[1]
+    tag = node.tag
+    if is_root:
+        tag = etree.QName(tag).localname
+    parts = [tag]
+    items = node.items()
+    if items:
+        items.sort()
+        parts.extend(
+            "\1".join(item) for item in items if item[0] not in ANNOTATION_ATTRIBS
+        )
+    text = node.text
+    if text and not text.isspace():
+        parts.append("\2" + text.strip())
+    content = [_encode("\0".join(parts))]
+    if _len(node):
+        for child in node.iterchildren(tag=etree.Element):
+            content.append(b"\4" + _digest(child, memo, False))
+            tail = child.tail
+            if tail and not tail.isspace():
+                content.append(_encode("\3" + tail.strip()))
+    digest = _blake2b(b"".join(content), digest_size=_DIGEST_SIZE).digest()
+    if memo is not None:
+        # Keyed by id, since objectify data elements compare equal by
+        # value. The node is stored too, keeping its id valid.
+        memo[key] = (node, digest)
+    return digest
+
+
+def subtree_digest(element, memo=None):
+    """The content hash of an element and its descendants, as bytes.
+
+    Args:
+        element: Any element of a VOEvent etree, e.g. the root node.
+        memo (dict): Optional dict in which hashes are memoised, see the
+            module docstring.
+    Returns:
+        bytes: The digest (16 bytes).
+    """
+    return _digest(element, memo, element.getparent() is None)
+
+
+def subtree_hash(element, memo=None):
+    """The content hash of an element and its descendants, as a hex string.
+
+    As :func:`subtree_digest`.
+
+    Args:
+        element: Any element of a VOEvent etree, e.g. the root node.
+        memo (dict): Optional dict in which hashes are memoised.
+    Returns:
+        str: Hexadecimal digest.
+    """
+    return subtree_digest(element, memo).hex()
@@ -0,0 +1,211 @@
+"""Constant-time lookup of Params and Groups by name.
+
+Finding a Param by name otherwise means scanning ``What.Param`` and the
+Params of every ``What.Group``. Where many Params are looked up per packet,
+build a :class:`ParamIndex` once instead - or call :func:`param_index`,
+which caches the index of each packet::
+
+    index = vp.param_index(v)
+    index.value("Packet_Type")                  # Top-level Param value
+    index.value("Sun_Distance", group="Misc_Flags")
+    index.group("Misc_Flags")                   # The Group element
+    index.params("Integ_Time")                  # All Params of that name
+
+The index refers to the Param and Group elements, reading attribute values
+on each lookup, so changes to values are always seen. :func:`param_index`
+rebuilds the index when the structure may have changed since it was built:
+if the number of children of What or any of its Groups has changed, or What
+has been replaced - catching additions and removals. Checking this is cheap
+for the handful of Groups in a typical packet. Changes to the ``name``
+attributes of existing elements, or replacing one element by another, are
+*not* detected - call :func:`param_index` with ``rebuild=True`` after such
+changes.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+
+from lxml import etree
+
+from voeventparse.convenience import find_section
+from voeventparse.partial import PartialVoevent
+from voeventparse.view import ElementView
+
+#: Maximum number of packets whose indexes are cached by :func:`param_index`.
+INDEX_CACHE_SIZE = 64
+
+# NB objectify elements override len() to count siblings.
+_len = etree._Element.__len__
+
+# Keyed by id of the root element, kept alive by the cached index. lxml
+# elements support neither weak references nor attributes, so instead entries
+# are dropped once nothing else refers to the packet (see _unreferenced):
+_index_cache = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+def _identity(element):
+    return element
+
+
+class ParamIndex:
+    """An index of the Params and Groups in a packet's What section.
+
+    See the module docstring.
+
+    Args:
+        voevent: Root node of the packet - an objectify tree, an
+            :py:class:`.ElementView` or a :py:class:`.PartialVoevent`.
+            For an ElementView, elements are also returned as views.
+    """
+
+    def __init__(self, voevent):
+        self._wrap = ElementView if isinstance(voevent, ElementView) else _identity
+        self._voevent = voevent
+        what = find_section(voevent, "What")
+        self._what = what
+        self._params = {}
+        self._groups = {}
+        self._values = {}
+        self._group_list = []
+        if what is not None:
+            self._index(what)
+        self._signature = self._current_signature()
+
+    def _index(self, what):
+        for child in what.iterchildren("{*}Param", "{*}Group"):
+            name = child.get("name")
+            if child.tag.endswith("Param"):
+                self._params.setdefault(name, []).append(child)
+                self._values.setdefault((None, name), child)
+                continue
+            self._groups.setdefault(name, child)
+            self._group_list.append(child)
+            for param in child.iterchildren("{*}Param"):
+                param_name = param.get("name")
+                self._params.setdefault(param_name, []).append(param)
+                self._values.setdefault((name, param_name), param)
+
+    def _current_signature(self):
+        what = find_section(self._voevent, "What")
+        if what is None:
+            return None
+        if what is not self._what:
+            return what  # A replacement What section
+        return [_len(what)] + [_len(group) for group in self._group_list]
+
+    @property
+    def stale(self):
+        """True if Params or Groups have been added or removed since indexing.
+
+        (See the module docstring for the changes detected.)
+        """
+        return self._current_signature() != self._signature
+
+    def params(self, name):
+        """All Params with the given name, top-level and grouped.
+
+        Args:
+            name (str): Param name.
+        Returns:
+            list: Param elements, in document order.
+        """
+        wrap = self._wrap
+        return [wrap(p) for p in self._params.get(name, ())]
+
+    def param(self, name, group=None):
+        """The Param with the given name, at top-level or in a given Group.
+
+        Args:
+            name (str): Param name.
+            group (str): (Default=None) Group name, or ``None`` for a
+                top-level Param.
+        Returns:
+            The first matching Param element, or ``None`` if there is none.
+        """
+        param = self._values.get((group, name))
+        return None if param is None else self._wrap(param)
+
+    def group(self, name):
+        """The Group with the given name.
+
+        Args:
+            name (str): Group name.
+        Returns:
+            The first Group element with that name, or ``None``.
+        """
+        group = self._groups.get(name)
+        return None if group is None else self._wrap(group)
+
+    def value(self, name, group=None, default=None):
+        """The value of a Param, as for :meth:`param`.
+
+        Args:
+            name (str): Param name.
+            group (str): (Default=None) Group name, or ``None`` for a
+                top-level Param.
+            default: Returned if there is no such Param, or it has no value.
+        Returns:
+            str: The Param's ``value`` attribute.
+        """
+        param = self._values.get((group, name))
+        if param is None:
+            return default
+        return param.get("value", default)
+
+
+def _root(voevent):
+    if isinstance(voevent, ElementView):
+        return voevent.element
+    if isinstance(voevent, PartialVoevent):
+        return voevent.voevent
+    return voevent
+
+
+if hasattr(sys, "getrefcount"):
+
+    def _unreferenced(index):
+        # The index's own reference, plus that of the argument:
+        return sys.getrefcount(index._voevent) <= 2
+
+else:
+
+    def _unreferenced(index):
+        return False
+
+
+def param_index(voevent, rebuild=False):
+    """The :class:`ParamIndex` of a packet, built on first use and cached.
+
+    The index is rebuilt if Params or Groups have since been added or
+    removed - see the module docstring. Indexes of up to
+    :data:`INDEX_CACHE_SIZE` recently used packets are kept, for as long as
+    the packets are referred to elsewhere: entries for packets otherwise
+    discarded are dropped whenever an index is built. (Other than on
+    CPython, entries are only dropped once the cache is full, so keeping
+    the most recent packets alive.)
+
+    Args:
+        voevent: Root node of the packet, as for :class:`ParamIndex`.
+        rebuild (bool): (Default=False) Rebuild the index regardless.
+    Returns:
+        :class:`ParamIndex`: The index.
+    """
+    root = _root(voevent)
+    key = (id(root), isinstance(voevent, ElementView))
+    with _index_cache_lock:
+        entry = _index_cache.get(key)
+        if entry is not None:
+            _index_cache.move_to_end(key)
+    if entry is not None and not rebuild and not entry.stale:
+        return entry
+    index = ParamIndex(voevent)
+    with _index_cache_lock:
+        for k in [k for k, v in _index_cache.items() if _unreferenced(v)]:
+            del _index_cache[k]
+        _index_cache[key] = index
+        _index_cache.move_to_end(key)
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
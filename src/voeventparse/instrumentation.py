@@ -0,0 +1,285 @@
+"""Opt-in timing and call counting for the voevent-parse hot paths.
+
+Call :func:`enable` to start recording, e.g. at the start of a pipeline
+process, then periodically export the figures via :func:`write_prometheus`
+or inspect them via :func:`stats`::
+
+    import voeventparse.instrumentation as vpi
+    vpi.enable()
+    ...
+    vpi.write_prometheus('/var/lib/node_exporter/voeventparse.prom')
+
+Instrumentation works by replacing the instrumented functions with timing
+wrappers, wherever they are referenced within the ``voeventparse`` package
+(including the package-root namespace). :func:`disable` puts the original
+functions back, so when disabled there is no overhead whatsoever.
+References taken by user code *while* instrumentation is enabled (e.g.
+``from voeventparse import loads``) will keep pointing at the wrappers.
+A few costly steps within functions (see :data:`sections`, e.g. the copy
+made by ``dumps``) are also timed, at their call sites.
+
+For integration with other metrics systems (e.g. an OpenTelemetry
+histogram), pass a ``callback``, which is invoked after every instrumented
+call with the function name, the duration in seconds and the number of
+bytes processed (or ``None``).
+"""
+
+import functools
+import importlib
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import deque, namedtuple
+
+import voeventparse.convenience
+
+# NB the package-root name ``voeventparse.voevent`` refers to the function of
+# that name, which shadows the module:
+_voevent_module = importlib.import_module("voeventparse.voevent")
+
+#: (module, function name) pairs which are instrumented.
+targets = [
+    (_voevent_module, "loads"),
+    (_voevent_module, "load"),
+    (_voevent_module, "dumps"),
+    (_voevent_module, "dump"),
+    (_voevent_module, "valid_as_v2_0"),
+    (_voevent_module, "assert_valid_as_v2_0"),
+    (_voevent_module, "remove_root_tag_prefix"),
+    (_voevent_module, "_return_to_standard_xml"),
+    (_voevent_module, "_tostring_standard"),
+    (voeventparse.convenience, "get_event_time_as_utc"),
+    (voeventparse.convenience, "get_event_position"),
+    (voeventparse.convenience, "get_grouped_params"),
+    (voeventparse.convenience, "get_toplevel_params"),
+]
+
+#: Names of the code sections timed at their call sites, within functions
+#: (recorded alongside the functions above).
+sections = ["dumps.deepcopy"]
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+_bytes_types = (bytes, bytearray, memoryview)
+
+
+class FunctionStats(
+    namedtuple(
+        "FunctionStats", "calls total_seconds bytes p50_seconds p90_seconds p99_seconds"
+    )
+):
+    """A namedtuple of the figures recorded for one instrumented function.
+
+    Args:
+        calls (int): Number of calls.
+        total_seconds (float): Cumulative time spent in the function.
+        bytes (int): Cumulative bytes processed, i.e. the size of the raw XML
+            passed in (e.g. to ``loads``) or returned (e.g. from ``dumps``).
+        p50_seconds (float): Median call duration.
+        p90_seconds (float): 90th percentile call duration.
+        p99_seconds (float): 99th percentile call duration.
+
+    Percentiles are calculated over the most recent calls only, see
+    :func:`enable`.
+    """
+
+    pass  # Just wrapping a namedtuple so we can assign a docstring.
+
+
+class _Record:
+    def __init__(self, sample_size):
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.bytes = 0
+        self.samples = deque(maxlen=sample_size)
+
+
+_lock = threading.Lock()
+_records = {}
+_originals = {}
+_callback = None
+_sample_size = 1024
+
+
+def quantile(sorted_samples, q):
+    """The ``q`` quantile of a sorted list of samples (None if empty)."""
+    if not sorted_samples:
+        return None
+    idx = min(len(sorted_samples) - 1, int(q * len(sorted_samples)))
+    return sorted_samples[idx]
+
+
+def _record(name, duration, nbytes):
+    with _lock:
+        record = _records.get(name)
+        if record is None:
+            record = _records[name] = _Record(_sample_size)
+        record.calls += 1
+        record.total_seconds += duration
+        if nbytes is not None:
+            record.bytes += nbytes
+        record.samples.append(duration)
+    if _callback is not None:
+        _callback(name, duration, nbytes)
+
+
+def _wrap(name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        duration = time.perf_counter() - start
+        nbytes = None
+        if args and isinstance(args[0], _bytes_types):
+            nbytes = len(args[0])
+        elif isinstance(result, _bytes_types):
+            nbytes = len(result)
+        _record(name, duration, nbytes)
+        return result
+
+    return wrapper
+
+
+def _package_modules():
+    return [
+        module
+        for modname, module in list(sys.modules.items())
+        if module is not None
+        and (modname == "voeventparse" or modname.startswith("voeventparse."))
+        and modname != __name__
+    ]
+
+
+def _swap(replacements):
+    """Replace every package-level reference to each key by its value."""
+    by_id = {id(old): new for old, new in replacements.items()}
+    for module in _package_modules():
+        namespace = vars(module)
+        for attr, value in list(namespace.items()):
+            if id(value) in by_id:
+                namespace[attr] = by_id[id(value)]
+
+
+def is_enabled():
+    """Returns True if instrumentation is currently enabled."""
+    return bool(_originals)
+
+
+def enable(callback=None, sample_size=1024):
+    """Start recording calls to the instrumented functions.
+
+    Args:
+        callback: Optional callable, invoked as
+            ``callback(name, duration_seconds, nbytes)`` after each call.
+        sample_size (int): Number of most recent call durations retained per
+            function, for calculation of percentiles.
+    """
+    global _callback, _sample_size
+    _callback = callback
+    _sample_size = sample_size
+    if is_enabled():
+        return
+    replacements = {}
+    for module, name in targets:
+        func = getattr(module, name)
+        wrapper = _wrap(name, func)
+        _originals[name] = func
+        replacements[func] = wrapper
+    _swap(replacements)
+    # Sections are timed at their call sites, whenever this hook is set:
+    _voevent_module._record_section = _record
+
+
+def disable():
+    """Stop recording, restoring the original functions.
+
+    Recorded figures are retained until :func:`reset` is called.
+    """
+    global _callback
+    if not is_enabled():
+        return
+    replacements = {}
+    for module, name in targets:
+        wrapper = getattr(module, name)
+        replacements[wrapper] = _originals[name]
+    _swap(replacements)
+    _voevent_module._record_section = None
+    _originals.clear()
+    _callback = None
+
+
+def reset():
+    """Discard all recorded figures."""
+    with _lock:
+        _records.clear()
+
+
+def stats():
+    """Return the recorded figures.
+
+    Returns:
+        dict: Mapping of function name to :class:`FunctionStats`, for each
+        function called since instrumentation was enabled.
+    """
+    result = {}
+    with _lock:
+        for name, record in _records.items():
+            samples = sorted(record.samples)
+            result[name] = FunctionStats(
+                record.calls,
+                record.total_seconds,
+                record.bytes,
+                *[quantile(samples, q) for q in QUANTILES],
+            )
+    return result
+
+
+def prometheus_text():
+    """Render the recorded figures in the Prometheus text exposition format.
+
+    Returns:
+        str: Text suitable for e.g. the node_exporter textfile collector.
+    """
+    lines = [
+        "# HELP voeventparse_call_seconds Duration of voeventparse calls.",
+        "# TYPE voeventparse_call_seconds summary",
+    ]
+    all_stats = stats()
+    for name, fs in sorted(all_stats.items()):
+        for q, value in zip(QUANTILES, fs[3:]):
+            lines.append(
+                f'voeventparse_call_seconds{{function="{name}",quantile="{q}"}} {value!r}'
+            )
+        lines.append(
+            f'voeventparse_call_seconds_sum{{function="{name}"}} {fs.total_seconds!r}'
+        )
+        lines.append(f'voeventparse_call_seconds_count{{function="{name}"}} {fs.calls}')
+    lines += [
+        "# HELP voeventparse_bytes_total Bytes of raw XML processed.",
+        "# TYPE voeventparse_bytes_total counter",
+    ]
+    for name, fs in sorted(all_stats.items()):
+        lines.append(f'voeventparse_bytes_total{{function="{name}"}} {fs.bytes}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    """Write the recorded figures to a file, in Prometheus text format.
+
+    The file is replaced atomically, so a scraper never sees partial output.
+
+    Args:
+        path (str): Output file path, e.g. in the node_exporter textfile
+            collector directory.
+    """
+    dirname = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix=".voeventparse-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(prometheus_text())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
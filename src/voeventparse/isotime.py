@@ -0,0 +1,114 @@
+"""Parsing and formatting of the ISO-8601 timestamps used in VOEvent packets.
+
+VOEvent timestamps (``ISOTime``, ``Who.Date``, ``Why@expires``) are
+restricted to the form ``YYYY-MM-DDThh:mm:ss[.s...]``, usually without a
+timezone designator (UTC being implied). Such timestamps are parsed via
+:py:meth:`datetime.datetime.fromisoformat`, which is implemented in C and
+so is many times faster than the general purpose
+`iso8601 <https://pypi.org/project/iso8601/>`_ parser. Anything else
+(e.g. a fraction of a second with other than 3 or 6 digits, on older
+versions of Python) falls back to the iso8601 parser.
+
+Use :func:`parse_isotime_array` to parse many timestamps at once, e.g. a
+column of ``ISOTime`` values, into a NumPy ``datetime64`` array.
+"""
+
+import datetime
+import warnings
+
+import iso8601
+import numpy as np
+
+UTC = datetime.timezone.utc
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=UTC)
+_ONE_US = datetime.timedelta(microseconds=1)
+
+_fromisoformat = datetime.datetime.fromisoformat
+
+
+def parse_isotime(s, default_timezone=UTC):
+    """Parse an ISO-8601 timestamp.
+
+    Args:
+        s (str): The timestamp. Leading / trailing whitespace is ignored.
+        default_timezone: Timezone assigned to timestamps without a timezone
+            designator. Pass ``None`` to return naive datetimes in that case.
+    Returns:
+        :class:`datetime.datetime`: The parsed timestamp.
+    Raises:
+        ValueError: If the timestamp cannot be parsed.
+    """
+    s = s.strip()
+    # Cheap check that this is a full date and time, in the VOEvent form:
+    if len(s) >= 19 and s[10] == "T":
+        if s[-1] == "Z":
+            s = s[:-1] + "+00:00"
+        try:
+            dt = _fromisoformat(s)
+        except ValueError:
+            pass
+        else:
+            if dt.tzinfo is None and default_timezone is not None:
+                dt = dt.replace(tzinfo=default_timezone)
+            return dt
+    return iso8601.parse_date(s, default_timezone=default_timezone)
+
+
+def format_isotime(dt, utc=True, microseconds=True):
+    """Format a datetime as a VOEvent timestamp.
+
+    Args:
+        dt (:class:`datetime.datetime`): The timestamp.
+        utc (bool): (Default True) Convert timezone-aware datetimes to UTC and
+            omit the timezone designator, as for ``ISOTime``. Naive datetimes
+            are output as-is. If False, timezone-aware datetimes retain their
+            offset.
+        microseconds (bool): (Default True) Include a fraction of a second,
+            when non-zero. If False the fraction is truncated.
+    Returns:
+        str: The formatted timestamp, e.g. ``2016-01-16T07:52:27.080000``.
+    """
+    if utc and dt.tzinfo is not None:
+        dt = dt.astimezone(UTC).replace(tzinfo=None)
+    if not microseconds:
+        dt = dt.replace(microsecond=0)
+    return dt.isoformat()
+
+
+def parse_isotime_array(strings):
+    """Parse a sequence of ISO-8601 timestamps into an array.
+
+    Timestamps without a timezone designator are taken to be UTC; those with
+    one are converted to UTC. Parsing is done by NumPy where possible
+    (i.e. if none has a timezone designator), else timestamp by timestamp.
+
+    Args:
+        strings: Iterable of timestamp strings. ``None`` or empty strings
+            give ``NaT``.
+    Returns:
+        numpy.ndarray: The timestamps, as ``datetime64[us]`` (UTC).
+    Raises:
+        ValueError: If a timestamp cannot be parsed.
+    """
+    strings = list(strings)
+    # NumPy also accepts the words "now", "today" and "NaT" (in any case),
+    # giving times from today on, or NaT - so check the strings of those.
+    today = np.datetime64("today", "us")
+    with warnings.catch_warnings():
+        # NumPy warns when parsing timezone designators (a deprecated
+        # feature) - take the slow path for those.
+        warnings.simplefilter("error")
+        try:
+            result = np.array(strings, dtype="datetime64[us]")
+        except (ValueError, Warning):
+            result = None
+    if result is not None:
+        suspect = np.flatnonzero(np.isnat(result) | (result >= today))
+        if all(not strings[i] or strings[i][0].isdigit() for i in suspect):
+            return result
+    # NB subtracting an aware epoch is much quicker than astimezone(UTC).
+    us = [(parse_isotime(s) - _EPOCH) // _ONE_US if s else 0 for s in strings]
+    result = np.array(us, dtype=np.int64).astype("datetime64[us]")
+    result[[not s for s in strings]] = np.datetime64("NaT")
+    return result
@@ -0,0 +1,160 @@
+"""Resource limits for parsing untrusted packets.
+
+A malformed or malicious packet - megabytes of text, deeply nested or very
+many elements, entity expansion - can tie up a parser for a long time. Pass
+a :class:`ParseLimits` to :py:func:`.loads` or :py:func:`.load` to parse
+with a hardened parser instead::
+
+    try:
+        v = vp.loads(raw_bytes, limits=vp.ParseLimits())
+    except vp.ParseLimitError:
+        ...  # Shed the packet and move on
+
+This parser never resolves entities or fetches anything over the network,
+rejects packets with a document type declaration (which VOEvent packets
+have no need of), and enforces the limits as it goes, feeding the packet
+through an event-driven parser in chunks. So a violation is detected soon
+after the offending part of the packet is reached, rather than after the
+whole packet is parsed.
+
+Each kind of violation raises its own subclass of :class:`ParseLimitError`
+(itself a :py:obj:`ValueError`). Malformed XML still raises
+:py:obj:`lxml.etree.XMLSyntaxError`, as usual.
+"""
+
+import re
+import time
+from collections import namedtuple
+
+from lxml import etree
+
+# Bytes fed to the parser between checks of the time budget:
+_CHUNK_SIZE = 16384
+_encoding_declaration = re.compile(r"\s*<\?xml[^>]*\sencoding\s*=")
+
+
+class ParseLimits(
+    namedtuple(
+        "ParseLimits",
+        "max_bytes max_depth max_elements max_seconds",
+        defaults=(10 * 2**20, 32, 100000, 1.0),
+    )
+):
+    """A namedtuple of limits for parsing a packet.
+
+    Any limit may be set to ``None`` to disable it.
+
+    Attributes:
+        max_bytes (int): (Default=10 MiB) Maximum size of the raw packet.
+        max_depth (int): (Default=32) Maximum nesting depth of elements,
+            counting the root as 1. (Typical packets reach about 8.)
+        max_elements (int): (Default=100000) Maximum number of elements.
+        max_seconds (float): (Default=1.0) Time budget for parsing, in
+            seconds of wall-clock time.
+    """
+
+    pass  # Just wrapping a namedtuple so we can assign a docstring.
+
+
+class ParseLimitError(ValueError):
+    """Base class for violations of :class:`ParseLimits`."""
+
+
+class PacketTooLargeError(ParseLimitError):
+    """The packet exceeds ``max_bytes``."""
+
+
+class PacketTooDeepError(ParseLimitError):
+    """Elements are nested beyond ``max_depth``."""
+
+
+class TooManyElementsError(ParseLimitError):
+    """The packet holds more than ``max_elements`` elements."""
+
+
+class ParseTimeoutError(ParseLimitError):
+    """Parsing took longer than ``max_seconds``."""
+
+
+class DTDForbiddenError(ParseLimitError):
+    """The packet has a document type declaration."""
+
+
+def _make_parser(lookup):
+    parser = etree.XMLPullParser(
+        events=("start", "end"),
+        remove_blank_text=True,
+        resolve_entities=False,
+        no_network=True,
+        load_dtd=False,
+        huge_tree=False,
+    )
+    if lookup is not None:
+        parser.set_element_class_lookup(lookup)
+    return parser
+
+
+def parse_limited(s, limits, lookup=None):
+    """Parse raw XML with a hardened parser, enforcing the given limits.
+
+    Used by :py:func:`.loads` when passed ``limits``.
+
+    Args:
+        s (bytes): Bytes containing raw XML (or any buffer), or a string
+            without an encoding declaration (as for
+            :py:func:`lxml.etree.fromstring`). ``max_bytes`` applies to its
+            UTF-8 encoding.
+        limits (:class:`ParseLimits`): The limits to enforce.
+        lookup: (Default=None) An element class lookup for the parser, e.g.
+            :py:class:`lxml.objectify.ObjectifyElementClassLookup`.
+    Returns:
+        The root element.
+    Raises:
+        ParseLimitError: Or rather a subclass, if a limit is exceeded.
+        lxml.etree.XMLSyntaxError: If the XML is malformed.
+        ValueError: If passed a string with an encoding declaration.
+    """
+    max_bytes, max_depth, max_elements, max_seconds = limits
+    if isinstance(s, str):
+        if _encoding_declaration.match(s):
+            raise ValueError(
+                "Unicode strings with encoding declaration are not supported. "
+                "Please use bytes input."
+            )
+        s = s.encode("utf-8")
+    data = memoryview(s).cast("B")
+    size = len(data)
+    if max_bytes is not None and size > max_bytes:
+        raise PacketTooLargeError(f"Packet exceeds {max_bytes} bytes")
+    if max_seconds is not None:
+        deadline = time.perf_counter() + max_seconds
+    parser = _make_parser(lookup)
+    depth = count = 0
+    checked_dtd = False
+    for offset in range(0, size, _CHUNK_SIZE):
+        error = None
+        try:
+            parser.feed(bytes(data[offset : offset + _CHUNK_SIZE]))
+        except etree.XMLSyntaxError as exc:
+            # Events up to the error are still queued: a limit violation
+            # (which may have provoked libxml2's own limits) takes precedence.
+            error = exc
+        for event, element in parser.read_events():
+            if event == "end":
+                depth -= 1
+                continue
+            depth += 1
+            count += 1
+            if not checked_dtd:
+                if element.getroottree().docinfo.internalDTD is not None:
+                    raise DTDForbiddenError("Document type declarations not allowed")
+                checked_dtd = True
+            if max_depth is not None and depth > max_depth:
+                raise PacketTooDeepError(f"Elements nested beyond depth {max_depth}")
+            if max_elements is not None and count > max_elements:
+                raise TooManyElementsError(f"More than {max_elements} elements")
+        if error is not None:
+            raise error
+        if max_seconds is not None and time.perf_counter() > deadline:
+            raise ParseTimeoutError(f"Parsing took longer than {max_seconds}s")
+    return parser.close()
@@ -25,6 +25,27 @@ class Position2D(namedtuple("Position2D", "ra dec err units system")):
     pass  # Just wrapping a namedtuple so we can assign a docstring.
 
 
+class Trajectory(namedtuple("Trajectory", "time ra dec err units system")):
+    """A namedtuple of arrays, representing a series of timestamped positions,
+    e.g. of a moving object.
+
+    Each field is a :py:class:`numpy.ndarray`, with one element per
+    ObsDataLocation entry. Missing values are represented by ``NaT`` / ``NaN``
+    / ``None``, as appropriate.
+
+    Args:
+        time (numpy.ndarray): Timestamps (``datetime64[us]``, UTC).
+        ra (numpy.ndarray): Right ascensions (``float64``).
+        dec (numpy.ndarray): Declinations (``float64``).
+        err (numpy.ndarray): Error radii (``float64``).
+        units (numpy.ndarray): Co-ordinate units (``object``, i.e. strings).
+        system (numpy.ndarray): Co-ordinate systems (``object``, i.e. strings).
+
+    """
+
+    pass  # Just wrapping a namedtuple so we can assign a docstring.
+
+
 _datatypes_autoconversion = {
     bool: ("string", lambda b: str(b)),
     int: ("int", lambda i: str(i)),
@@ -71,6 +92,18 @@ def param(name, value=None, unit=None, ucd=None, data_type=None, utype=None, ac=
             (NB only supports types listed in _datatypes_autoconversion dict)
 
     """
+    atts = param_attributes(name, value, unit, ucd, data_type, utype, ac)
+    return objectify.Element("Param", attrib=atts)
+
+
+def param_attributes(name, value, unit, ucd, data_type, utype, ac):
+    """The attributes of a Param element, as set by :func:`param`.
+
+    Args:
+        As for :func:`param`, all required.
+    Returns:
+        dict: The attributes, in order.
+    """
     # We use locals() to allow concise looping over the arguments.
     atts = locals()
     atts.pop("ac")
@@ -92,7 +125,7 @@ def param(name, value=None, unit=None, ucd=None, data_type=None, utype=None, ac=
         datatype, func = _datatypes_autoconversion[type(value)]
         atts["dataType"] = datatype
         atts["value"] = func(value)
-    return objectify.Element("Param", attrib=atts)
+    return atts
 
 
 def group(params, name=None, type=None):
@@ -0,0 +1,204 @@
+"""Parsing selected top-level sections of a packet, deferring the rest.
+
+Many consumers only read the root attributes, ``Who`` and ``WhereWhen``,
+yet some packets carry very large ``What`` sections (e.g. light curves, or
+hundreds of Params). :func:`loads_partial` scans the raw bytes for the
+boundaries of each top-level section, without parsing, then parses only
+the requested sections::
+
+    p = loads_partial(raw_bytes, sections=("Who", "WhereWhen"))
+    p.attrib["ivorn"]           # Root attributes are always available
+    p.WhereWhen.ObsDataLocation  # Parsed up-front
+    p.What.Param                 # Parsed now, on first access
+
+Other sections are recorded only as byte ranges of the raw bytes, and are
+parsed (and inserted into the tree in their original position) on first
+access. So parsing time and memory scale with the sections actually used -
+though the raw bytes are retained until all sections are loaded.
+
+The scan uses regular expressions, so has the same caveats as
+:py:mod:`.sniff`: comments, CDATA sections and processing instructions
+between sections are recognised and skipped, but within a section those
+mimicking its end tag may give misleading results. Whitespace and comments between
+top-level sections are dropped.
+"""
+
+import re
+
+from voeventparse.voevent import assert_supported_version, loads
+
+#: Top-level sections loaded by default.
+DEFAULT_SECTIONS = ("Who", "WhereWhen")
+
+_root_start_tag = re.compile(
+    rb"<((?:[A-Za-z_][\w.\-]*:)?VOEvent)\b(?:[^>\"']|\"[^\"]*\"|'[^']*')*?(/?)>"
+)
+_markup = re.compile(
+    rb"<!--.*?-->"
+    rb"|<!\[CDATA\[.*?\]\]>"
+    rb"|<\?.*?\?>"
+    rb"|<(/?)([A-Za-z_][\w.\-]*:)?([A-Za-z_][\w.\-]*)"
+    rb"(?:[^>\"'/]|\"[^\"]*\"|'[^']*'|/(?!>))*(/?)>",
+    re.DOTALL,
+)
+_end_tags = {}
+
+
+def _end_tag(qname):
+    pattern = _end_tags.get(qname)
+    if pattern is None:
+        pattern = _end_tags[qname] = re.compile(
+            b"".join((b"</", re.escape(qname), rb"\s*>"))
+        )
+    return pattern
+
+
+def _scan_sections(s, pos):
+    """Find the byte ranges of the top-level sections.
+
+    Rather than scan every tag, we skip straight to the end tag of each
+    section (top-level sections do not nest elements of the same name).
+
+    Args:
+        s: The raw bytes.
+        pos (int): Offset of the end of the root start tag.
+    Returns:
+        list: (name, start, stop) tuples.
+    """
+    sections = []
+    while True:
+        match = _markup.search(s, pos)
+        if match is None:
+            raise ValueError("Root element is not closed")
+        closing, prefix, name, empty = match.groups()
+        pos = match.end()
+        if name is None:
+            continue  # Comment, CDATA or processing instruction
+        if closing:
+            return sections
+        if not empty:
+            end = _end_tag((prefix or b"") + name).search(s, pos)
+            if end is None:
+                raise ValueError(f"Element {name.decode()} is not closed")
+            pos = end.end()
+        sections.append((name.decode(), match.start(), pos))
+
+
+class PartialVoevent:
+    """A packet with only some of its top-level sections parsed.
+
+    Returned by :func:`loads_partial`. Attribute access is passed through
+    to the underlying (partial) tree, see :attr:`voevent`, with deferred
+    sections parsed on first access.
+
+    Attributes:
+        voevent (:py:class:`Voevent`): The root node of the tree, holding the
+            sections loaded so far.
+        sections (list): (name, start, stop) tuples giving the byte range of
+            each top-level section in the raw bytes, in document order.
+    """
+
+    def __init__(self, s, voevent, sections, loaded, head, tail, parser):
+        self.voevent = voevent
+        self.sections = sections
+        # The raw bytes, until all sections are loaded:
+        self._s = None if all(loaded) else s
+        self._loaded = loaded
+        self._head = head
+        self._tail = tail
+        self._parser = parser
+
+    @property
+    def deferred(self):
+        """Names of the sections not yet loaded, in document order."""
+        return [
+            name for i, (name, _, _) in enumerate(self.sections) if not self._loaded[i]
+        ]
+
+    def load_section(self, name):
+        """Parse any deferred sections with the given name.
+
+        Args:
+            name (str): Section name, e.g. ``'What'``.
+        Returns:
+            bool: True if any sections were loaded.
+        """
+        found = False
+        for i, (section_name, start, stop) in enumerate(self.sections):
+            if section_name != name or self._loaded[i]:
+                continue
+            # Parse within the root start tag, so namespace declarations
+            # are in scope:
+            wrapper = loads(
+                b"".join((self._head, self._s[start:stop], self._tail)),
+                check_version=False,
+                parser=self._parser,
+            )
+            section = next(wrapper.iterchildren())
+            self.voevent.insert(sum(self._loaded[:i]), section)
+            self._loaded[i] = True
+            found = True
+        if all(self._loaded):
+            self._s = None  # Release the raw bytes
+        return found
+
+    def materialize(self):
+        """Load all deferred sections.
+
+        Returns:
+            :py:class:`Voevent`: The root node of the complete tree.
+        """
+        for name in self.deferred:
+            self.load_section(name)
+        return self.voevent
+
+    def __getattr__(self, name):
+        # Only called for names not found on the PartialVoevent itself.
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return getattr(self.voevent, name)
+        except AttributeError:
+            if not self.load_section(name):
+                raise
+        return getattr(self.voevent, name)
+
+
+def loads_partial(s, sections=DEFAULT_SECTIONS, check_version=True, parser=None):
+    """Load a packet from bytes, parsing only the named top-level sections.
+
+    See the module docstring.
+
+    Args:
+        s (bytes): Bytes containing raw XML, as for :py:func:`.loads`.
+        sections: Names of the top-level sections to parse immediately (e.g.
+            ``'Who'``, ``'What'``). Others are deferred until first access.
+        check_version (bool): (Default=True) As for :py:func:`.loads`.
+        parser (lxml.etree.XMLParser): As for :py:func:`.loads`.
+    Returns:
+        :class:`PartialVoevent`: The partially loaded packet.
+    Raises:
+        ValueError: If the root element cannot be found, or for an
+            unsupported schema version (see :py:func:`.loads`).
+    """
+    root_match = _root_start_tag.search(s)
+    if root_match is None:
+        raise ValueError("No VOEvent root element found")
+    head = bytes(s[: root_match.end()])
+    if root_match.group(2):
+        # An empty root element, <VOEvent ... />
+        return PartialVoevent(
+            s, loads(s, check_version, parser), [], [], head, b"", parser
+        )
+    found = _scan_sections(s, root_match.end())
+    tail = b"".join((b"</", root_match.group(1), b">"))
+    loaded = [name in sections for name, _, _ in found]
+    skeleton = b"".join(
+        [head]
+        + [s[start:stop] for (_, start, stop), load in zip(found, loaded) if load]
+        + [tail]
+    )
+    v = loads(skeleton, check_version=False, parser=parser)
+    if check_version:
+        assert_supported_version(v)
+    return PartialVoevent(s, v, found, loaded, head, tail, parser)
@@ -0,0 +1,308 @@
+"""A bounded buffer releasing packets in time order, for out-of-order streams.
+
+Packets relayed by several brokers arrive out of order with respect to the
+times they describe. A :class:`ReorderBuffer` holds packets back until it
+can release them in order of a time key - by default the event time (see
+:py:func:`.get_event_time_as_utc`)::
+
+    buffer = ReorderBuffer(max_delay=30)
+    for v in incoming:
+        for packet in buffer.push(v):
+            process(packet.item)
+    for packet in buffer.flush():
+        process(packet.item)
+
+Packets are released once the *watermark* passes their time. The
+watermark trails the latest time seen so far by ``max_delay`` seconds, the
+disorder allowed for: a packet arriving up to ``max_delay`` behind the
+latest packet is still released in order. A packet arriving further behind
+is *late* - packets after it may already have been released. Late packets
+are released at once, marked as such, or dropped (see the ``late``
+argument). If the stream goes quiet, :meth:`ReorderBuffer.advance` moves the
+watermark on, e.g. per the wall clock.
+
+The buffer may be bounded by ``max_size``; once full, the earliest packet
+is released early and the watermark moved up to it, so that the release
+order is kept.
+
+Insertion and release are O(log n) in the number of packets held (a heap
+ordered by time, then arrival).
+"""
+
+import datetime
+import heapq
+import threading
+from collections import deque, namedtuple
+
+from voeventparse.convenience import find_section, first_child, get_event_time_as_utc
+from voeventparse.instrumentation import QUANTILES, quantile
+from voeventparse.isotime import parse_isotime
+
+
+class ReorderedPacket(namedtuple("ReorderedPacket", "time item late")):
+    """A namedtuple of a packet released by a :class:`ReorderBuffer`.
+
+    Args:
+        time (:class:`datetime.datetime`): The packet's time key, or
+            ``None`` if it had none.
+        item: The item passed to :meth:`ReorderBuffer.push` - by default,
+            the packet itself.
+        late (bool): True if the packet arrived behind the watermark, and so
+            may be out of order.
+    """
+
+    pass  # Just wrapping a namedtuple so we can assign a docstring.
+
+
+class ReorderStats(
+    namedtuple(
+        "ReorderStats",
+        "buffered released late dropped forced untimed watermark "
+        "max_lateness_seconds p50_lateness_seconds p90_lateness_seconds "
+        "p99_lateness_seconds",
+    )
+):
+    """A namedtuple of :class:`ReorderBuffer` counters.
+
+    Args:
+        buffered (int): Number of packets currently held.
+        released (int): Number of packets released (including late and
+            untimed packets).
+        late (int): Number of packets which arrived behind the watermark.
+        dropped (int): Number of late packets dropped.
+        forced (int): Number of packets released early, to respect
+            ``max_size``.
+        untimed (int): Number of packets without a time key, released at
+            once.
+        watermark (:class:`datetime.datetime`): The current watermark, or
+            ``None`` before the first packet.
+        max_lateness_seconds (float): Largest lateness seen.
+        p50_lateness_seconds (float): Median lateness.
+        p90_lateness_seconds (float): 90th percentile lateness.
+        p99_lateness_seconds (float): 99th percentile lateness.
+
+    The *lateness* of a packet is how far its time lags the latest time
+    seen when it arrived (zero for packets arriving in order). Percentiles
+    are calculated over recent packets only, see :class:`ReorderBuffer`; a
+    ``max_delay`` above the p99 lateness releases 99% of packets in order.
+    """
+
+    pass  # Just wrapping a namedtuple so we can assign a docstring.
+
+
+def who_date(voevent):
+    """Return the authoring date of a packet (``Who.Date``) as a datetime.
+
+    Args:
+        voevent (:class:`voeventparse.voevent.Voevent`): Root node of the
+            VOEvent etree.
+    Returns:
+        :class:`datetime.datetime`: The date (timezone aware, UTC if no
+        timezone is given), or ``None`` if absent.
+    """
+    who = find_section(voevent, "Who")
+    if who is None:
+        return None
+    date = first_child(who, "Date")
+    if date is None or not date.text:
+        return None
+    return parse_isotime(date.text)
+
+
+def event_time(voevent):
+    """Return the event time of a packet, or else its authoring date.
+
+    The time key used by :class:`ReorderBuffer` by default. Packets without
+    an event time (e.g. retractions, or other utility packets) are ordered
+    by ``Who.Date`` instead.
+
+    Args:
+        voevent (:class:`voeventparse.voevent.Voevent`): Root node of the
+            VOEvent etree.
+    Returns:
+        :class:`datetime.datetime`: The time, or ``None`` if neither is
+        given.
+    """
+    time = get_event_time_as_utc(voevent)
+    if time is None:
+        return who_date(voevent)
+    return time
+
+
+_keys = {"event_time": event_time, "who_date": who_date}
+
+
+class ReorderBuffer:
+    """Thread-safe buffer releasing packets in time order.
+
+    See the module docstring.
+
+    Args:
+        max_delay (float): Disorder allowed for, in seconds: the watermark
+            trails the latest time seen by this much.
+        key: ``'event_time'`` (the default, see :func:`event_time`),
+            ``'who_date'`` (see :func:`who_date`), or a function from a
+            packet to a timezone-aware datetime (or ``None``).
+        max_size (int): (Default=None) Maximum number of packets held, or
+            ``None`` for no limit.
+        late (str): What to do with late packets: ``'release'`` them at once
+            (the default) or ``'drop'`` them.
+        sample_size (int): (Default=1024) Number of recent packets from
+            which lateness percentiles are calculated.
+    """
+
+    def __init__(
+        self,
+        max_delay,
+        key="event_time",
+        max_size=None,
+        late="release",
+        sample_size=1024,
+    ):
+        if late not in ("release", "drop"):
+            raise ValueError("late must be one of 'release', 'drop'")
+        if isinstance(key, str):
+            if key not in _keys:
+                raise ValueError("key must be one of 'event_time', 'who_date'")
+            key = _keys[key]
+        self.max_delay = datetime.timedelta(seconds=max_delay)
+        self.max_size = max_size
+        self.late = late
+        self._key = key
+        self._heap = []
+        self._seq = 0
+        self._front = None
+        self._watermark = None
+        self._lock = threading.Lock()
+        self._released = 0
+        self._late = 0
+        self._dropped = 0
+        self._forced = 0
+        self._untimed = 0
+        self._max_lateness = 0.0
+        self._samples = deque(maxlen=sample_size)
+
+    def __len__(self):
+        return len(self._heap)
+
+    @property
+    def watermark(self):
+        """The current watermark, or ``None`` before the first packet."""
+        return self._watermark
+
+    def _release_until(self, watermark, released):
+        heap = self._heap
+        while heap and heap[0][0] <= watermark:
+            time, _, item = heapq.heappop(heap)
+            released.append(ReorderedPacket(time, item, False))
+            self._released += 1
+
+    def push(self, voevent, item=None, time=None):
+        """Add a packet, returning any packets it allows to be released.
+
+        Args:
+            voevent: The packet - an objectify tree, or any tree the
+                convenience routines accept.
+            item: (Default=None) The item to release, if not the packet
+                itself - e.g. a tuple of the packet and some context.
+            time (:class:`datetime.datetime`): (Default=None) The packet's
+                time key, if already known. Otherwise, taken from the packet
+                per ``key``.
+        Returns:
+            list: :class:`ReorderedPacket` tuples, in time order (with the
+            exception of a late packet, released at once).
+        """
+        if time is None:
+            time = self._key(voevent)
+        if item is None:
+            item = voevent
+        released = []
+        with self._lock:
+            if time is None:
+                self._untimed += 1
+                self._released += 1
+                return [ReorderedPacket(None, item, False)]
+            if self._front is None or time > self._front:
+                self._front = time
+                lateness = 0.0
+            else:
+                lateness = (self._front - time).total_seconds()
+                self._max_lateness = max(self._max_lateness, lateness)
+            self._samples.append(lateness)
+            if self._watermark is not None and time < self._watermark:
+                self._late += 1
+                if self.late == "drop":
+                    self._dropped += 1
+                    return released
+                self._released += 1
+                return [ReorderedPacket(time, item, True)]
+            heapq.heappush(self._heap, (time, self._seq, item))
+            self._seq += 1
+            watermark = self._front - self.max_delay
+            if self._watermark is None or watermark > self._watermark:
+                self._watermark = watermark
+            self._release_until(self._watermark, released)
+            if self.max_size is not None:
+                while len(self._heap) > self.max_size:
+                    self._watermark = max(self._watermark, self._heap[0][0])
+                    self._forced += 1
+                    self._release_until(self._heap[0][0], released)
+        return released
+
+    def advance(self, watermark):
+        """Move the watermark on, releasing the packets it passes.
+
+        E.g. to release held packets when the stream goes quiet, call
+        periodically with the current time less the expected delivery delay.
+        The watermark never moves back; earlier values are ignored.
+
+        Args:
+            watermark (:class:`datetime.datetime`): The new watermark
+                (timezone aware).
+        Returns:
+            list: The :class:`ReorderedPacket` tuples released, in time order.
+        """
+        released = []
+        with self._lock:
+            if self._watermark is None or watermark > self._watermark:
+                self._watermark = watermark
+            self._release_until(self._watermark, released)
+        return released
+
+    def flush(self):
+        """Release all packets held, in time order.
+
+        The watermark is moved up to the latest packet released, so later
+        arrivals with earlier times are treated as late.
+
+        Returns:
+            list: The :class:`ReorderedPacket` tuples released.
+        """
+        released = []
+        with self._lock:
+            if self._heap:
+                self._watermark = max(
+                    self._watermark, max(entry[0] for entry in self._heap)
+                )
+                self._release_until(self._watermark, released)
+        return released
+
+    def stats(self):
+        """Return the counters and lateness figures.
+
+        Returns:
+            :class:`ReorderStats`: The figures.
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+            return ReorderStats(
+                len(self._heap),
+                self._released,
+                self._late,
+                self._dropped,
+                self._forced,
+                self._untimed,
+                self._watermark,
+                self._max_lateness,
+                *[quantile(samples, q) for q in QUANTILES],
+            )
@@ -0,0 +1,464 @@
+"""A shared-memory ring buffer for fanning packets out to several processes.
+
+Rather than each consumer process (archiver, filter, notifier, ...)
+receiving and parsing its own copy of every packet, a producer stores each
+packet once in a :class:`PacketRing` - a block of shared memory - together
+with a header of pre-extracted summary fields (see :py:mod:`.binary`)::
+
+    ring = PacketRing.create(capacity=64 * 2**20, name="voevents")
+    ring.put(raw_bytes)
+
+Each consumer attaches to the ring by name, and reads through its own
+cursor::
+
+    ring = PacketRing.attach("voevents")
+    consumer = ring.consumer(slot=0)
+    while True:
+        record = consumer.get(timeout=1.0)
+        if record is None:
+            continue
+        if record.header.role == "observation":
+            v = record.voevent()
+
+Records are read in place, without copying: :attr:`RingRecord.header`
+decodes just the summary fields, and :meth:`RingRecord.voevent` parses the
+raw packet bytes only when called.
+
+There is a single producer, and up to ``consumers`` consumers, each using
+its own slot number. When the ring is full, the ``overflow`` policy given
+on creation applies:
+
+* ``'drop_oldest'`` (the default): the oldest records are overwritten,
+  whether or not every consumer has read them. Consumers which fall behind
+  skip ahead, and the records skipped are counted in
+  :attr:`RingConsumer.lost`. A record may be overwritten even while it is
+  being read - check :attr:`RingRecord.valid` after using it, or use
+  :meth:`RingRecord.voevent`, which does so.
+* ``'drop_newest'``: records not yet read by every active consumer are kept,
+  and :meth:`PacketRing.put` drops the new record instead, returning
+  ``False`` (see :attr:`PacketRing.dropped`).
+* ``'block'``: as for ``'drop_newest'``, but :meth:`PacketRing.put` first
+  waits (up to a timeout) for the slowest consumer to catch up.
+
+Under the latter two policies, a record returned by :meth:`RingConsumer.get`
+remains valid until the next call to ``get``.
+
+Consumers wait for new records by polling, with a short sleep, so expect
+latencies of the order of 0.1 ms between ``put`` and ``get``. The ring is
+lock-free: the producer writes each record, then publishes it by advancing
+a shared write position; this relies on 8-byte aligned stores being atomic,
+as they are on all common platforms.
+"""
+
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+from voeventparse import binary
+from voeventparse.voevent import loads
+
+MAGIC = b"VOER"
+FORMAT_VERSION = 1
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+# Shared-memory layout, all integers little-endian:
+#   control:   magic | format version | overflow policy | capacity | slots
+#   counters:  write position | tail position | next seq | dropped
+#   slots:     per consumer: active | cursor | next seq | lost
+#   data:      ``capacity`` bytes of records
+# Positions count bytes written since creation, so never wrap; the offset
+# within the data region is the position modulo the capacity.
+_control = struct.Struct("<4sBBxxQI4x")
+_u64 = struct.Struct("<Q")
+_WRITE_POS = 24
+_TAIL_POS = 32
+_NEXT_SEQ = 40
+_DROPPED = 48
+_SLOTS_START = 64
+_slot = struct.Struct("<QQQQ")
+# Each record: body length (0 marks a skip to the start of the data
+# region) | sequence number | time put (time.monotonic) | body
+_record = struct.Struct("<I4xQd")
+_ALIGN = 8
+
+
+def _aligned(n):
+    return (n + _ALIGN - 1) & ~(_ALIGN - 1)
+
+
+def _open_shm(name, create=False, size=0):
+    # The ring's lifetime is managed explicitly, by PacketRing.unlink - so
+    # opt out of the resource tracker, which would otherwise unlink the
+    # block as soon as any process using it exits.
+    try:
+        return shared_memory.SharedMemory(name, create, size, track=False)
+    except TypeError:  # Python < 3.13
+        shm = shared_memory.SharedMemory(name, create, size)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class RingOverrunError(RuntimeError):
+    """A record was overwritten by the producer while still in use."""
+
+
+class PacketRing:
+    """A ring buffer of packets in shared memory.
+
+    Create with :meth:`create` (in the producer) or :meth:`attach` (in each
+    consumer), rather than directly. See the module docstring.
+
+    Attributes:
+        name (str): The name of the shared-memory block, for :meth:`attach`.
+        capacity (int): Size of the data region, in bytes.
+        slots (int): The number of consumer slots.
+        overflow (str): The overflow policy.
+    """
+
+    def __init__(self, shm):
+        self._shm = shm
+        self._buf = shm.buf
+        magic, version, policy, capacity, slots = _control.unpack_from(self._buf)
+        if magic != MAGIC:
+            raise ValueError("Not a packet ring (bad magic bytes)")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported ring format version: {version}")
+        self.name = shm.name
+        self.capacity = capacity
+        self.slots = slots
+        self.overflow = OVERFLOW_POLICIES[policy]
+        self._data_start = _aligned(_SLOTS_START + slots * _slot.size)
+
+    @classmethod
+    def create(cls, capacity, name=None, consumers=8, overflow="drop_oldest"):
+        """Create a new ring, in a new block of shared memory.
+
+        Args:
+            capacity (int): Size of the data region in bytes. A single
+                record (the packet plus its header) may take up to half of
+                it, so that it fits even when it must skip to the start.
+            name (str): (Default=None) Name of the shared-memory block, or
+                ``None`` for a random name.
+            consumers (int): (Default=8) Number of consumer slots.
+            overflow (str): (Default='drop_oldest') Overflow policy, one of
+                :data:`OVERFLOW_POLICIES` - see the module docstring.
+        Returns:
+            :class:`PacketRing`: The ring. Call :meth:`unlink` when done.
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unrecognised overflow policy: {overflow!r}")
+        capacity = _aligned(capacity)
+        data_start = _aligned(_SLOTS_START + consumers * _slot.size)
+        shm = _open_shm(name, create=True, size=data_start + capacity)
+        shm.buf[:data_start] = bytes(data_start)
+        _control.pack_into(
+            shm.buf,
+            0,
+            MAGIC,
+            FORMAT_VERSION,
+            OVERFLOW_POLICIES.index(overflow),
+            capacity,
+            consumers,
+        )
+        return cls(shm)
+
+    @classmethod
+    def attach(cls, name):
+        """Attach to an existing ring, e.g. in a consumer process.
+
+        Args:
+            name (str): The :attr:`name` of the ring.
+        Returns:
+            :class:`PacketRing`: The ring.
+        """
+        return cls(_open_shm(name))
+
+    def _get(self, offset):
+        return _u64.unpack_from(self._buf, offset)[0]
+
+    def _set(self, offset, value):
+        _u64.pack_into(self._buf, offset, value)
+
+    @property
+    def dropped(self):
+        """The number of records dropped by :meth:`put` when the ring was full."""
+        return self._get(_DROPPED)
+
+    def _slot_offset(self, slot):
+        if not 0 <= slot < self.slots:
+            raise ValueError(f"No such consumer slot: {slot}")
+        return _SLOTS_START + slot * _slot.size
+
+    def _oldest_unread(self, write_pos):
+        """Lowest cursor of the active consumers (write_pos if none)."""
+        oldest = write_pos
+        for slot in range(self.slots):
+            active, cursor, _, _ = _slot.unpack_from(
+                self._buf, _SLOTS_START + slot * _slot.size
+            )
+            if active and cursor < oldest:
+                oldest = cursor
+        return oldest
+
+    def _skip_record(self, pos):
+        """Position of the record after the one at ``pos``."""
+        offset = pos % self.capacity
+        (length,) = struct.unpack_from("<I", self._buf, self._data_start + offset)
+        if length == 0:
+            return pos + self.capacity - offset
+        return pos + _aligned(_record.size + length)
+
+    def _make_room(self, write_pos, needed, timeout):
+        """Advance the tail until ``needed`` bytes are free, if allowed."""
+        tail = self._get(_TAIL_POS)
+        if self.overflow == "drop_oldest":
+            while write_pos + needed - tail > self.capacity:
+                tail = self._skip_record(tail)
+            self._set(_TAIL_POS, tail)
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            # Reclaim everything read by all active consumers:
+            tail = max(tail, self._oldest_unread(write_pos))
+            self._set(_TAIL_POS, tail)
+            if write_pos + needed - tail <= self.capacity:
+                return True
+            if self.overflow == "drop_newest":
+                return False
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.0001)
+
+    def put(self, s, voevent=None, timeout=None):
+        """Store a packet in the ring.
+
+        Args:
+            s (bytes): The raw packet (or any buffer).
+            voevent: (Default=None) The packet, already parsed, from which to
+                extract the header fields. If ``None``, ``s`` is parsed (in
+                the cheaper ``'etree'`` mode).
+            timeout (float): (Default=None) For the ``'block'`` policy, the
+                maximum time to wait for space, in seconds, or ``None`` to
+                wait indefinitely.
+        Returns:
+            bool: True if stored, False if dropped (see the module docstring).
+        Raises:
+            ValueError: If the record exceeds half the ring's capacity.
+        """
+        if voevent is None:
+            voevent = loads(s, check_version=False, mode="etree")
+        flags, header_bytes = binary.pack_header(binary.extract_header(voevent))
+        body = memoryview(s).cast("B")
+        preamble = binary.pack_preamble(flags, len(header_bytes), len(body))
+        length = len(preamble) + len(header_bytes) + len(body)
+        size = _aligned(_record.size + length)
+        # A record skipping to the start of the data region takes up (in
+        # positions) the rest of the region as well, less than its own size:
+        if 2 * size > self.capacity:
+            raise ValueError(f"Record of {size} bytes exceeds half the ring capacity")
+        write_pos = self._get(_WRITE_POS)
+        offset = write_pos % self.capacity
+        # Records are contiguous, skipping to the start if need be:
+        skip = self.capacity - offset if offset + size > self.capacity else 0
+        if not self._make_room(write_pos, skip + size, timeout):
+            self._set(_DROPPED, self.dropped + 1)
+            return False
+        buf = self._buf
+        if skip:
+            struct.pack_into("<I", buf, self._data_start + offset, 0)
+            offset = 0
+        seq = self._get(_NEXT_SEQ)
+        start = self._data_start + offset
+        _record.pack_into(buf, start, length, seq, time.monotonic())
+        start += _record.size
+        for part in (preamble, header_bytes, body):
+            buf[start : start + len(part)] = part
+            start += len(part)
+        self._set(_NEXT_SEQ, seq + 1)
+        # Publish:
+        self._set(_WRITE_POS, write_pos + skip + size)
+        return True
+
+    def consumer(self, slot, from_start=False):
+        """Register a consumer, using the given slot.
+
+        Args:
+            slot (int): Slot number, from 0 to ``slots - 1``, not in use by
+                another consumer.
+            from_start (bool): (Default=False) Start from the oldest record
+                available, rather than the next record to be put.
+        Returns:
+            :class:`RingConsumer`: The consumer.
+        """
+        offset = self._slot_offset(slot)
+        if self._get(offset):
+            raise ValueError(f"Consumer slot {slot} is in use")
+        return RingConsumer(self, slot, offset, from_start)
+
+    def close(self):
+        """Detach from the shared memory (without destroying it).
+
+        Any records still referenced must be released first.
+        """
+        self._buf = None
+        self._shm.close()
+
+    def unlink(self):
+        """Destroy the shared memory, once all processes are done with it."""
+        if not hasattr(self._shm, "_track"):  # Python < 3.13
+            # Balance the unregister call made by unlink():
+            resource_tracker.register(self._shm._name, "shared_memory")
+        self._shm.unlink()
+
+
+class RingRecord:
+    """A packet read from a :class:`PacketRing`, in place.
+
+    Attributes:
+        seq (int): Sequence number, counting from 0 for the first packet put.
+        put_time (float): When the packet was put, per :py:func:`time.monotonic`.
+        data (memoryview): The record, in the :py:mod:`.binary` format (with
+            the raw packet as an uncompressed body).
+    """
+
+    def __init__(self, ring, pos, seq, put_time, data):
+        self._ring = ring
+        self._pos = pos
+        self.seq = seq
+        self.put_time = put_time
+        self.data = data
+        self._header = None
+
+    @property
+    def valid(self):
+        """False if the record has since been overwritten by the producer."""
+        return self._ring._get(_TAIL_POS) <= self._pos
+
+    def _check(self):
+        if not self.valid:
+            raise RingOverrunError(f"Record {self.seq} was overwritten")
+
+    @property
+    def header(self):
+        """The :py:class:`.PacketHeader` of summary fields (decoded once)."""
+        if self._header is None:
+            header = binary.decode_header(self.data)
+            self._check()
+            self._header = header
+        return self._header
+
+    @property
+    def raw(self):
+        """The raw packet bytes, as a memoryview into the ring."""
+        return binary.stored_body(self.data)[1]
+
+    def voevent(self, **kwargs):
+        """Parse the packet.
+
+        Args:
+            **kwargs: Passed on to :py:func:`.loads`.
+        Returns:
+            :py:class:`Voevent`: Root node of the packet.
+        Raises:
+            RingOverrunError: If the record was overwritten during parsing.
+        """
+        v = loads(self.raw, **kwargs)
+        self._check()
+        return v
+
+
+class RingConsumer:
+    """Reads records from a :class:`PacketRing`, via :meth:`PacketRing.consumer`.
+
+    Attributes:
+        slot (int): The consumer slot in use.
+    """
+
+    def __init__(self, ring, slot, offset, from_start):
+        self._ring = ring
+        self.slot = slot
+        self._offset = offset
+        write_pos = ring._get(_WRITE_POS)
+        next_seq = ring._get(_NEXT_SEQ)
+        if from_start:
+            cursor = ring._get(_TAIL_POS)
+            next_seq = self._seq_at(cursor, write_pos, next_seq)
+        else:
+            cursor = write_pos
+        # The position of the next record to read. The cursor in the slot
+        # is that of the oldest record still in use (the last one returned).
+        self._cursor = cursor
+        self._next_seq = next_seq
+        self._lost = 0
+        _slot.pack_into(ring._buf, offset, 1, cursor, next_seq, 0)
+
+    def _seq_at(self, cursor, write_pos, default):
+        """Sequence number of the record at ``cursor``."""
+        ring = self._ring
+        while cursor < write_pos:
+            offset = ring._data_start + cursor % ring.capacity
+            length, seq, _ = _record.unpack_from(ring._buf, offset)
+            if length:
+                return seq
+            cursor = ring._skip_record(cursor)
+        return default
+
+    @property
+    def lost(self):
+        """The number of records overwritten before this consumer read them."""
+        return self._lost
+
+    @property
+    def backlog(self):
+        """Bytes of records put but not yet read by this consumer."""
+        return self._ring._get(_WRITE_POS) - self._cursor
+
+    def get(self, timeout=0):
+        """Read the next record.
+
+        Args:
+            timeout (float): (Default=0) Time to wait for a record, in
+                seconds, or ``None`` to wait indefinitely.
+        Returns:
+            :class:`RingRecord`: The record, or ``None`` on timeout.
+        """
+        ring = self._ring
+        buf = ring._buf
+        # Release the previous record:
+        _slot.pack_into(buf, self._offset, 1, self._cursor, self._next_seq, self._lost)
+        deadline = None
+        delay = 0.00001
+        while True:
+            cursor = self._cursor
+            write_pos = ring._get(_WRITE_POS)
+            if cursor < ring._get(_TAIL_POS):
+                # Overwritten before we got to it:
+                cursor = self._cursor = ring._get(_TAIL_POS)
+            if cursor < write_pos:
+                offset = ring._data_start + cursor % ring.capacity
+                length, seq, put_time = _record.unpack_from(buf, offset)
+                if ring._get(_TAIL_POS) > cursor:
+                    continue  # Overwritten while reading the record header
+                if length == 0:
+                    self._cursor = ring._skip_record(cursor)
+                    continue
+                self._lost += seq - self._next_seq
+                self._next_seq = seq + 1
+                self._cursor = cursor + _aligned(_record.size + length)
+                # Hold on to the record until the next call:
+                _slot.pack_into(buf, self._offset, 1, cursor, seq + 1, self._lost)
+                start = offset + _record.size
+                return RingRecord(
+                    ring, cursor, seq, put_time, buf[start : start + length]
+                )
+            if timeout is not None:
+                if deadline is None:
+                    deadline = time.monotonic() + timeout
+                if time.monotonic() >= deadline:
+                    return None
+            time.sleep(delay)
+            delay = min(delay * 2, 0.0005)
+
+    def close(self):
+        """Release the consumer slot."""
+        _slot.pack_into(self._ring._buf, self._offset, 0, 0, 0, 0)
@@ -0,0 +1,365 @@
+"""A priority queue of raw packets, for processing urgent packets first.
+
+In a burst of traffic, a first-in-first-out queue delays urgent packets
+behind test and utility traffic. A :class:`PacketQueue` instead dispatches
+packets in priority order, determined from cheap keys extracted from the
+raw bytes without parsing (see :py:mod:`.sniff` and
+:func:`sniff_priority_keys`)::
+
+    queue = PacketQueue(max_size=10000)
+    queue.put(raw_bytes)            # E.g. in the ingest thread
+    ...
+    packet = queue.get(timeout=1)   # E.g. in a worker thread
+    v = vp.loads(packet.item)
+
+Each packet is assigned a priority class by a ``classify`` function -
+by default :func:`default_classify`, which uses the role, and puts
+retractions first. Classes are dispatched strictly in the order given by
+``classes``. Within a class, packets are ordered by stream (per the
+optional ``stream_ranks``), then by decreasing ``Why@importance``, then
+first-come first-served.
+
+With a ``max_size``, low-priority packets are shed under load: a packet
+whose class has a *shed level* (by default, ``test`` packets once the queue
+is half full, ``utility`` packets once it is 80% full) is refused once the
+queue is filled to that level. And once the queue is full, a new packet
+displaces the lowest-priority packet queued, if it outranks it; otherwise
+it is refused.
+
+Queueing, dispatch and displacement are O(log n) in the number of packets
+queued (a heap per class - and for a bounded queue, a second heap in
+reverse order).
+
+The time spent queued is recorded per class, see :meth:`PacketQueue.stats`.
+"""
+
+import heapq
+import threading
+import time
+from collections import deque, namedtuple
+
+from voeventparse.instrumentation import QUANTILES, quantile
+from voeventparse.sniff import sniff_cite_types, sniff_importance, sniff_root_attributes
+
+#: Default priority classes, most urgent first.
+DEFAULT_CLASSES = ("retraction", "observation", "prediction", "utility", "test")
+
+#: Default shed levels, as fractions of ``max_size``.
+DEFAULT_SHED_LEVELS = {"test": 0.5, "utility": 0.8}
+
+
+class PriorityKeys(
+    namedtuple("PriorityKeys", "ivorn role stream importance cite_types")
+):
+    """A namedtuple of the fields of a packet used to prioritise it.
+
+    Args:
+        ivorn (str): The IVORN, or ``None``.
+        role (str): The role, or ``None``.
+        stream (str): The IVORN up to the ``#``, e.g.
+            ``'ivo://nasa.gsfc.gcn/SWIFT'``, or ``None``.
+        importance (float): The ``importance`` of the Why element, or
+            ``None``.
+        cite_types (list): The ``cite`` attribute of each EventIVORN.
+    """
+
+    pass  # Just wrapping a namedtuple so we can assign a docstring.
+
+
+class QueuedPacket(namedtuple("QueuedPacket", "item keys priority_class queued_at")):
+    """A namedtuple of a packet taken from a :class:`PacketQueue`.
+
+    Args:
+        item: The item passed to :meth:`PacketQueue.put` - by default, the
+            raw packet bytes.
+        keys (:class:`PriorityKeys`): The packet's priority keys.
+        priority_class (str): The packet's priority class.
+        queued_at (float): When the packet was queued, per
+            :py:func:`time.monotonic`.
+    """
+
+    pass  # Just wrapping a namedtuple so we can assign a docstring.
+
+
+class ClassStats(
+    namedtuple(
+        "ClassStats",
+        "queued dispatched shed total_wait_seconds p50_seconds p90_seconds p99_seconds",
+    )
+):
+    """A namedtuple of the figures recorded for one priority class.
+
+    Args:
+        queued (int): Number of packets currently queued.
+        dispatched (int): Number of packets taken by :meth:`PacketQueue.get`.
+        shed (int): Number of packets refused or displaced under load.
+        total_wait_seconds (float): Cumulative time dispatched packets spent
+            queued.
+        p50_seconds (float): Median time queued.
+        p90_seconds (float): 90th percentile time queued.
+        p99_seconds (float): 99th percentile time queued.
+
+    Percentiles are calculated over the most recently dispatched packets
+    only, see :class:`PacketQueue`.
+    """
+
+    pass  # Just wrapping a namedtuple so we can assign a docstring.
+
+
+def sniff_priority_keys(s):
+    """Extract the priority keys of a packet from raw bytes, without parsing.
+
+    Args:
+        s (bytes): Bytes containing raw XML (or any buffer).
+    Returns:
+        :class:`PriorityKeys`: The keys.
+    """
+    attrib = sniff_root_attributes(s)
+    ivorn = attrib.get("ivorn")
+    stream = None if ivorn is None else ivorn.partition("#")[0]
+    return PriorityKeys(
+        ivorn=ivorn,
+        role=attrib.get("role"),
+        stream=stream,
+        importance=sniff_importance(s),
+        cite_types=sniff_cite_types(s),
+    )
+
+
+def default_classify(keys):
+    """The default priority classification.
+
+    Retractions come first (whatever their role), then packets are
+    classed by role. Packets of unknown role are classed as ``utility``.
+
+    Args:
+        keys (:class:`PriorityKeys`): The packet's keys.
+    Returns:
+        str: One of :data:`DEFAULT_CLASSES`.
+    """
+    if "retraction" in keys.cite_types:
+        return "retraction"
+    if keys.role in ("observation", "prediction", "test"):
+        return keys.role
+    return "utility"
+
+
+class _Class:
+    """The packets queued in one priority class, and its figures.
+
+    Entries are held in a min-heap, for dispatch, and - if the queue is
+    bounded - a max-heap, for displacement. An entry taken from one heap is
+    left in the other (its sequence number dropped from ``live``), and
+    skipped once it surfaces - or the heaps are compacted, once mostly made
+    up of such entries.
+    """
+
+    def __init__(self, sample_size, bounded):
+        self.heap = []
+        self.reverse = [] if bounded else None
+        self.live = set()
+        self.size = 0
+        self.dispatched = 0
+        self.shed = 0
+        self.total_wait_seconds = 0.0
+        self.samples = deque(maxlen=sample_size)
+
+    def push(self, entry):
+        self.size += 1
+        heapq.heappush(self.heap, entry)
+        if self.reverse is not None:
+            rank, importance, seq, _ = entry
+            heapq.heappush(self.reverse, (-rank, -importance, -seq, entry))
+            self.live.add(seq)
+
+    def pop(self):
+        """Remove and return the highest-priority entry (there must be one)."""
+        self.size -= 1
+        if self.reverse is None:
+            return heapq.heappop(self.heap)
+        while True:
+            entry = heapq.heappop(self.heap)
+            if entry[2] in self.live:
+                self._remove(entry[2])
+                return entry
+
+    def worst(self):
+        """The lowest-priority entry, or ``None`` if there are none."""
+        reverse = self.reverse
+        while reverse and reverse[0][-1][2] not in self.live:
+            heapq.heappop(reverse)
+        return reverse[0][-1] if reverse else None
+
+    def pop_worst(self):
+        """Remove and return the lowest-priority entry (there must be one)."""
+        entry = self.worst()
+        heapq.heappop(self.reverse)
+        self.size -= 1
+        self._remove(entry[2])
+        return entry
+
+    def _remove(self, seq):
+        live = self.live
+        live.remove(seq)
+        if len(self.heap) + len(self.reverse) > 4 * len(live) + 64:
+            self.heap = [entry for entry in self.heap if entry[2] in live]
+            self.reverse = [entry for entry in self.reverse if entry[-1][2] in live]
+            heapq.heapify(self.heap)
+            heapq.heapify(self.reverse)
+
+
+class PacketQueue:
+    """A thread-safe priority queue of raw packets.
+
+    See the module docstring.
+
+    Args:
+        classes: Names of the priority classes, most urgent first.
+        classify: Function from :class:`PriorityKeys` to a class name, one
+            of ``classes``.
+        stream_ranks (dict): Optional mapping of IVORN prefix (e.g.
+            ``'ivo://nasa.gsfc.gcn/SWIFT'``) to rank, ordering packets within
+            each class - lower ranks first. Packets matching no prefix have
+            rank 0.
+        max_size (int): (Default=None) Maximum number of packets queued (at
+            least 1), or ``None`` for no limit (and no load shedding).
+        shed_levels (dict): Mapping of class name to the fraction of
+            ``max_size`` at which new packets of that class are refused.
+            Defaults to :data:`DEFAULT_SHED_LEVELS`.
+        sample_size (int): (Default=1024) Number of recent waiting times per
+            class from which percentiles are calculated.
+    """
+
+    def __init__(
+        self,
+        classes=DEFAULT_CLASSES,
+        classify=default_classify,
+        stream_ranks=None,
+        max_size=None,
+        shed_levels=None,
+        sample_size=1024,
+    ):
+        if max_size is not None and max_size < 1:
+            raise ValueError(f"max_size must be at least 1, got {max_size}")
+        self.classes = tuple(classes)
+        self._rank = {name: i for i, name in enumerate(self.classes)}
+        self._classify = classify
+        self._stream_ranks = sorted(
+            (stream_ranks or {}).items(), key=lambda item: -len(item[0])
+        )
+        self.max_size = max_size
+        if shed_levels is None:
+            shed_levels = DEFAULT_SHED_LEVELS
+        self._shed_sizes = {}
+        if max_size is not None:
+            self._shed_sizes = {
+                name: level * max_size for name, level in shed_levels.items()
+            }
+        self._classes = [
+            _Class(sample_size, max_size is not None) for _ in self.classes
+        ]
+        self._size = 0
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        return self._size
+
+    def _stream_rank(self, ivorn):
+        if ivorn is not None:
+            # Longest prefixes first:
+            for prefix, rank in self._stream_ranks:
+                if ivorn.startswith(prefix):
+                    return rank
+        return 0
+
+    def _worst(self):
+        """The class index and entry of the lowest-priority packet queued."""
+        for index in range(len(self._classes) - 1, -1, -1):
+            worst = self._classes[index].worst()
+            if worst is not None:
+                return index, worst
+        return None, None
+
+    def put(self, s, item=None, keys=None):
+        """Queue a packet.
+
+        Args:
+            s (bytes): The raw packet (or any buffer).
+            item: (Default=None) The item to return from :meth:`get`, if not
+                the raw packet itself - e.g. a tuple of the packet and some
+                context.
+            keys (:class:`PriorityKeys`): (Default=None) The packet's keys,
+                if already known. Otherwise, sniffed from ``s``.
+        Returns:
+            bool: True if queued, False if shed.
+        """
+        if keys is None:
+            keys = sniff_priority_keys(s)
+        name = self._classify(keys)
+        index = self._rank[name]
+        importance = keys.importance if keys.importance is not None else 0.0
+        queued_at = time.monotonic()
+        packet = QueuedPacket(s if item is None else item, keys, name, queued_at)
+        with self._cond:
+            shed_size = self._shed_sizes.get(name)
+            if shed_size is not None and self._size >= shed_size:
+                self._classes[index].shed += 1
+                return False
+            entry = (self._stream_rank(keys.ivorn), -importance, self._seq, packet)
+            self._seq += 1
+            if self.max_size is not None and self._size >= self.max_size:
+                worst_index, worst = self._worst()
+                if (worst_index, worst) < (index, entry):
+                    self._classes[index].shed += 1
+                    return False
+                worst_class = self._classes[worst_index]
+                worst_class.pop_worst()
+                worst_class.shed += 1
+                self._size -= 1
+            self._classes[index].push(entry)
+            self._size += 1
+            self._cond.notify()
+        return True
+
+    def get(self, timeout=None):
+        """Take the highest-priority packet from the queue.
+
+        Args:
+            timeout (float): (Default=None) Time to wait for a packet, in
+                seconds, or ``None`` to wait indefinitely.
+        Returns:
+            :class:`QueuedPacket`: The packet, or ``None`` on timeout.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._size, timeout):
+                return None
+            for cls in self._classes:
+                if cls.size:
+                    break
+            packet = cls.pop()[-1]
+            self._size -= 1
+            wait = time.monotonic() - packet.queued_at
+            cls.dispatched += 1
+            cls.total_wait_seconds += wait
+            cls.samples.append(wait)
+        return packet
+
+    def stats(self):
+        """Return the figures recorded for each priority class.
+
+        Returns:
+            dict: Mapping of class name to :class:`ClassStats`.
+        """
+        result = {}
+        with self._cond:
+            for name, cls in zip(self.classes, self._classes):
+                samples = sorted(cls.samples)
+                result[name] = ClassStats(
+                    cls.size,
+                    cls.dispatched,
+                    cls.shed,
+                    cls.total_wait_seconds,
+                    *[quantile(samples, q) for q in QUANTILES],
+                )
+        return result
@@ -0,0 +1,96 @@
+"""Cheap extraction of header values from raw packet bytes, without parsing.
+
+These routines use regular expressions on the raw XML and so are far faster
+than a full :py:func:`.loads`, at the expense of robustness: they are
+intended for routing and caching decisions, not as a substitute for proper
+parsing. Comments or CDATA sections mimicking the markup being searched for
+may give misleading results.
+"""
+
+import re
+from xml.sax.saxutils import unescape
+
+# The root start-tag normally appears within the first few hundred bytes,
+# after the XML declaration and possibly a comment or two.
+_SNIFF_LIMIT = 4096
+
+_root_start_tag = re.compile(rb"<(?:[A-Za-z_][\w.\-]*:)?VOEvent\b([^>]*)>")
+_attribute = re.compile(rb"""([A-Za-z_][\w.:\-]*)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+_xml_entities = {"&quot;": '"', "&apos;": "'"}
+_why_start_tag = re.compile(rb"<(?:[A-Za-z_][\w.\-]*:)?Why\b([^>]*)>")
+_event_ivorn_start_tag = re.compile(rb"<(?:[A-Za-z_][\w.\-]*:)?EventIVORN\b([^>]*)>")
+
+
+def _parse_attributes(attr_bytes):
+    attrib = {}
+    for match in _attribute.finditer(attr_bytes):
+        value = match.group(2) if match.group(2) is not None else match.group(3)
+        attrib[match.group(1).decode("utf-8")] = unescape(
+            value.decode("utf-8"), _xml_entities
+        )
+    return attrib
+
+
+def sniff_root_attributes(s):
+    """Extract the attributes of the VOEvent root element from raw bytes.
+
+    Args:
+        s (bytes): Bytes containing raw XML (or any buffer).
+    Returns:
+        dict: Mapping of attribute name to value, e.g. ``{'ivorn': ...,
+        'role': ..., 'version': ...}``. Namespace declarations are included
+        under their literal names (e.g. ``xmlns:voe``). Empty if no root
+        element was found.
+    """
+    match = _root_start_tag.search(s, 0, _SNIFF_LIMIT)
+    if match is None:
+        match = _root_start_tag.search(s)
+    if match is None:
+        return {}
+    return _parse_attributes(match.group(1))
+
+
+def sniff_ivorn(s):
+    """Extract the IVORN of a packet from raw bytes.
+
+    Args:
+        s (bytes): Bytes containing raw XML (or any buffer).
+    Returns:
+        str: The IVORN, or ``None`` if not found.
+    """
+    return sniff_root_attributes(s).get("ivorn")
+
+
+def sniff_importance(s):
+    """Extract the ``importance`` attribute of the Why element from raw bytes.
+
+    Args:
+        s (bytes): Bytes containing raw XML (or any buffer).
+    Returns:
+        float: The importance, or ``None`` if there is no Why element, or it
+        has no (valid) importance.
+    """
+    match = _why_start_tag.search(s)
+    if match is None:
+        return None
+    importance = _parse_attributes(match.group(1)).get("importance")
+    try:
+        return float(importance)
+    except (TypeError, ValueError):
+        return None
+
+
+def sniff_cite_types(s):
+    """Extract the citation types of a packet from raw bytes.
+
+    Args:
+        s (bytes): Bytes containing raw XML (or any buffer).
+    Returns:
+        list: The ``cite`` attribute of each EventIVORN element (e.g.
+        ``'followup'``, ``'supersedes'``, ``'retraction'``), in document
+        order.
+    """
+    return [
+        _parse_attributes(match.group(1)).get("cite")
+        for match in _event_ivorn_start_tag.finditer(s)
+    ]
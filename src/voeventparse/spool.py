@@ -0,0 +1,383 @@
+"""Ingest of packets dropped into a spool directory, using Linux inotify.
+
+Rather than poll a directory for new ``.xml`` files, a :class:`SpoolWatcher`
+asks the kernel (via inotify) to report files as they are closed after
+writing, or moved into the directory. Files are gathered into batches,
+loaded (and optionally validated) - in parallel, given ``processes`` - and
+once each batch has been handled, moved out of the spool::
+
+    with SpoolWatcher('/var/spool/voevent', done_dir='/var/spool/done') as w:
+        for batch in w.batches():
+            for result in batch:
+                if result.error is None:
+                    process(result.voevent)
+
+Files already in the spool on start-up are picked up first.
+
+Files should be written elsewhere (on the same filesystem), or under a name
+without the suffix, and then renamed into place. A file written in place
+is picked up once closed - but a scan of the spool (on start-up, or after
+the kernel's queue of inotify events overflows) may pick it up while still
+being written.
+
+A batch's files are moved (to ``done_dir``, or ``failed_dir`` for those
+which could not be loaded or failed validation) when the next batch is
+requested, so a crash while handling a batch leaves its files in the spool,
+to be picked up again on restart. Each file is moved by a hard link into
+the destination, then removed from the spool, so the spool and destination
+directories must be on the same filesystem. A file of the same name already
+in the destination is not replaced; the new one is given a numbered name
+instead, e.g. ``a.1.xml``. If a file was replaced in the spool while its
+batch was being handled, the new file is left in the spool, and handled in
+a later batch.
+
+Before moving a batch, its file names are written to a checkpoint file,
+removed once the moves are complete; on start-up, any files listed in a
+remaining checkpoint but still in the spool (i.e. the moves were
+interrupted) are moved without being processed again.
+
+Linux only - the watcher calls the C library's inotify functions via
+:py:mod:`ctypes`.
+"""
+
+import contextlib
+import ctypes
+import multiprocessing
+import os
+import select
+import struct
+import sys
+import time
+from collections import deque, namedtuple
+
+from lxml import etree
+
+from voeventparse.voevent import load
+
+# From <sys/inotify.h>:
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_Q_OVERFLOW = 0x00004000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_event_header = struct.Struct("iIII")
+
+
+class SpoolResult(namedtuple("SpoolResult", "path voevent error")):
+    """A namedtuple of a file picked up by a :class:`SpoolWatcher`.
+
+    Args:
+        path (str): Path of the file in the spool directory (it is moved out
+            of the spool once its batch is handled).
+        voevent (:py:class:`.Voevent`): The loaded packet, or ``None`` on
+            error.
+        error (str): Description of why the file could not be loaded or
+            failed validation, or ``None``.
+    """
+
+    pass  # Just wrapping a namedtuple so we can assign a docstring.
+
+
+class _Inotify:
+    """Minimal wrapper of an inotify file descriptor watching one directory."""
+
+    def __init__(self, path, mask):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, os.strerror(errno), path)
+        self._poll = select.poll()
+        self._poll.register(self.fd, select.POLLIN)
+
+    def read(self, timeout):
+        """Wait up to ``timeout`` seconds for events.
+
+        Returns:
+            list: ``(mask, name)`` pairs, empty on timeout.
+        """
+        if not self._poll.poll(None if timeout is None else timeout * 1000):
+            return []
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = _event_header.unpack_from(data, offset)
+                offset += _event_header.size
+                name = data[offset : offset + length].split(b"\0", 1)[0]
+                offset += length
+                events.append((mask, os.fsdecode(name)))
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def _load_file(args):
+    path, check_version, limits, validate = args
+    try:
+        with open(path, "rb") as f:
+            v = load(f, check_version, limits=limits)
+    except (OSError, ValueError, etree.XMLSyntaxError) as e:
+        # Errors are returned as strings, since not all exceptions survive
+        # pickling.
+        return SpoolResult(path, None, f"{type(e).__name__}: {e}")
+    if validate is not None:
+        try:
+            valid = validate(v)
+        except Exception as e:
+            return SpoolResult(path, None, f"{type(e).__name__}: {e}")
+        if not valid:
+            return SpoolResult(path, None, "failed validation")
+    return SpoolResult(path, v, None)
+
+
+def _identity(path):
+    """The identity of a file, changed if it is replaced or rewritten."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _move(path, dest_dir, name):
+    """Move a file into ``dest_dir``, numbering its name if already taken."""
+    root, ext = os.path.splitext(name)
+    target = os.path.join(dest_dir, name)
+    n = 0
+    while True:
+        try:
+            os.link(path, target)
+            break
+        except FileExistsError:
+            if os.path.samefile(path, target):
+                break  # Linked before an interruption
+        n += 1
+        target = os.path.join(dest_dir, f"{root}.{n}{ext}")
+    os.remove(path)
+
+
+def _fsync_dir(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class SpoolWatcher:
+    """Watches a spool directory for packet files, loading them in batches.
+
+    See the module docstring.
+
+    Args:
+        path (str): The spool directory.
+        done_dir (str): Directory to which handled files are moved.
+        failed_dir (str): (Default=None) Directory to which files which could
+            not be loaded, or failed validation, are moved. Defaults to
+            ``done_dir``.
+        suffix (str): Only filenames ending with this suffix are picked up.
+        batch_size (int): (Default=64) Maximum number of files per batch.
+        batch_delay (float): (Default=0.01) Once a file arrives, time to wait
+            for more to fill the batch, in seconds.
+        processes (int): (Default 1) Number of worker processes loading
+            files. If greater than one, batches are spread across a
+            :py:class:`multiprocessing.Pool` (and the loaded packets pickled
+            back). ``None`` uses as many processes as there are CPUs.
+        check_version (bool): (Default=True) Passed on to :py:func:`.load`.
+        limits (:py:class:`.ParseLimits`): (Default=None) Passed on to
+            :py:func:`.load`.
+        validate: Optional callable, taking a packet and returning False if
+            it should be rejected, e.g. :py:func:`.valid_as_v2_0` or
+            :py:meth:`.TieredValidator.validate`. Files for which it raises
+            an exception are rejected likewise. Must be picklable if
+            ``processes`` is not 1.
+        checkpoint (str): (Default=None) Path of the checkpoint file.
+            Defaults to ``.spool-checkpoint`` in ``done_dir``.
+    """
+
+    def __init__(
+        self,
+        path,
+        done_dir,
+        failed_dir=None,
+        suffix=".xml",
+        batch_size=64,
+        batch_delay=0.01,
+        processes=1,
+        check_version=True,
+        limits=None,
+        validate=None,
+        checkpoint=None,
+    ):
+        self.path = path
+        self.done_dir = done_dir
+        self.failed_dir = failed_dir if failed_dir is not None else done_dir
+        self.suffix = suffix
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.check_version = check_version
+        self.limits = limits
+        self.validate = validate
+        if checkpoint is None:
+            checkpoint = os.path.join(done_dir, ".spool-checkpoint")
+        self.checkpoint = checkpoint
+        #: Number of files handled (moved out of the spool). A file replaced
+        #: while being handled is counted once, when its replacement is.
+        self.processed = 0
+        #: Number of files moved to ``failed_dir``.
+        self.failed = 0
+        #: Number of batches handled.
+        self.batch_count = 0
+        self._queue = deque()
+        self._queued = set()
+        self._recover()
+        # Watch before scanning, so that no file is missed in between:
+        self._inotify = _Inotify(path, _IN_CLOSE_WRITE | _IN_MOVED_TO)
+        self._scan()
+        self._pool = None
+        if processes != 1:
+            self._pool = multiprocessing.Pool(processes)
+
+    def _recover(self):
+        """Complete the moves of a batch interrupted by a crash."""
+        try:
+            with open(self.checkpoint) as f:
+                entries = [line.rstrip("\n").split("\t", 1) for line in f]
+        except FileNotFoundError:
+            return
+        for dest, name in entries:
+            with contextlib.suppress(FileNotFoundError):
+                _move(os.path.join(self.path, name), dest, name)
+        os.remove(self.checkpoint)
+
+    def _enqueue(self, name):
+        if name.endswith(self.suffix) and name not in self._queued:
+            self._queued.add(name)
+            self._queue.append(name)
+
+    def _scan(self):
+        for name in sorted(os.listdir(self.path)):
+            if os.path.isfile(os.path.join(self.path, name)):
+                self._enqueue(name)
+
+    def _wait(self, timeout):
+        for mask, name in self._inotify.read(timeout):
+            if mask & _IN_Q_OVERFLOW:
+                # Events were lost:
+                self._scan()
+            elif name:
+                self._enqueue(name)
+
+    def _next_batch(self, timeout):
+        # Events for other files (e.g. without the suffix) may arrive first:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._queue:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return []
+            self._wait(remaining)
+        deadline = time.monotonic() + self.batch_delay
+        while len(self._queue) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._wait(remaining)
+        n = min(self.batch_size, len(self._queue))
+        return [self._queue.popleft() for _ in range(n)]
+
+    def _load(self, names):
+        args = [
+            (
+                os.path.join(self.path, name),
+                self.check_version,
+                self.limits,
+                self.validate,
+            )
+            for name in names
+        ]
+        if self._pool is None:
+            return [_load_file(a) for a in args]
+        return self._pool.map(_load_file, args)
+
+    def _commit(self, names, identities, results):
+        moves = []
+        n_failed = 0
+        for name, identity, result in zip(names, identities, results):
+            current = _identity(os.path.join(self.path, name))
+            if current is not None and current != identity:
+                # Replaced since loaded, so handle the new file in turn:
+                self._queue.append(name)
+                continue
+            if result.error is None:
+                dest = self.done_dir
+            else:
+                dest = self.failed_dir
+                n_failed += 1
+            moves.append((dest, name))
+        tmp = self.checkpoint + ".tmp"
+        with open(tmp, "w") as f:
+            f.writelines(f"{dest}\t{name}\n" for dest, name in moves)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint)
+        for dest, name in moves:
+            with contextlib.suppress(FileNotFoundError):
+                _move(os.path.join(self.path, name), dest, name)
+            self._queued.discard(name)
+        # Make the moves durable before dropping the checkpoint:
+        for path in {self.path, self.done_dir, self.failed_dir}:
+            _fsync_dir(path)
+        os.remove(self.checkpoint)
+        self.processed += len(moves)
+        self.failed += n_failed
+        self.batch_count += 1
+
+    def batches(self, timeout=None):
+        """Generate batches of files as they arrive.
+
+        Each batch is moved out of the spool when the next is requested, or
+        when the generator finishes. If the loop over batches is broken off
+        (or raises), the files of the current batch are left in the spool.
+
+        Args:
+            timeout (float): (Default=None) Finish once no file has arrived
+                for this many seconds. ``None`` waits indefinitely.
+        Yields:
+            list: Up to ``batch_size`` :class:`SpoolResult` tuples, in order
+            of arrival.
+        """
+        while True:
+            names = self._next_batch(timeout)
+            if not names:
+                return
+            identities = [_identity(os.path.join(self.path, name)) for name in names]
+            results = self._load(names)
+            yield results
+            self._commit(names, identities, results)
+
+    def close(self):
+        """Stop watching, and shut down any worker processes."""
+        self._inotify.close()
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
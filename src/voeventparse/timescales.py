@@ -0,0 +1,323 @@
+"""Conversion of event times from the VOEvent time scales to UTC.
+
+VOEvent packets may give times in any of the UTC, TT, TDB or GPS time
+scales (the first part of the ``coord_system_id``, cf
+:class:`.definitions.sky_coord_system`). This module converts such times
+to UTC, using the same algorithms as :py:mod:`astropy.time`, but without
+the overhead of constructing an :py:class:`astropy.time.Time` object per
+conversion:
+
+* GPS time is a fixed offset from TAI (TAI - GPS = 19s).
+* TT is a fixed offset from TAI (TT - TAI = 32.184s).
+* TDB differs from TT by a small periodic term, computed by the
+  `ERFA <https://github.com/liberfa/erfa>`_ routine ``dtdb`` for a
+  geocentric observer (as astropy does when no location is given).
+* TAI - UTC is looked up in a table of leap seconds, taken from ERFA (which
+  astropy keeps up to date, when loaded). The table is cached on first use,
+  see :func:`refresh_leap_seconds`.
+
+Both a scalar interface (:func:`to_utc`, :func:`time_offset_to_utc`), working
+with :py:class:`datetime.datetime`, and a batch interface over NumPy arrays
+(:func:`to_utc_datetime64`, :func:`time_offsets_to_utc_datetime64`) are
+provided. Results are accurate to the microsecond resolution of the output
+types. Before 1972 (when the current definition of UTC was adopted), TAI -
+UTC drifted continuously rather than changing only by leap seconds, so
+earlier times are converted by ERFA's ``taiutc`` routine instead, as in
+astropy.
+"""
+
+import bisect
+import datetime
+
+import erfa
+import numpy as np
+import pytz
+
+from voeventparse.isotime import parse_isotime
+
+#: The time scales used in VOEvent packets.
+SCALES = ("UTC", "TT", "TDB", "GPS")
+
+_US = 10**6
+_US_PER_DAY = 86400 * _US
+_ONE_US = datetime.timedelta(microseconds=1)
+_EPOCH = datetime.datetime(1970, 1, 1)
+_JD_EPOCH = 2440587.5  # Julian date of the epoch, 1970-01-01T00:00
+
+# Offsets of each scale from TAI, in microseconds:
+_TT_MINUS_TAI = 32184000
+_TAI_MINUS_GPS = 19 * _US
+
+# Epochs of the supported TimeOffset origins, in microseconds since 1970:
+_ORIGINS = {
+    "JD": -210866760000 * _US,
+    "MJD": -3506716800 * _US,
+}
+
+# Supported TimeOffset units, in seconds:
+_UNITS = {
+    "s": 1,
+    "d": 86400,
+    "a": 365.25 * 86400,
+    "yr": 365.25 * 86400,
+}
+
+_NAT = np.datetime64("NaT", "us")
+
+
+class _LeapTable:
+    """TAI - UTC since 1972, tabulated against TAI (in microseconds)."""
+
+    def __init__(self, leap_seconds):
+        tai_starts = []
+        offsets = []
+        for year, month, tai_utc in leap_seconds:
+            if year < 1972:
+                continue
+            offset = int(round(tai_utc * _US))
+            utc_start = (datetime.datetime(year, month, 1) - _EPOCH) // _ONE_US
+            tai_starts.append(utc_start + offset)
+            offsets.append(offset)
+        self.tai_starts = tai_starts
+        self.offsets = offsets
+        self.tai_starts_array = np.array(tai_starts, dtype=np.int64)
+        self.offsets_array = np.array(offsets, dtype=np.int64)
+
+
+_leap_table = None
+
+
+def refresh_leap_seconds():
+    """Reload the cached table of leap seconds from ERFA.
+
+    Only needed if the ERFA table is updated after first use of this module,
+    e.g. via :py:func:`astropy.time.update_leap_seconds`.
+    """
+    global _leap_table
+    _leap_table = _LeapTable(erfa.leap_seconds.get().tolist())
+
+
+def _get_leap_table():
+    if _leap_table is None:
+        refresh_leap_seconds()
+    return _leap_table
+
+
+def _check_scale(scale):
+    if scale not in SCALES:
+        raise ValueError(
+            f"Unrecognised time scale: {scale!r} (expected one of {SCALES})"
+        )
+
+
+def _check_unit(unit):
+    if unit not in _UNITS:
+        raise ValueError(f"Unsupported TimeOffset unit: {unit!r}")
+
+
+def _origin_us(origin):
+    if isinstance(origin, str) and origin in _ORIGINS:
+        return _ORIGINS[origin]
+    if isinstance(origin, str):
+        try:
+            origin = parse_isotime(origin, default_timezone=None)
+        except ValueError as e:
+            raise ValueError(f"Unrecognised TimeOffset origin: {origin!r}") from e
+    return datetime_to_us(origin)
+
+
+def time_offset_to_us(offset, unit, origin):
+    """Convert a time offset to microseconds since the epoch.
+
+    No time-scale conversion is applied - see :func:`time_offset_to_utc`.
+
+    Args:
+        offset (float): The offset, in units of ``unit``.
+        unit (str): See :func:`time_offset_to_utc`.
+        origin: See :func:`time_offset_to_utc`.
+    Returns:
+        int: Microseconds since 1970-01-01, in the offset's time scale.
+    """
+    _check_unit(unit)
+    return _origin_us(origin) + round(offset * _UNITS[unit] * _US)
+
+
+def datetime_to_us(dt):
+    """Convert a datetime to microseconds since the (naive) epoch.
+
+    Args:
+        dt (datetime.datetime): The time. Timezone-aware datetimes are
+            converted to UTC; naive ones are taken as they are.
+    Returns:
+        int: Microseconds since 1970-01-01.
+    """
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(pytz.UTC).replace(tzinfo=None)
+    return (dt - _EPOCH) // _ONE_US
+
+
+def _tdb_minus_tt(us):
+    """TDB - TT in seconds, for a TDB time in microseconds since the epoch.
+
+    Works equally on Python integers and NumPy arrays.
+    """
+    return erfa.dtdb(
+        _JD_EPOCH + us // _US_PER_DAY, (us % _US_PER_DAY) / _US_PER_DAY, 0.0, 0, 0, 0
+    )
+
+
+def _tai_us(us, scale):
+    """Convert microseconds since the epoch in the given scale to TAI."""
+    if scale == "TDB":
+        us = us - round(float(_tdb_minus_tt(us)) * _US)
+        scale = "TT"
+    if scale == "TT":
+        return us - _TT_MINUS_TAI
+    return us + _TAI_MINUS_GPS
+
+
+def _utc_us_before_1972(tai_us):
+    """Convert TAI to UTC via ERFA, for times before the table of leap seconds.
+
+    Takes and returns microseconds since the epoch. Works equally on Python
+    integers and NumPy arrays.
+
+    Returns:
+        tuple: The UTC times, and True (or a boolean array) where they fall
+        within a step in UTC, which datetime cannot represent.
+    """
+    utc1, utc2 = erfa.taiutc(
+        _JD_EPOCH + tai_us // _US_PER_DAY, (tai_us % _US_PER_DAY) / _US_PER_DAY
+    )
+    year, month, day, hmsf = erfa.d2dtf("UTC", 6, utc1, utc2)
+    mjd = erfa.cal2jd(year, month, day)[1].astype(np.int64)
+    seconds = (hmsf["h"].astype(np.int64) * 60 + hmsf["m"]) * 60 + hmsf["s"]
+    utc_us = (mjd - 40587) * _US_PER_DAY + seconds * _US + hmsf["f"]
+    return utc_us, hmsf["s"] >= 60
+
+
+def _utc_datetime(tai_us):
+    table = _get_leap_table()
+    idx = bisect.bisect_right(table.tai_starts, tai_us) - 1
+    if idx < 0:
+        utc_us, in_step = _utc_us_before_1972(tai_us)
+        if in_step:
+            raise ValueError(
+                "Time falls within a step in UTC, which datetime cannot represent"
+            )
+        return (_EPOCH + datetime.timedelta(microseconds=int(utc_us))).replace(
+            tzinfo=pytz.UTC
+        )
+    if idx + 1 < len(table.tai_starts) and tai_us >= table.tai_starts[idx + 1] - _US:
+        raise ValueError(
+            "Time falls within a leap second, which datetime cannot represent"
+        )
+    utc_us = tai_us - table.offsets[idx]
+    return (_EPOCH + datetime.timedelta(microseconds=utc_us)).replace(tzinfo=pytz.UTC)
+
+
+def to_utc(dt, scale):
+    """Convert a timestamp in the given time scale to UTC.
+
+    Args:
+        dt (:class:`datetime.datetime`): The timestamp, as a calendar date and
+            time in the time scale ``scale``. Naive datetimes are used as-is;
+            timezone-aware datetimes are first shifted to UTC offset zero.
+        scale (str): One of :data:`SCALES`.
+    Returns:
+        :class:`datetime.datetime`: Equivalent UTC time (timezone aware).
+    Raises:
+        ValueError: For an unrecognised time scale, or a time which cannot be
+            represented as a datetime (i.e. within a leap second).
+    """
+    _check_scale(scale)
+    if scale == "UTC":
+        if dt.tzinfo is None:
+            return dt.replace(tzinfo=pytz.UTC)
+        return dt.astimezone(pytz.UTC)
+    return _utc_datetime(_tai_us(datetime_to_us(dt), scale))
+
+
+def time_offset_to_utc(offset, scale, unit="s", origin="MJD"):
+    """Convert a time given as an offset from an origin to UTC.
+
+    Args:
+        offset (float): The time offset, in units of ``unit``.
+        scale (str): One of :data:`SCALES`.
+        unit (str): One of ``'s'`` (seconds), ``'d'`` (days), ``'a'`` or
+            ``'yr'`` (Julian years).
+        origin: Either ``'JD'`` or ``'MJD'`` (i.e. Julian date zero, modified
+            Julian date zero), or a :class:`datetime.datetime` or ISO-8601
+            string, taken to be in time scale ``scale``.
+    Returns:
+        :class:`datetime.datetime`: Equivalent UTC time (timezone aware).
+    """
+    _check_scale(scale)
+    us = time_offset_to_us(offset, unit, origin)
+    if scale == "UTC":
+        return (_EPOCH + datetime.timedelta(microseconds=us)).replace(tzinfo=pytz.UTC)
+    return _utc_datetime(_tai_us(us, scale))
+
+
+def _utc_datetime64(us, scale, nat):
+    if scale != "UTC":
+        if scale == "TDB":
+            us = us - np.rint(_tdb_minus_tt(us) * _US).astype(np.int64)
+            scale = "TT"
+        tai = us - _TT_MINUS_TAI if scale == "TT" else us + _TAI_MINUS_GPS
+        table = _get_leap_table()
+        idx = np.searchsorted(table.tai_starts_array, tai, side="right") - 1
+        next_start = np.append(table.tai_starts_array[1:], np.iinfo(np.int64).max)
+        nat = nat | (tai >= next_start[idx] - _US)
+        us = tai - table.offsets_array[idx]
+        early = idx < 0
+        if early.any():
+            us[early], in_step = _utc_us_before_1972(tai[early])
+            nat[early] |= in_step
+    result = us.astype("datetime64[us]")
+    result[nat] = _NAT
+    return result
+
+
+def to_utc_datetime64(times, scale):
+    """Convert an array of timestamps in the given time scale to UTC.
+
+    The batch equivalent of :func:`to_utc`.
+
+    Args:
+        times: Array-like of timestamps (calendar dates and times in the time
+            scale ``scale``), in any form accepted by
+            ``numpy.asarray(times, dtype='datetime64[us]')``, e.g. an array of
+            ``datetime64`` or a list of naive datetimes.
+        scale (str): One of :data:`SCALES`.
+    Returns:
+        numpy.ndarray: Equivalent UTC times, as ``datetime64[us]``. Elements
+        which cannot be represented (i.e. within a leap second) are returned
+        as ``NaT``, as are ``NaT`` inputs.
+    """
+    _check_scale(scale)
+    times = np.asarray(times, dtype="datetime64[us]")
+    nat = np.isnat(times)
+    return _utc_datetime64(np.where(nat, 0, times.astype(np.int64)), scale, nat)
+
+
+def time_offsets_to_utc_datetime64(offsets, scale, unit="s", origin="MJD"):
+    """Convert an array of time offsets to UTC.
+
+    The batch equivalent of :func:`time_offset_to_utc`.
+
+    Args:
+        offsets: Array-like of time offsets, in units of ``unit``.
+        scale (str): One of :data:`SCALES`.
+        unit (str): See :func:`time_offset_to_utc`.
+        origin: See :func:`time_offset_to_utc`.
+    Returns:
+        numpy.ndarray: Equivalent UTC times, as ``datetime64[us]``, with
+        ``NaT`` as for :func:`to_utc_datetime64` (and for NaN offsets).
+    """
+    _check_scale(scale)
+    _check_unit(unit)
+    offsets = np.asarray(offsets, dtype=np.float64)
+    nat = np.isnan(offsets)
+    us = np.rint(np.where(nat, 0.0, offsets) * (_UNITS[unit] * _US)).astype(np.int64)
+    return _utc_datetime64(_origin_us(origin) + us, scale, nat)
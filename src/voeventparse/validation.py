@@ -0,0 +1,221 @@
+"""Cheap structural validation, as a first tier ahead of full schema validation.
+
+Full validation against the XML schema (:py:func:`.valid_as_v2_0`) is
+relatively expensive. The structural check in :func:`structural_errors`
+tests a subset of the schema rules - those most often broken in practice -
+by inspecting the tree directly:
+
+* The root element is ``VOEvent`` in the VOEvent v2.0 namespace, with
+  ``version="2.0"``, an ``ivorn``, a valid ``role`` and no unexpected
+  attributes.
+* The root has only the permitted children (``Who``, ``What``,
+  ``WhereWhen``, ``How``, ``Why``, ``Citations``, ``Description``,
+  ``Reference``), each at most once.
+* ``Who`` has only the permitted children, each at most once.
+* ``What`` has only the permitted children, and every Param has a valid
+  ``dataType``.
+* ``Citations``, if present, is non-empty, and every ``EventIVORN`` has a
+  valid ``cite`` type.
+
+Every one of these is also a schema rule, so a packet failing the
+structural check is certain to fail schema validation. The converse does
+not hold: a structurally valid packet may still break schema rules not
+covered here. :class:`TieredValidator` exploits this, rejecting packets
+which fail the structural tier outright, and only passing a sampled (or
+suspect) subset of the rest on to full schema validation.
+"""
+
+import random
+
+from lxml import etree
+
+from voeventparse.voevent import standard_root_tag, valid_as_v2_0
+
+_VOEVENT_TAG = "{http://www.ivoa.net/xml/VOEvent/v2.0}VOEvent"
+_root_attributes = frozenset(("version", "ivorn", "role"))
+_role_values = frozenset(("observation", "prediction", "utility", "test"))
+
+
+def _self_is_one_of(tags):
+    return " or ".join("self::" + tag for tag in tags)
+
+
+def _has_unexpected_children(path, tags):
+    # Comparing counts is much faster than testing each child's name.
+    counts = " + ".join(f"count({path}/{tag})" for tag in tags)
+    return etree.XPath(f"count({path}/*) != {counts}")
+
+
+def _any_repeated(tags):
+    return " or ".join(f"count({tag}) > 1" for tag in tags)
+
+
+_root_children = (
+    "Who",
+    "What",
+    "WhereWhen",
+    "How",
+    "Why",
+    "Citations",
+    "Description",
+    "Reference",
+)
+_who_children = ("AuthorIVORN", "Date", "Description", "Reference", "Author")
+_what_children = ("Param", "Group", "Table", "Description", "Reference")
+
+# The checks are compiled XPath expressions, evaluated in C, which mostly
+# return a number or boolean. Offending elements are only selected (creating
+# Python objects) once a check has failed, to build the error messages.
+_structure_checks = [
+    (
+        _has_unexpected_children(".", _root_children),
+        etree.XPath(f"*[not({_self_is_one_of(_root_children)})]"),
+    ),
+    (
+        _has_unexpected_children("Who", _who_children),
+        etree.XPath(f"Who/*[not({_self_is_one_of(_who_children)})]"),
+    ),
+    (
+        _has_unexpected_children("What", _what_children),
+        etree.XPath(f"What/*[not({_self_is_one_of(_what_children)})]"),
+    ),
+]
+_repeated_root_children = etree.XPath(_any_repeated(_root_children))
+_repeated_who_children = etree.XPath(f"boolean(Who[{_any_repeated(_who_children)}])")
+_param_data_types = [
+    etree.XPath(path + "/@dataType", smart_strings=False)
+    for path in ("What/Param", "What/Group/Param")
+]
+_data_types = frozenset(("string", "float", "int"))
+_unnamed_params = etree.XPath(
+    "count(What/Param) + count(What/Group/Param)"
+    " - count(What/Param/@name) - count(What/Group/Param/@name)"
+)
+_empty_citations = etree.XPath("boolean(Citations[not(EventIVORN)])")
+_bad_cite_values = etree.XPath(
+    "Citations/EventIVORN[@cite and not("
+    "@cite='followup' or @cite='supersedes' or @cite='retraction')]/@cite"
+)
+
+
+def structural_errors(voevent, strict=False):
+    """List violations of the structural rules described above.
+
+    Args:
+        voevent(:class:`Voevent`): Root node of a VOEvent etree.
+        strict (bool): (Default False). Also apply rules mandated by the
+            VOEvent specification, but not enforced by its schema - currently
+            that every Param has a ``name``. Packets failing only these
+            rules may still pass schema validation.
+    Returns:
+        list: Error messages (strings); empty if no problems were found.
+    """
+    errors = []
+    root_tag = standard_root_tag(voevent)
+    if root_tag != _VOEVENT_TAG:
+        errors.append(f"Root element is {root_tag!r}, expected {_VOEVENT_TAG!r}")
+
+    attrib = voevent.attrib
+    # NB the schema types version as xs:token, so whitespace is collapsed:
+    if (attrib.get("version") or "").strip() != "2.0":
+        errors.append(f"Unsupported version: {attrib.get('version')!r}")
+    # NB the schema types ivorn as xs:anyURI, of which "" is a valid value:
+    if "ivorn" not in attrib:
+        errors.append("Missing ivorn attribute")
+    role = attrib.get("role")
+    if role is not None and role not in _role_values:
+        errors.append(f"Invalid role: {role!r}")
+    for key in attrib:
+        if key[0] != "{" and key not in _root_attributes:
+            errors.append(f"Unexpected root attribute: {key!r}")
+
+    for check, select_offenders in _structure_checks:
+        if check(voevent):
+            for child in select_offenders(voevent):
+                parent = child.getparent()
+                errors.append(f"Unexpected element: {parent.tag}/{child.tag}")
+    if _repeated_root_children(voevent):
+        errors.append("Repeated element directly under VOEvent")
+    if _repeated_who_children(voevent):
+        errors.append("Repeated element under Who")
+    for xpath in _param_data_types:
+        for data_type in set(xpath(voevent)) - _data_types:
+            errors.append(f"Invalid Param dataType: {data_type!r}")
+    if strict:
+        n_unnamed = int(_unnamed_params(voevent))
+        if n_unnamed:
+            errors.append(f"{n_unnamed} Param(s) without a name")
+    if _empty_citations(voevent):
+        errors.append("Citations section is empty")
+    for cite in _bad_cite_values(voevent):
+        errors.append(f"Invalid citation type: {cite!r}")
+    return errors
+
+
+def structurally_valid(voevent, strict=False):
+    """Tests if a voevent passes the structural check.
+
+    See :func:`structural_errors`.
+
+    Args:
+        voevent(:class:`Voevent`): Root node of a VOEvent etree.
+        strict (bool): See :func:`structural_errors`.
+    Returns:
+        bool: Whether the VOEvent passed.
+    """
+    return not structural_errors(voevent, strict)
+
+
+class TieredValidator:
+    """Two-tier validation: a structural check, then sampled schema validation.
+
+    Every packet gets the cheap structural check; those failing it are
+    rejected. Of the rest, full schema validation is applied to a random
+    sample (at rate ``sample_rate``), and to any deemed suspect by the
+    ``suspect`` callable. Packets not selected for schema validation are
+    accepted on the strength of the structural check alone.
+
+    Args:
+        sample_rate (float): Fraction of structurally valid packets passed
+            on to schema validation, from 0.0 (none) to 1.0 (all).
+        suspect: Optional callable, taking a packet and returning True if it
+            should always be schema-validated (e.g. packets from a new or
+            unreliable stream).
+        strict (bool): Passed on to :func:`structural_errors`.
+        seed: Optional seed for the sampling random number generator.
+    """
+
+    def __init__(self, sample_rate=0.1, suspect=None, strict=False, seed=None):
+        self.sample_rate = sample_rate
+        self.suspect = suspect
+        self.strict = strict
+        self._random = random.Random(seed)
+        #: Number of packets checked.
+        self.checked = 0
+        #: Number of packets rejected by the structural tier.
+        self.structural_failures = 0
+        #: Number of packets passed on to schema validation.
+        self.schema_checked = 0
+        #: Number of packets rejected by schema validation.
+        self.schema_failures = 0
+
+    def validate(self, voevent):
+        """Validate a packet.
+
+        Args:
+            voevent(:class:`Voevent`): Root node of a VOEvent etree.
+        Returns:
+            bool: Whether the VOEvent was accepted.
+        """
+        self.checked += 1
+        if structural_errors(voevent, self.strict):
+            self.structural_failures += 1
+            return False
+        if self._random.random() < self.sample_rate or (
+            self.suspect is not None and self.suspect(voevent)
+        ):
+            self.schema_checked += 1
+            if not valid_as_v2_0(voevent):
+                self.schema_failures += 1
+                return False
+        return True
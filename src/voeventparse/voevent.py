@@ -2,16 +2,55 @@
 
 import collections.abc
 import copy
+import re
+import time
 
 import pytz
 from lxml import etree, objectify
 
 import voeventparse.definitions
+from voeventparse.isotime import format_isotime
+from voeventparse.limits import parse_limited
+from voeventparse.view import ElementView
 
 voevent_v2_0_schema = etree.XMLSchema(
     etree.fromstring(voeventparse.definitions.v2_0_schema_str)
 )
 
+_VOEVENT_NAMESPACE_STEM = "http://www.ivoa.net/xml/VOEvent/"
+
+# Root elements whose namespace is removed from the tag on loading, by local
+# name, with the stem of the namespace URIs recognised for each
+# (see :py:func:`.remove_root_tag_prefix`):
+_ROOT_NAMESPACE_STEMS = {
+    "VOEvent": _VOEVENT_NAMESPACE_STEM,
+    "Transport": "http://telescope-networks.org/schema/Transport/",
+}
+
+# As the objectify default parser, so both modes see the same tree:
+_etree_parser = etree.XMLParser(remove_blank_text=True)
+
+_objectify_lookup = objectify.ObjectifyElementClassLookup()
+
+# Set by voeventparse.instrumentation while enabled, to time code sections
+# (see ``instrumentation.sections``) - otherwise None, at no cost:
+_record_section = None
+
+# lxml parses buffer-protocol objects (e.g. memoryviews) directly only from
+# version 6.0; older versions accept only bytes and str.
+_parses_buffers = etree.LXML_VERSION >= (6, 0)
+
+_find_annotations = etree.XPath(
+    "boolean(descendant-or-self::*/@py:pytype | descendant-or-self::*/@xsi:type)",
+    namespaces={
+        "py": "http://codespeak.net/lxml/objectify/pytype",
+        "xsi": "http://www.w3.org/2001/XMLSchema-instance",
+    },
+)
+
+# Namespace declarations, as serialised by lxml:
+_namespace_declaration = re.compile(rb'xmlns(?::[^=\s]+)?="([^"]*)"')
+
 
 def voevent(stream, stream_id, role):
     """Create a new VOEvent element tree, with specified IVORN and role.
@@ -40,7 +79,7 @@ def voevent(stream, stream_id, role):
     """
     parser = objectify.makeparser(remove_blank_text=True)
     v = objectify.fromstring(voeventparse.definitions.v2_0_skeleton_str, parser=parser)
-    _remove_root_tag_prefix(v)
+    remove_root_tag_prefix(v)
     if not isinstance(stream_id, str):
         stream_id = repr(stream_id)
     v.attrib["ivorn"] = "".join(("ivo://", stream, "#", stream_id))
@@ -57,7 +96,7 @@ def voevent(stream, stream_id, role):
     return v
 
 
-def loads(s, check_version=True):
+def loads(s, check_version=True, parser=None, mode="objectify", limits=None):
     """
     Load VOEvent from bytes.
 
@@ -71,35 +110,72 @@ def loads(s, check_version=True):
     2.0. This can be disabled but voevent-parse routines are untested with
     other versions.
 
+    The returned tree may be pickled, e.g. to pass it to a process pool, or
+    to store it in a pickle-based cache: it is serialised as XML (including
+    the root namespace declaration, from which the root tag is restored on
+    output) and re-parsed on unpickling, which is cheaper than a round trip
+    through :py:func:`.dumps`. The same goes for ``mode="etree"`` views.
+
     Args:
-        s (bytes): Bytes containing raw XML.
+        s (bytes): Bytes containing raw XML. Any object supporting the
+            buffer protocol (e.g. a memoryview of a memory-mapped file) may
+            also be passed, and is parsed without copying (with lxml 6.0 or
+            later; older versions require a copy).
         check_version (bool): (Default=True) Checks that the VOEvent is of a
             supported schema version - currently only v2.0 is supported.
+        parser (lxml.etree.XMLParser): (Default=None) An objectify parser to
+            use in place of the default, e.g. one from
+            :py:func:`voeventparse.elements.make_parser`, which assigns
+            typed element classes. (In ``etree`` mode, a plain etree parser.)
+        mode (str): (Default='objectify') Either ``'objectify'``, or
+            ``'etree'`` to parse with the faster plain etree parser, and
+            return a read-only :py:class:`.ElementView` of the root, see
+            :py:mod:`voeventparse.view`.
+        limits (:py:class:`.ParseLimits`): (Default=None) Parse with a
+            hardened parser, enforcing these limits - see
+            :py:mod:`voeventparse.limits`. Cannot be combined with
+            ``parser``.
     Returns:
         :py:class:`Voevent`: Root-node of the  etree.
     Raises:
         ValueError: If passed a VOEvent of wrong schema version
-            (i.e. schema 1.1)
+            (i.e. schema 1.1), or an unrecognised ``mode``.
+        voeventparse.limits.ParseLimitError: If ``limits`` are exceeded.
 
     """
+    if limits is not None and parser is not None:
+        raise ValueError("Cannot combine a custom parser with limits")
+    if not (_parses_buffers or isinstance(s, (bytes, str))):
+        s = bytes(s)
+    if mode == "etree":
+        if limits is not None:
+            v = parse_limited(s, limits)
+        else:
+            v = etree.fromstring(s, parser or _etree_parser)
+        if check_version:
+            assert_supported_version(v)
+        return ElementView(v)
+    if mode != "objectify":
+        raise ValueError(f"Unrecognised mode: {mode!r}")
     # .. note::
     #
     # The namespace is removed from the root element tag to make
     #        objectify access work as expected,
-    #        (see  :py:func:`._remove_root_tag_prefix`)
+    #        (see  :py:func:`.remove_root_tag_prefix`)
     #        so we must re-insert it when we want to conform to schema.
-    v = objectify.fromstring(s)
-    _remove_root_tag_prefix(v)
+    if limits is not None:
+        v = parse_limited(s, limits, _objectify_lookup)
+    else:
+        v = objectify.fromstring(s, parser)
+    remove_root_tag_prefix(v)
 
     if check_version:
-        version = v.attrib["version"]
-        if not version == "2.0":
-            raise ValueError("Unsupported VOEvent schema version:" + version)
+        assert_supported_version(v)
 
     return v
 
 
-def load(file, check_version=True):
+def load(file, check_version=True, limits=None):
     """Load VOEvent from file object.
 
     A simple wrapper to read a file before passing the contents to
@@ -115,11 +191,17 @@ def load(file, check_version=True):
 
         check_version (bool): (Default=True) Checks that the VOEvent is of a
             supported schema version - currently only v2.0 is supported.
+        limits (:py:class:`.ParseLimits`): (Default=None) As for
+            :py:func:`.loads`. No more than ``max_bytes`` (plus one) are read
+            from the file.
     Returns:
         :py:class:`Voevent`: Root-node of the  etree.
     """
-    s = file.read()
-    return loads(s, check_version)
+    if limits is not None and limits.max_bytes is not None:
+        s = file.read(limits.max_bytes + 1)
+    else:
+        s = file.read()
+    return loads(s, check_version, limits=limits)
 
 
 def dumps(voevent, pretty_print=False, xml_declaration=True, encoding="UTF-8"):
@@ -141,15 +223,32 @@ def dumps(voevent, pretty_print=False, xml_declaration=True, encoding="UTF-8"):
         bytes: Bytestring containing raw XML representation of VOEvent.
 
     """
-    vcopy = copy.deepcopy(voevent)
+    if not _is_annotated(voevent):
+        # Restore the root namespace in the output rather than in the tree,
+        # which may be shared (e.g. between threads):
+        s = _tostring_standard(
+            voevent,
+            pretty_print=pretty_print,
+            xml_declaration=xml_declaration,
+            encoding=encoding,
+        )
+        if s is not None:
+            return s
+    # Otherwise, e.g. removing objectify annotations would alter objectify's
+    # interpretation of the caller's tree, so work on a copy:
+    if _record_section is None:
+        vcopy = copy.deepcopy(voevent)
+    else:
+        start = time.perf_counter()
+        vcopy = copy.deepcopy(voevent)
+        _record_section("dumps.deepcopy", time.perf_counter() - start, None)
     _return_to_standard_xml(vcopy)
-    s = etree.tostring(
+    return etree.tostring(
         vcopy,
         pretty_print=pretty_print,
         xml_declaration=xml_declaration,
         encoding=encoding,
     )
-    return s
 
 
 def dump(voevent, file, pretty_print=True, xml_declaration=True):
@@ -180,7 +279,7 @@ def valid_as_v2_0(voevent):
     """
     _return_to_standard_xml(voevent)
     valid_bool = voevent_v2_0_schema.validate(voevent)
-    _remove_root_tag_prefix(voevent)
+    remove_root_tag_prefix(voevent)
     return valid_bool
 
 
@@ -199,7 +298,7 @@ def assert_valid_as_v2_0(voevent):
     """
     _return_to_standard_xml(voevent)
     voevent_v2_0_schema.assertValid(voevent)
-    _remove_root_tag_prefix(voevent)
+    remove_root_tag_prefix(voevent)
 
 
 def set_who(voevent, date=None, author_ivorn=None):
@@ -217,7 +316,7 @@ def set_who(voevent, date=None, author_ivorn=None):
     if author_ivorn is not None:
         voevent.Who.AuthorIVORN = "".join(("ivo://", author_ivorn))
     if date is not None:
-        voevent.Who.Date = date.replace(microsecond=0).isoformat()
+        voevent.Who.Date = format_isotime(date, utc=False, microseconds=False)
 
 
 def set_author(
@@ -286,16 +385,7 @@ def add_where_when(
     """
 
     # .. todo:: Implement TimeError using datetime.timedelta
-    if obs_time.tzinfo is not None:
-        utc_naive_obs_time = obs_time.astimezone(pytz.utc).replace(tzinfo=None)
-    elif not allow_tz_naive_datetime:
-        raise ValueError(
-            "Datetime passed without tzinfo, cannot be sure if it is really a "
-            "UTC timestamp. Please verify function call and either add tzinfo "
-            "or pass parameter 'allow_tz_naive_obstime=True', as appropriate",
-        )
-    else:
-        utc_naive_obs_time = obs_time
+    obs_time = utc_naive_obs_time(obs_time, allow_tz_naive_datetime)
 
     obs_data = etree.SubElement(voevent.WhereWhen, "ObsDataLocation")
     etree.SubElement(obs_data, "ObservatoryLocation", id=observatory_location)
@@ -304,8 +394,7 @@ def add_where_when(
     ac = etree.SubElement(ol, "AstroCoords", coord_system_id=coords.system)
     time = etree.SubElement(ac, "Time", unit="s")
     instant = etree.SubElement(time, "TimeInstant")
-    instant.ISOTime = utc_naive_obs_time.isoformat()
-    # iso_time = etree.SubElement(instant, 'ISOTime') = obs_time.isoformat()
+    instant.ISOTime = format_isotime(obs_time)
 
     pos2d = etree.SubElement(ac, "Position2D", unit=coords.units)
     pos2d.Name1 = "RA"
@@ -339,6 +428,28 @@ def add_how(voevent, descriptions=None, references=None):
         voevent.How.extend(_listify(references))
 
 
+def utc_naive_obs_time(obs_time, allow_tz_naive_datetime):
+    """The observation time as written by :func:`add_where_when`.
+
+    Args:
+        obs_time (datetime.datetime): See :func:`add_where_when`.
+        allow_tz_naive_datetime (bool): See :func:`add_where_when`.
+    Returns:
+        datetime.datetime: ``obs_time`` as a naive UTC datetime.
+    Raises:
+        ValueError: If ``obs_time`` is naive, and that is not allowed.
+    """
+    if obs_time.tzinfo is not None:
+        return obs_time.astimezone(pytz.utc).replace(tzinfo=None)
+    if not allow_tz_naive_datetime:
+        raise ValueError(
+            "Datetime passed without tzinfo, cannot be sure if it is really a "
+            "UTC timestamp. Please verify function call and either add tzinfo "
+            "or pass parameter 'allow_tz_naive_obstime=True', as appropriate",
+        )
+    return obs_time
+
+
 def add_why(voevent, importance=None, expires=None, inferences=None):
     """Add Inferences, or set importance / expires attributes of the Why section.
 
@@ -361,7 +472,9 @@ def add_why(voevent, importance=None, expires=None, inferences=None):
     if importance is not None:
         voevent.Why.attrib["importance"] = str(importance)
     if expires is not None:
-        voevent.Why.attrib["expires"] = expires.replace(microsecond=0).isoformat()
+        voevent.Why.attrib["expires"] = format_isotime(
+            expires, utc=False, microseconds=False
+        )
     if inferences is not None:
         voevent.Why.extend(_listify(inferences))
 
@@ -388,7 +501,14 @@ def add_citations(voevent, event_ivorns):
 # And finally, utility functions...
 
 
-def _remove_root_tag_prefix(v):
+def assert_supported_version(v):
+    """Raises ValueError if v is not of a supported schema version."""
+    version = v.attrib["version"]
+    if not version == "2.0":
+        raise ValueError("Unsupported VOEvent schema version:" + version)
+
+
+def remove_root_tag_prefix(v):
     """
     Removes 'voe' namespace prefix from root tag.
 
@@ -403,36 +523,148 @@ def _remove_root_tag_prefix(v):
     This makes access to elements easier, but requires care to reinsert
     the namespace upon output.
 
-    I've gone for the latter option.
+    I've gone for the latter option. Note that only the tag changes - the
+    namespace declaration itself stays on the root element, so the original
+    namespace (and prefix) can be recovered from ``v.nsmap`` on output
+    (see :py:func:`.standard_root_tag`). This is done only for the root
+    elements listed in ``_ROOT_NAMESPACE_STEMS`` (VOEvent, and VTP Transport
+    messages), and where the root's namespace is the one recovered; other
+    roots are left as they are.
     """
     if v.prefix:
-        # Create subelement without a prefix via etree.SubElement
-        etree.SubElement(v, "original_prefix")
-        # Now carefully access said named subelement (without prefix cascade)
-        # and alter the first value in the list of children with this name...
-        # LXML syntax is a minefield!
-        v["{}original_prefix"][0] = v.prefix
-        v.tag = v.tag.replace("".join(("{", v.nsmap[v.prefix], "}")), "")
-        # Now v.tag = '{}VOEvent', v.prefix = None
+        qname = etree.QName(v)
+        if _stripped_namespace(v, qname.localname) == (v.prefix, qname.namespace):
+            v.tag = qname.localname
+            # Now v.tag = '{}VOEvent', v.prefix = None
     return
 
 
-def _reinsert_root_tag_prefix(v):
+def reinsert_root_tag_prefix(v):
     """
     Returns namespace prefix to root tag, if it had one.
     """
-    if hasattr(v, "original_prefix"):
-        original_prefix = v.original_prefix
-        del v.original_prefix
-        v.tag = "".join(("{", v.nsmap[original_prefix], "}VOEvent"))
+    v.tag = standard_root_tag(v)
+    # Trees from earlier versions carried the prefix in a sentinel element:
+    sentinel = v.find("original_prefix")
+    if sentinel is not None:
+        v.remove(sentinel)
     return
 
 
+def _stripped_namespace(v, localname):
+    """
+    Returns the (prefix, namespace) pair of a root element's namespace.
+
+    I.e. the namespace :py:func:`.remove_root_tag_prefix` would remove from
+    a root of this local name, as recovered from the namespace map on
+    output - or None, if the root's namespace is not removed.
+    """
+    stem = _ROOT_NAMESPACE_STEMS.get(localname)
+    if stem is None:
+        return None
+    for prefix, uri in v.nsmap.items():
+        if prefix and uri.startswith(stem):
+            return prefix, uri
+    return None
+
+
+def standard_root_tag(v):
+    """
+    Returns the root tag as it would be output, i.e. with namespace restored.
+
+    Unlike :py:func:`.reinsert_root_tag_prefix`, leaves the tree untouched.
+
+    If the namespace was removed from the root tag, then the root element
+    still declares it, so we look it up in the namespace map.
+    """
+    if v.tag.startswith("{"):
+        return v.tag
+    sentinel = v.find("original_prefix")
+    if sentinel is not None:
+        return "".join(("{", v.nsmap[sentinel.text], "}", v.tag))
+    stripped = _stripped_namespace(v, v.tag)
+    if stripped is None:
+        return v.tag
+    return "".join(("{", stripped[1], "}", v.tag))
+
+
+def _tostring_standard(v, encoding, **kwargs):
+    """
+    Serialises v as :py:func:`._return_to_standard_xml` would leave it.
+
+    Rather than altering the tree, the root namespace prefix is restored in
+    the output. Returns None if more would need changing - i.e. the tree
+    may carry namespace declarations which are unused, and so would be
+    removed - or the encoding is not ASCII-compatible; the caller should
+    then work on a copy. The tree must not carry objectify annotations (see
+    :py:func:`._is_annotated`).
+    """
+    try:
+        if "<:>".encode(encoding) != b"<:>":
+            return None
+    except (LookupError, TypeError):
+        return None
+    if v.find("original_prefix") is not None:
+        return None
+    stripped = None
+    if not v.tag.startswith("{"):
+        stripped = _stripped_namespace(v, v.tag)
+        if stripped is not None and not stripped[0].isascii():
+            return None
+    s = etree.tostring(v, encoding=encoding, **kwargs)
+    start = s.index(b"<", s.index(b"?>") + 2 if s.startswith(b"<?xml") else 0)
+    end_of_start_tag = s.index(b">", start)
+    # Check every namespace declared is used. So that we need only look for
+    # each namespace in the tree, no namespace may be declared twice:
+    namespaces = list(v.nsmap.values())
+    if s.find(b"xmlns", end_of_start_tag) != -1:
+        # Declared below the root - as found in the output, so any mention
+        # of 'xmlns' in text content is treated as a declaration too:
+        declared = _namespace_declaration.findall(s, end_of_start_tag)
+        if len(declared) != s.count(b"xmlns", end_of_start_tag) or any(
+            b"&" in uri for uri in declared
+        ):
+            return None
+        namespaces.extend(uri.decode(encoding) for uri in declared)
+    if len(set(namespaces)) != len(namespaces):
+        return None
+    used = {etree.QName(v).namespace if stripped is None else stripped[1]}
+    used.update(key[1 : key.index("}")] for key in v.attrib if key.startswith("{"))
+    for uri in namespaces:
+        if uri not in used and not _uses_namespace(v, uri):
+            return None
+    if stripped is None:
+        return s
+    prefix = stripped[0].encode("ascii")
+    start += 1
+    if s[end_of_start_tag - 1 : end_of_start_tag] == b"/":
+        return b"".join((s[:start], prefix, b":", s[start:]))
+    end = s.rindex(b"</" + v.tag.encode("ascii")) + 2
+    return b"".join((s[:start], prefix, b":", s[start:end], prefix, b":", s[end:]))
+
+
+def _uses_namespace(v, uri):
+    """Returns True if any element or attribute below v is in namespace uri."""
+    return v.xpath(
+        "boolean(descendant::ns:* | descendant::*/@ns:*)", namespaces={"ns": uri}
+    )
+
+
+def _is_annotated(v):
+    """
+    Returns True if any element of the tree carries objectify annotations.
+
+    These are added by objectify when assigning values, e.g.
+    ``v.Who.Description = 'foo'``, and must be removed on output.
+    """
+    return _find_annotations(v)
+
+
 def _return_to_standard_xml(v):
     # Remove lxml.objectify DataType namespace prefixes:
     objectify.deannotate(v)
     # Put the default namespace back:
-    _reinsert_root_tag_prefix(v)
+    reinsert_root_tag_prefix(v)
     etree.cleanup_namespaces(v)
 
 
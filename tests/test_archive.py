@@ -0,0 +1,87 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+import voeventparse as vp
+from voeventparse.fixtures import datapaths
+
+
+class TestPacketArchive(TestCase):
+    def setUp(self):
+        self.packet_paths = [
+            datapaths.swift_bat_grb_pos_v2,
+            datapaths.moa_lensing_event_path,
+            datapaths.gaia_alert_16aac_direct,
+            datapaths.no_namespace_test_packet,
+        ]
+        self.raw_packets = []
+        for path in self.packet_paths:
+            with open(path, "rb") as f:
+                self.raw_packets.append(f.read())
+        fd, self.archive_path = tempfile.mkstemp(suffix=".xml")
+        with os.fdopen(fd, "wb") as f:
+            f.write(b"\n".join(self.raw_packets))
+
+    def tearDown(self):
+        os.remove(self.archive_path)
+
+    def test_index(self):
+        with vp.PacketArchive(self.archive_path) as archive:
+            self.assertEqual(len(archive), len(self.raw_packets))
+            for n, raw in enumerate(self.raw_packets):
+                with archive.raw(n) as buf:
+                    self.assertEqual(bytes(buf), raw.strip())
+
+    def test_random_access(self):
+        with vp.PacketArchive(self.archive_path) as archive:
+            for n in (2, 0, -1):
+                self.assertEqual(
+                    vp.dumps(archive[n]), vp.dumps(vp.loads(self.raw_packets[n]))
+                )
+            with self.assertRaises(IndexError):
+                archive[len(self.raw_packets)]
+
+    def test_iteration(self):
+        with vp.PacketArchive(self.archive_path) as archive:
+            ivorns = [v.attrib["ivorn"] for v in archive]
+        expected = [vp.loads(raw).attrib["ivorn"] for raw in self.raw_packets]
+        self.assertEqual(ivorns, expected)
+
+    def test_end_tags_in_comments_and_cdata(self):
+        raw = self.raw_packets[0].replace(
+            b"<Who>",
+            b"<!-- </voe:VOEvent> --><Who><Description><![CDATA[</VOEvent>]]>"
+            b"</Description>",
+            1,
+        )
+        with open(self.archive_path, "wb") as f:
+            f.write(raw + b"\n" + self.raw_packets[1])
+        with vp.PacketArchive(self.archive_path) as archive:
+            self.assertEqual(len(archive), 2)
+            with archive.raw(0) as buf:
+                self.assertEqual(bytes(buf), raw.strip())
+            self.assertEqual(archive[0].Who.Description, "</VOEvent>")
+
+    def test_older_lxml(self):
+        # lxml < 6.0 cannot parse memoryviews, so they are copied first:
+        patch = mock.patch("voeventparse.voevent._parses_buffers", False)
+        with patch, vp.PacketArchive(self.archive_path) as archive:
+            v = archive[0]
+        self.assertEqual(vp.dumps(v), vp.dumps(vp.loads(self.raw_packets[0])))
+
+    def test_empty_archive(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, "empty.xml")
+            open(path, "wb").close()
+            with vp.PacketArchive(path) as archive:
+                self.assertEqual(len(archive), 0)
+                self.assertEqual(list(archive), [])
+
+
+class TestIterDirectory(TestCase):
+    def test_fixtures_directory(self):
+        packets = dict(vp.iter_directory(datapaths.data_dir, check_version=False))
+        self.assertIn(datapaths.gaia_alert_16aac_direct, packets)
+        with open(datapaths.gaia_alert_16aac_direct, "rb") as f:
+            expected = vp.dumps(vp.load(f))
+        self.assertEqual(vp.dumps(packets[datapaths.gaia_alert_16aac_direct]), expected)
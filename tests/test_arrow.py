@@ -0,0 +1,157 @@
+import copy
+import datetime
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import pytest
+
+import voeventparse as vp
+from voeventparse.fixtures import datapaths
+
+pa = pytest.importorskip("pyarrow")
+pytest.importorskip("pyarrow.parquet")
+import pyarrow.dataset  # noqa: E402
+
+from voeventparse import arrow  # noqa: E402
+
+
+class TestArrowExport(TestCase):
+    def setUp(self):
+        self.packets = []
+        for path in (
+            datapaths.swift_bat_grb_pos_v2,
+            datapaths.moa_lensing_event_path,
+            datapaths.gaia_alert_16aac_direct,
+            datapaths.asassn_scraped_example,
+        ):
+            with open(path, "rb") as f:
+                self.packets.append(vp.load(f))
+        self.blank = vp.voevent(
+            stream="voevent.foo.bar/TEST", stream_id="100", role="test"
+        )
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_record_batches(self):
+        packets = self.packets + [self.blank]
+        batches = list(arrow.record_batches(packets, batch_size=2))
+        self.assertEqual([b.num_rows for b in batches], [2, 2, 1])
+        table = pa.Table.from_batches(batches)
+        self.assertEqual(table.schema, arrow.schema)
+
+        rows = table.to_pylist()
+        swift = rows[0]
+        self.assertEqual(swift["ivorn"], self.packets[0].attrib["ivorn"])
+        self.assertEqual(swift["event_time"], vp.get_event_time_as_utc(self.packets[0]))
+        posn = vp.get_event_position(self.packets[0])
+        self.assertEqual((swift["ra"], swift["dec"]), (posn.ra, posn.dec))
+
+        top = vp.get_toplevel_params(self.packets[0])
+        grouped = vp.get_grouped_params(self.packets[0])
+        n_grouped = sum(len(g) for g in grouped.values())
+        self.assertEqual(len(swift["params"]), len(top) + n_grouped)
+        packet_type = [p for p in swift["params"] if p["name"] == "Packet_Type"][0]
+        self.assertIsNone(packet_type["group"])
+        self.assertEqual(packet_type["value"], "61")
+
+        blank = rows[-1]
+        self.assertEqual(blank["role"], "test")
+        self.assertIsNone(blank["event_time"])
+        self.assertIsNone(blank["ra"])
+        self.assertEqual(blank["params"], [])
+
+    def _where_when_variants(self):
+        v = vp.voevent(stream="voevent.foo.bar/TEST", stream_id="1", role="test")
+        vp.add_where_when(
+            v,
+            coords=vp.Position2D(
+                ra=10.0, dec=20.0, err=0.1, units="deg", system="TT-ICRS-GEO"
+            ),
+            obs_time=datetime.datetime(2020, 6, 1, 12, tzinfo=datetime.timezone.utc),
+            observatory_location="GEOLUN",
+        )
+        ac = v.WhereWhen.ObsDataLocation.ObservationLocation.AstroCoords
+        offset = copy.deepcopy(v)
+        time = offset.WhereWhen.ObsDataLocation.ObservationLocation.AstroCoords.Time
+        del time.TimeInstant.ISOTime
+        time.TimeInstant.TimeOffset = 59001.5
+        time.attrib["unit"] = "d"
+        bad_time = copy.deepcopy(v)
+        bad_time.WhereWhen.ObsDataLocation.ObservationLocation.AstroCoords.Time.TimeInstant.ISOTime = "soon"
+        unknown_scale = copy.deepcopy(v)
+        ac = unknown_scale.WhereWhen.ObsDataLocation.ObservationLocation.AstroCoords
+        ac.attrib["coord_system_id"] = "TCB-ICRS-BARY"
+        return [v, offset, bad_time, unknown_scale]
+
+    def test_columns_match_convenience_routines(self):
+        packets = self.packets + [self.blank] + self._where_when_variants()
+        rows = pa.Table.from_batches(
+            list(arrow.record_batches(packets, batch_size=3))
+        ).to_pylist()
+        for v, row in zip(packets, rows):
+            try:
+                event_time = vp.get_event_time_as_utc(v)
+            except ValueError:
+                event_time = None
+            self.assertEqual(row["event_time"], event_time)
+            try:
+                posn = vp.get_event_position(v)
+            except AttributeError:
+                posn = vp.Position2D(None, None, None, None, None)
+            self.assertEqual(
+                (row["ra"], row["dec"], row["err"], row["units"], row["coord_system"]),
+                tuple(posn),
+            )
+
+    def test_record_batches_from_bytes(self):
+        raw = [vp.dumps(v) for v in self.packets]
+        table = pa.Table.from_batches(list(arrow.record_batches(raw)))
+        self.assertEqual(
+            table.column("ivorn").to_pylist(),
+            [v.attrib["ivorn"] for v in self.packets],
+        )
+
+    def test_write_parquet(self):
+        packets = self.packets + [self.blank]
+        counts = arrow.write_parquet(packets, self.tempdir, batch_size=1)
+        self.assertEqual(sum(counts.values()), len(packets))
+        self.assertEqual(counts["unknown"], 1)
+        files = os.listdir(os.path.join(self.tempdir, "event_date=unknown"))
+        self.assertEqual(len(files), 1)
+        self.assertRegex(files[0], r"^part-[0-9a-f]{32}-0\.parquet$")
+        dataset = pyarrow.dataset.dataset(self.tempdir, partitioning="hive")
+        table = dataset.to_table()
+        self.assertEqual(
+            sorted(table.column("ivorn").to_pylist()),
+            sorted(v.attrib["ivorn"] for v in packets),
+        )
+
+    def test_write_parquet_appends(self):
+        for _ in range(2):
+            arrow.write_parquet(self.packets, self.tempdir)
+        dataset = pyarrow.dataset.dataset(self.tempdir, partitioning="hive")
+        self.assertEqual(dataset.count_rows(), 2 * len(self.packets))
+        with self.assertRaises(ValueError):
+            arrow.write_parquet(self.packets, self.tempdir, basename_template="x")
+
+    def test_write_parquet_max_open_files(self):
+        # Alternate between partitions, with only one held open at a time:
+        packets = [self.packets[0], self.blank] * 3
+        counts = arrow.write_parquet(
+            packets,
+            self.tempdir,
+            batch_size=1,
+            basename_template="data-{i}.parquet",
+            max_open_files=1,
+        )
+        self.assertEqual(counts["unknown"], 3)
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.tempdir, "event_date=unknown"))),
+            ["data-0.parquet", "data-1.parquet", "data-2.parquet"],
+        )
+        dataset = pyarrow.dataset.dataset(self.tempdir, partitioning="hive")
+        self.assertEqual(dataset.count_rows(), len(packets))
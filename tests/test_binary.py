@@ -0,0 +1,72 @@
+import datetime
+from unittest import TestCase
+
+import pytz
+
+import voeventparse as vp
+from voeventparse.fixtures import datapaths
+
+
+class TestBinaryFormat(TestCase):
+    def setUp(self):
+        self.packets = []
+        for path in (
+            datapaths.swift_bat_grb_pos_v2,
+            datapaths.moa_lensing_event_path,
+            datapaths.gaia_alert_16aac_direct,
+            datapaths.asassn_scraped_example,
+        ):
+            with open(path, "rb") as f:
+                self.packets.append(vp.load(f))
+        self.blank = vp.voevent(
+            stream="voevent.foo.bar/TEST", stream_id="100", role="test"
+        )
+
+    def test_round_trip(self):
+        for v in self.packets + [self.blank]:
+            for level in (0, 6):
+                encoded = vp.binary.encode(v, compress_level=level)
+                self.assertEqual(vp.dumps(vp.binary.decode(encoded)), vp.dumps(v))
+
+    def test_compression(self):
+        v = self.packets[0]
+        self.assertLess(len(vp.binary.encode(v)), len(vp.dumps(v)))
+
+    def test_header(self):
+        swift = self.packets[0]
+        header = vp.binary.decode_header(vp.binary.encode(swift))
+        self.assertEqual(header.ivorn, swift.attrib["ivorn"])
+        self.assertEqual(header.role, "observation")
+        self.assertEqual(header.time, vp.get_event_time_as_utc(swift))
+        self.assertEqual(header.position, vp.get_event_position(swift))
+
+        header = vp.binary.decode_header(memoryview(vp.binary.encode(self.blank)))
+        self.assertEqual(header.role, "test")
+        self.assertIsNone(header.time)
+        self.assertIsNone(header.position)
+
+    def test_header_time_precision(self):
+        obs_time = datetime.datetime(2020, 1, 2, 3, 4, 5, 678901, tzinfo=pytz.UTC)
+        vp.add_where_when(
+            self.blank,
+            coords=vp.Position2D(
+                ra=1.5, dec=-2.5, err=0.1, units="deg", system="UTC-FK5-GEO"
+            ),
+            obs_time=obs_time,
+            observatory_location=vp.definitions.ObservatoryLocation.geosurface,
+        )
+        header = vp.binary.decode_header(vp.binary.encode(self.blank))
+        self.assertEqual(header.time, obs_time)
+
+    def test_bad_magic(self):
+        with self.assertRaises(ValueError):
+            vp.binary.decode(b"<?xml version='1.0'?><VOEvent/>")
+
+    def test_long_header_string(self):
+        self.blank.attrib["ivorn"] = "ivo://foo/bar#" + "x" * 70000
+        with self.assertRaises(ValueError):
+            vp.binary.encode(self.blank)
+        # Long strings elsewhere are only limited by the body length:
+        v = self.packets[0]
+        v.What.Description = "x" * 70000
+        self.assertEqual(vp.dumps(vp.binary.decode(vp.binary.encode(v))), vp.dumps(v))
@@ -0,0 +1,129 @@
+import datetime
+from unittest import TestCase
+
+import numpy as np
+
+import voeventparse as vp
+from voeventparse.bulk import Column, PacketSpec, author_packets, build_packet
+
+
+def make_table(n_rows):
+    rng = np.random.default_rng(42)
+    start = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+    return {
+        "id": np.arange(n_rows),
+        "ra": rng.uniform(0, 360, n_rows),
+        "dec": rng.uniform(-90, 90, n_rows),
+        "err": rng.uniform(0, 0.1, n_rows),
+        "mag": rng.uniform(10, 20, n_rows),
+        "count": rng.integers(0, 100, n_rows),
+        "flagged": rng.integers(0, 2, n_rows).astype(bool),
+        "filter": rng.choice(["g", "r", "i"], n_rows),
+        "detected": [
+            start + datetime.timedelta(seconds=int(s), microseconds=int(us))
+            for s, us in zip(
+                rng.integers(0, 10**7, n_rows), rng.integers(0, 10**6, n_rows)
+            )
+        ],
+    }
+
+
+def make_spec():
+    return PacketSpec(
+        stream="voevent.example.org/SURVEY",
+        stream_id=Column("id"),
+        role="test",
+        author_ivorn="voevent.example.org",
+        date=Column("detected"),
+        position=vp.Position2D(
+            ra=Column("ra"),
+            dec=Column("dec"),
+            err=Column("err"),
+            units="deg",
+            system="UTC-ICRS-GEO",
+        ),
+        obs_time=Column("detected"),
+        observatory_location="GEOSURFACE",
+        params=[
+            {"name": "mag", "value": Column("mag"), "unit": "mag", "ucd": "phot.mag"},
+            {"name": "count", "value": Column("count")},
+            {"name": "flagged", "value": Column("flagged")},
+        ],
+        groups=[
+            {
+                "name": "photometry",
+                "params": [
+                    {"name": "filter", "value": Column("filter"), "ucd": "instr"}
+                ],
+            }
+        ],
+    )
+
+
+def _as_objects(column):
+    return [
+        value.item() if isinstance(value, np.generic) else value for value in column
+    ]
+
+
+def rows(table):
+    names = list(table)
+    columns = [_as_objects(table[name]) for name in names]
+    for values in zip(*columns):
+        yield dict(zip(names, values))
+
+
+class TestAuthorPackets(TestCase):
+    def setUp(self):
+        self.table = make_table(200)
+        self.spec = make_spec()
+        self.expected = [
+            vp.dumps(build_packet(self.spec, row)) for row in rows(self.table)
+        ]
+
+    def test_matches_per_packet_path(self):
+        packets = list(author_packets(self.spec, self.table, chunk_size=64))
+        self.assertEqual(len(packets), 200)
+        self.assertEqual(packets, self.expected)
+        for packet in packets[:5]:
+            self.assertTrue(vp.valid_as_v2_0(vp.loads(packet)))
+
+    def test_multiprocessing(self):
+        packets = list(
+            author_packets(self.spec, self.table, processes=2, chunk_size=64)
+        )
+        self.assertEqual(packets, self.expected)
+
+    def test_structure_changes(self):
+        # Missing values change the packet structure; such rows are built from
+        # scratch.
+        table = {
+            "id": ["a", "b", "c", "d"],
+            "mag": [12.5, None, 13, "faint"],
+            "unit": ["mag", "mag", None, "mag"],
+            "importance": [None, 0.1, 0.2, None],
+        }
+        spec = PacketSpec(
+            stream="voevent.example.org/SURVEY",
+            stream_id=Column("id"),
+            role="test",
+            params=[{"name": "mag", "value": Column("mag"), "unit": Column("unit")}],
+            importance=Column("importance"),
+        )
+        expected = [vp.dumps(build_packet(spec, row)) for row in rows(table)]
+        self.assertEqual(list(author_packets(spec, table)), expected)
+
+    def test_missing_position_fields(self):
+        table = make_table(6)
+        table = {name: _as_objects(column) for name, column in table.items()}
+        table["err"][0] = None
+        table["err"][2] = None
+        table["ra"][4] = None
+        expected = [vp.dumps(build_packet(self.spec, row)) for row in rows(table)]
+        self.assertIn(b'xsi:nil="true"', expected[2])
+        self.assertEqual(list(author_packets(self.spec, table)), expected)
+
+    def test_no_columns(self):
+        spec = PacketSpec(stream="voevent.example.org/SURVEY", stream_id=1, role="test")
+        with self.assertRaises(ValueError):
+            list(author_packets(spec, {}))
@@ -0,0 +1,118 @@
+import threading
+from unittest import TestCase
+
+import voeventparse as vp
+from voeventparse.fixtures import datapaths
+
+
+class TestSniff(TestCase):
+    def test_sniff_ivorn(self):
+        for path in (
+            datapaths.swift_bat_grb_pos_v2,
+            datapaths.gaia_alert_16aac_direct,
+            datapaths.no_namespace_test_packet,
+        ):
+            with open(path, "rb") as f:
+                raw = f.read()
+            self.assertEqual(vp.sniff_ivorn(raw), vp.loads(raw).attrib["ivorn"])
+
+    def test_sniff_root_attributes(self):
+        with open(datapaths.swift_bat_grb_pos_v2, "rb") as f:
+            attrib = vp.sniff_root_attributes(f.read())
+        self.assertEqual(attrib["role"], "observation")
+        self.assertEqual(attrib["version"], "2.0")
+        self.assertEqual(vp.sniff_root_attributes(b"<foo/>"), {})
+        self.assertIsNone(vp.sniff_ivorn(b"<foo/>"))
+
+    def test_sniff_why_and_citations(self):
+        with open(datapaths.swift_bat_grb_pos_v2, "rb") as f:
+            raw = f.read()
+        self.assertEqual(vp.sniff_importance(raw), 0.9)
+        self.assertEqual(vp.sniff_cite_types(raw), [])
+        with open(datapaths.swift_xrt_pos_v1, "rb") as f:
+            raw = f.read()
+        self.assertEqual(vp.sniff_importance(raw), 0.99)
+        self.assertEqual(vp.sniff_cite_types(raw), ["followup"])
+        self.assertIsNone(vp.sniff_importance(b"<foo><Why/></foo>"))
+        self.assertIsNone(vp.sniff_importance(b"<foo/>"))
+
+
+class TestPacketCache(TestCase):
+    def setUp(self):
+        self.raw = {}
+        for path in (
+            datapaths.swift_bat_grb_pos_v2,
+            datapaths.moa_lensing_event_path,
+            datapaths.gaia_alert_16aac_direct,
+        ):
+            with open(path, "rb") as f:
+                self.raw[path] = f.read()
+
+    def test_hits_and_misses(self):
+        for key in ("digest", "ivorn"):
+            cache = vp.PacketCache(key=key)
+            raw = self.raw[datapaths.swift_bat_grb_pos_v2]
+            v1 = cache.loads(raw)
+            v2 = cache.loads(raw)
+            self.assertEqual(vp.dumps(v1), vp.dumps(vp.loads(raw)))
+            self.assertEqual(vp.dumps(v2), vp.dumps(v1))
+            stats = cache.stats()
+            self.assertEqual((stats.hits, stats.misses), (1, 1))
+            self.assertEqual(stats.entries, 1)
+            self.assertEqual(stats.size_bytes, len(raw))
+
+    def test_private_copies(self):
+        cache = vp.PacketCache()
+        raw = self.raw[datapaths.swift_bat_grb_pos_v2]
+        v1 = cache.loads(raw)
+        v1.Who.AuthorIVORN = "ivo://changed"
+        v2 = cache.loads(raw)
+        self.assertNotEqual(v2.Who.AuthorIVORN, "ivo://changed")
+        self.assertIsNot(v1, v2)
+
+    def test_shared(self):
+        cache = vp.PacketCache(shared=True)
+        raw = self.raw[datapaths.swift_bat_grb_pos_v2]
+        self.assertIs(cache.loads(raw), cache.loads(raw))
+
+    def test_eviction(self):
+        sizes = [len(raw) for raw in self.raw.values()]
+        cache = vp.PacketCache(max_bytes=sum(sizes) - 1)
+        for raw in self.raw.values():
+            cache.loads(raw)
+        stats = cache.stats()
+        self.assertEqual(stats.evictions, 1)
+        self.assertEqual(stats.entries, 2)
+        self.assertLessEqual(stats.size_bytes, stats.max_bytes)
+        # Least recently used was the first loaded, so that one was evicted:
+        cache.loads(self.raw[datapaths.swift_bat_grb_pos_v2])
+        self.assertEqual(cache.stats().misses, 4)
+
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.stats().size_bytes, 0)
+
+    def test_version_check(self):
+        cache = vp.PacketCache()
+        with open(datapaths.swift_xrt_pos_v1, "rb") as f:
+            raw = f.read()
+        cache.loads(raw, check_version=False)
+        with self.assertRaises(ValueError):
+            cache.loads(raw)
+
+    def test_threaded_access(self):
+        cache = vp.PacketCache(max_bytes=len(self.raw[datapaths.swift_bat_grb_pos_v2]))
+        raws = list(self.raw.values())
+
+        def worker():
+            for i in range(20):
+                cache.loads(raws[i % len(raws)])
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        stats = cache.stats()
+        self.assertEqual(stats.hits + stats.misses, 80)
+        self.assertLessEqual(stats.size_bytes, stats.max_bytes)
@@ -3,6 +3,7 @@ from copy import copy
 from unittest import TestCase
 
 import iso8601
+import numpy as np
 import pytest
 
 import voeventparse as vp
@@ -31,6 +32,24 @@ class TestConvenienceRoutines(TestCase):
         self.assertEqual(p, known_swift_grb_posn)
         self.assertIsInstance(p.ra, float)
 
+    def test_default_namespace(self):
+        # The VOEvent namespace as the default namespace, so left on the root
+        # tag (and applying to all elements):
+        with open(datapaths.swift_bat_grb_pos_v2, "rb") as f:
+            raw = f.read()
+        raw = raw.replace(b"voe:VOEvent", b"VOEvent").replace(b"xmlns:voe", b"xmlns")
+        v = vp.loads(raw)
+        swift = self.swift_grb_v2_packet
+        self.assertEqual(vp.get_event_position(v), vp.get_event_position(swift))
+        self.assertEqual(vp.get_event_time_as_utc(v), vp.get_event_time_as_utc(swift))
+        self.assertEqual(vp.get_toplevel_params(v), vp.get_toplevel_params(swift))
+        self.assertEqual(vp.get_grouped_params(v), vp.get_grouped_params(swift))
+        self.assertEqual(
+            vp.param_index(v).value("Sun_RA", "Obs_Support_Info"), "165.99"
+        )
+        trajectory = vp.get_event_trajectory(v)
+        self.assertEqual(list(trajectory.ra), [74.7412])
+
     def test_pull_params(self):
         """
         Basic functionality tested here, but this function is deprecated
@@ -151,6 +170,117 @@ class TestConvenienceRoutines(TestCase):
         misinterpreted_as_utc = iso8601.parse_date(raw_iso_string)
         self.assertNotEqual(converted_isotime, misinterpreted_as_utc)
 
+    def _packet_in_time_scale(self, scale):
+        v = vp.voevent(stream="voevent.soton.ac.uk/TEST", stream_id=1, role="test")
+        vp.add_where_when(
+            v,
+            coords=vp.Position2D(
+                ra=10.0,
+                dec=20.0,
+                err=0.1,
+                units="deg",
+                system=scale + "-ICRS-GEO",
+            ),
+            obs_time=datetime.datetime(2020, 6, 1, 12, tzinfo=datetime.timezone.utc),
+            observatory_location="GEOLUN",
+        )
+        return v
+
+    def test_get_event_time_as_utc_from_TT_and_GPS(self):
+        gps_packet = self._packet_in_time_scale("GPS")
+        self.assertEqual(
+            vp.get_event_time_as_utc(gps_packet),
+            datetime.datetime(2020, 6, 1, 11, 59, 42, tzinfo=datetime.timezone.utc),
+        )
+        tt_packet = self._packet_in_time_scale("TT")
+        self.assertEqual(
+            vp.get_event_time_as_utc(tt_packet),
+            datetime.datetime(
+                2020, 6, 1, 11, 58, 50, 816000, tzinfo=datetime.timezone.utc
+            ),
+        )
+
+    def test_get_event_time_as_utc_from_time_offset(self):
+        v = self._packet_in_time_scale("TT")
+        time = v.WhereWhen.ObsDataLocation.ObservationLocation.AstroCoords.Time
+        instant = time.TimeInstant
+        del instant.ISOTime
+        instant.TimeOffset = 59001.5
+        instant.TimeScale = "MJD"
+        time.attrib["unit"] = "d"
+        self.assertEqual(
+            vp.get_event_time_as_utc(v),
+            datetime.datetime(
+                2020, 6, 1, 11, 58, 50, 816000, tzinfo=datetime.timezone.utc
+            ),
+        )
+        # Offset in seconds, from an explicit origin:
+        instant.TimeOffset = 43200
+        instant.TimeScale = "2020-06-01T00:00:00"
+        time.attrib["unit"] = "s"
+        self.assertEqual(
+            vp.get_event_time_as_utc(v),
+            datetime.datetime(
+                2020, 6, 1, 11, 58, 50, 816000, tzinfo=datetime.timezone.utc
+            ),
+        )
+
+
+class TestTrajectory(TestCase):
+    def setUp(self):
+        self.v = vp.voevent(stream="voevent.soton.ac.uk/TEST", stream_id=1, role="test")
+        start = datetime.datetime(2020, 6, 1, 12, tzinfo=datetime.timezone.utc)
+        self.systems = ["UTC-ICRS-GEO", "TT-ICRS-GEO", "TDB-ICRS-BARY", "GPS-FK5-GEO"]
+        for i, system in enumerate(self.systems):
+            vp.add_where_when(
+                self.v,
+                coords=vp.Position2D(
+                    ra=10.0 + i, dec=-20.0 - i, err=0.1 * i, units="deg", system=system
+                ),
+                obs_time=start + datetime.timedelta(hours=i, microseconds=i),
+                observatory_location="GEOLUN",
+            )
+
+    def test_matches_per_index_routines(self):
+        traj = vp.get_event_trajectory(self.v)
+        self.assertEqual(len(traj.time), len(self.systems))
+        self.assertEqual(list(traj.system), self.systems)
+        for i in range(len(self.systems)):
+            posn = vp.get_event_position(self.v, index=i)
+            self.assertEqual(posn.system, self.systems[i])
+            self.assertEqual(
+                (traj.ra[i], traj.dec[i], traj.err[i], traj.units[i]),
+                (posn.ra, posn.dec, posn.err, posn.units),
+            )
+            event_time = vp.get_event_time_as_utc(self.v, index=i)
+            self.assertEqual(
+                traj.time[i].astype(datetime.datetime),
+                event_time.replace(tzinfo=None),
+            )
+
+    def test_fixture_packets(self):
+        with open(datapaths.gaia_alert_16aac_direct, "rb") as f:
+            gaia = vp.load(f)
+        traj = vp.get_event_trajectory(gaia)
+        self.assertEqual(traj.ra[0], 73.29423)
+        self.assertEqual(
+            traj.time[0].astype(datetime.datetime),
+            vp.get_event_time_as_utc(gaia).replace(tzinfo=None),
+        )
+
+    def test_missing_values(self):
+        blank = vp.voevent(stream="voevent.soton.ac.uk/TEST", stream_id=1, role="test")
+        traj = vp.get_event_trajectory(blank)
+        self.assertEqual(len(traj.ra), 0)
+        ac = self.v.WhereWhen.ObsDataLocation[1].ObservationLocation.AstroCoords
+        del ac.Time
+        del ac.Position2D
+        traj = vp.get_event_trajectory(self.v)
+        self.assertTrue(np.isnat(traj.time[1]))
+        self.assertTrue(np.isnan(traj.ra[1]))
+        self.assertIsNone(traj.units[1])
+        self.assertFalse(np.isnat(traj.time[2]))
+
 
 class TestPrettyStr(TestCase):
     def setUp(self):
@@ -0,0 +1,72 @@
+import datetime
+import json
+from unittest import TestCase
+
+import voeventparse as vp
+from voeventparse.fixtures import datapaths
+
+
+class TestDictConversion(TestCase):
+    def setUp(self):
+        self.packets = []
+        for path in (
+            datapaths.swift_bat_grb_pos_v2,
+            datapaths.moa_lensing_event_path,
+            datapaths.gaia_alert_16aac_direct,
+            datapaths.asassn_scraped_example,
+            datapaths.no_namespace_test_packet,
+        ):
+            with open(path, "rb") as f:
+                self.packets.append(vp.load(f))
+
+    def authored_packet(self):
+        v = vp.voevent(stream="voevent.foo.bar/TEST", stream_id="100", role="test")
+        vp.set_who(v, date=datetime.datetime(2020, 1, 1), author_ivorn="foo.bar")
+        v.What.append(vp.param(name="The Answer", value=42))
+        v.What.append(
+            vp.group([vp.param(name="flux", value=1.5, unit="mJy")], name="phot")
+        )
+        vp.add_citations(
+            v,
+            vp.event_ivorn(
+                "ivo://foo.bar/TEST#99", cite_type=vp.definitions.CiteTypes.followup
+            ),
+        )
+        return v
+
+    def test_round_trip(self):
+        for v in self.packets + [self.authored_packet()]:
+            d = vp.to_dict(v)
+            self.assertEqual(vp.dumps(vp.from_dict(d)), vp.dumps(v))
+            # Also survives a trip through JSON:
+            d = json.loads(json.dumps(d))
+            self.assertEqual(vp.dumps(vp.from_dict(d)), vp.dumps(v))
+
+    def test_mapping(self):
+        d = vp.to_dict(self.authored_packet())
+        self.assertEqual(d["tag"], "{http://www.ivoa.net/xml/VOEvent/v2.0}VOEvent")
+        self.assertEqual(d["nsmap"]["voe"], "http://www.ivoa.net/xml/VOEvent/v2.0")
+        self.assertEqual(d["attrib"]["role"], "test")
+        what = [c for c in d["children"] if c.get("tag") == "What"][0]
+        param, group = what["children"]
+        # No objectify type annotations:
+        self.assertEqual(
+            param["attrib"],
+            {"name": "The Answer", "value": "42", "dataType": "int"},
+        )
+        self.assertEqual(group["attrib"], {"name": "phot"})
+        self.assertEqual(group["children"][0]["attrib"]["unit"], "mJy")
+
+    def test_plain_attrib(self):
+        v = vp.voevent("foo/bar", 1, "test")
+        v.What.Param = 42
+        v.What.Param.attrib["name"] = "answer"
+        self.assertIn(vp.conversion._PYTYPE_ATTRIB, v.What.Param.attrib)
+        self.assertEqual(vp.plain_attrib(v.What.Param), {"name": "answer"})
+
+    def test_from_dict_supports_convenience_routines(self):
+        swift = self.packets[0]
+        v = vp.from_dict(vp.to_dict(swift))
+        self.assertEqual(v.tag, "VOEvent")
+        self.assertTrue(vp.valid_as_v2_0(v))
+        self.assertEqual(vp.get_event_position(v), vp.get_event_position(swift))
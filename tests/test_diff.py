@@ -0,0 +1,84 @@
+import copy
+import json
+from unittest import TestCase
+
+import voeventparse as vp
+from voeventparse.diff import apply_patch, diff, make_patch
+from voeventparse.fixtures import datapaths
+from voeventparse.hashing import subtree_hash
+
+
+def load(path):
+    with open(path, "rb") as f:
+        return vp.load(f)
+
+
+class TestDiff(TestCase):
+    def setUp(self):
+        self.base = load(datapaths.swift_bat_grb_pos_v2)
+
+    def assertPatches(self, a, b):
+        patch = json.loads(json.dumps(make_patch(a, b)))
+        a_bytes = vp.dumps(a)
+        self.assertEqual(vp.dumps(apply_patch(a, patch)), vp.dumps(b))
+        # The original is untouched:
+        self.assertEqual(vp.dumps(a), a_bytes)
+        return patch["ops"]
+
+    def test_equal(self):
+        other = copy.deepcopy(self.base)
+        self.assertEqual(diff(self.base, other), [])
+        self.assertEqual(subtree_hash(self.base), subtree_hash(other))
+        self.assertEqual(self.assertPatches(self.base, other), [])
+
+    def test_changed_param(self):
+        other = copy.deepcopy(self.base)
+        other.What.Param[1].attrib["value"] = "12345"
+        other.Who.Date = "2020-01-01T00:00:00"
+        ops = self.assertPatches(self.base, other)
+        self.assertEqual(sorted(op["op"] for op in ops), ["attrib", "text"])
+        self.assertNotEqual(subtree_hash(self.base), subtree_hash(other))
+
+    def test_added_and_removed_elements(self):
+        other = copy.deepcopy(self.base)
+        other.What.remove(other.What.Param[0])
+        other.What.append(vp.param(name="new", value=1.5))
+        vp.add_citations(
+            other,
+            vp.event_ivorn(
+                "ivo://nasa.gsfc.gcn/SWIFT#BAT_GRB_Pos_532871-729",
+                cite_type=vp.definitions.CiteTypes.supersedes,
+            ),
+        )
+        ops = self.assertPatches(self.base, other)
+        self.assertIn("insert", [op["op"] for op in ops])
+        self.assertIn("remove", [op["op"] for op in ops])
+        # And back again:
+        self.assertPatches(other, self.base)
+
+    def test_unrelated_packets(self):
+        other = load(datapaths.moa_lensing_event_path)
+        self.assertPatches(self.base, other)
+        self.assertPatches(other, self.base)
+        no_ns = load(datapaths.no_namespace_test_packet)
+        ops = self.assertPatches(self.base, no_ns)
+        self.assertEqual(ops[0]["op"], "replace")
+
+    def test_memo(self):
+        memo = {}
+        other = copy.deepcopy(self.base)
+        other.What.Param[0].attrib["value"] = "62"
+        ops = diff(self.base, other, memo)
+        self.assertEqual(diff(self.base, other, memo), ops)
+        self.assertEqual(diff(self.base, other), ops)
+
+    def test_wrong_base(self):
+        other = copy.deepcopy(self.base)
+        other.attrib["role"] = "test"
+        patch = make_patch(self.base, other)
+        with self.assertRaises(ValueError):
+            apply_patch(other, patch)
+        # Bare operations are applied unchecked:
+        self.assertEqual(
+            vp.dumps(apply_patch(self.base, patch["ops"])), vp.dumps(other)
+        )
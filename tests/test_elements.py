@@ -0,0 +1,67 @@
+import datetime
+from unittest import TestCase
+
+from lxml import objectify
+
+import voeventparse as vp
+from voeventparse.fixtures import datapaths
+
+
+class TestTypedElements(TestCase):
+    def setUp(self):
+        self.parser = vp.elements.make_parser()
+        with open(datapaths.swift_bat_grb_pos_v2, "rb") as f:
+            self.raw = f.read()
+        self.v = vp.loads(self.raw, parser=self.parser)
+
+    def test_default_classes_unchanged(self):
+        v = vp.loads(self.raw)
+        self.assertNotIsInstance(v.What.Param[0], vp.elements.Param)
+        self.assertEqual(objectify.dump(v), objectify.dump(vp.loads(self.raw)))
+
+    def test_param_typed_value(self):
+        with open(datapaths.gaia_alert_16aac_direct, "rb") as f:
+            v = vp.loads(f.read(), parser=self.parser)
+        current, historic = v.What.Group
+        self.assertIsInstance(current.Param[0], vp.elements.Param)
+        self.assertEqual(current.Param[0].typed_value, 17.32)
+        self.assertEqual(current.Param[1].typed_value, 0.05)
+        # Empty numeric values are treated as missing:
+        self.assertIsNone(historic.Param[0].typed_value)
+        self.assertEqual(v.What.Param[1].typed_value, "TCB")
+        with open(datapaths.no_namespace_test_packet, "rb") as f:
+            v = vp.loads(f.read(), parser=self.parser)
+        ports = [p.typed_value for p in v.What.iter("Param") if p.get("name") == "Port"]
+        self.assertEqual(ports, [8099, 8098])
+
+    def test_param_typed_value_no_datatype(self):
+        self.v.What.append(vp.param(name="foo", value="1.5", ac=False))
+        added = self.v.What.Param[-1]
+        # Elements added later are given the typed classes too:
+        self.assertIsInstance(added, vp.elements.Param)
+        self.assertEqual(added.typed_value, "1.5")
+        self.v.What.append(vp.param(name="bar"))
+        self.assertIsNone(self.v.What.Param[-1].typed_value)
+
+    def test_position(self):
+        od = self.v.WhereWhen.ObsDataLocation
+        self.assertIsInstance(od, vp.elements.ObsDataLocation)
+        self.assertEqual(od.position, vp.get_event_position(vp.loads(self.raw)))
+
+    def test_isotime(self):
+        isotime = (
+            self.v.WhereWhen.ObsDataLocation.ObservationLocation.AstroCoords.Time
+        ).TimeInstant.ISOTime
+        self.assertIsInstance(isotime, vp.elements.ISOTime)
+        self.assertEqual(str(isotime), "2012-09-07T00:24:23.08")
+        self.assertEqual(
+            isotime.datetime,
+            datetime.datetime(
+                2012, 9, 7, 0, 24, 23, 80000, tzinfo=datetime.timezone.utc
+            ),
+        )
+        self.assertEqual(isotime.datetime, vp.get_event_time_as_utc(self.v))
+
+    def test_roundtrip(self):
+        self.assertEqual(vp.dumps(self.v), vp.dumps(vp.loads(self.raw)))
+        self.assertTrue(vp.valid_as_v2_0(self.v))
@@ -0,0 +1,115 @@
+from unittest import TestCase
+
+from lxml import etree
+
+import voeventparse as vp
+from voeventparse.feed import VoeventFeedParser
+from voeventparse.fixtures import datapaths
+from voeventparse.hashing import subtree_hash
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def frame(raw):
+    return len(raw).to_bytes(4, "big") + raw
+
+
+def chunked(data, size):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+class TestFeedParser(TestCase):
+    def setUp(self):
+        self.packets = [
+            read(path)
+            for path in (
+                datapaths.swift_bat_grb_pos_v2,
+                datapaths.moa_lensing_event_path,
+                datapaths.no_namespace_test_packet,
+            )
+        ]
+        self.hashes = [subtree_hash(vp.loads(raw)) for raw in self.packets]
+
+    def test_single_document(self):
+        raw = self.packets[0]
+        parser = VoeventFeedParser()
+        for chunk in chunked(raw, 100):
+            self.assertEqual(parser.feed(chunk), [])
+        self.assertTrue(parser.in_packet)
+        v = parser.close()
+        self.assertFalse(parser.in_packet)
+        self.assertEqual(subtree_hash(v), self.hashes[0])
+        self.assertEqual(vp.dumps(v), vp.dumps(vp.loads(raw)))
+        # The parser may be reused:
+        parser.feed(self.packets[1])
+        self.assertEqual(subtree_hash(parser.close()), self.hashes[1])
+
+    def test_framed_stream(self):
+        stream = b"".join(frame(raw) for raw in self.packets)
+        # Including chunks which split the length prefixes:
+        for size in (1, 3, 500, len(stream)):
+            parser = VoeventFeedParser(framed=True)
+            packets = []
+            for chunk in chunked(stream, size):
+                packets.extend(parser.feed(memoryview(chunk)))
+            parser.close()
+            self.assertEqual([subtree_hash(v) for v in packets], self.hashes)
+
+    def test_emitted_on_completion(self):
+        parser = VoeventFeedParser(framed=True)
+        first = frame(self.packets[0])
+        self.assertEqual(parser.feed(first[:-1]), [])
+        packets = parser.feed(first[-1:] + frame(self.packets[1])[:10])
+        self.assertEqual([subtree_hash(v) for v in packets], self.hashes[:1])
+        self.assertTrue(parser.in_packet)
+        with self.assertRaises(ValueError):
+            parser.close()
+        self.assertFalse(parser.in_packet)
+
+    def test_bad_packet_skipped(self):
+        bad = self.packets[0].replace(b"</Who>", b"</Whom>")
+        stream = frame(self.packets[0]) + frame(bad) + frame(self.packets[1])
+        parser = VoeventFeedParser(framed=True)
+        with self.assertRaises(etree.XMLSyntaxError):
+            parser.feed(stream)
+        self.assertEqual(
+            [subtree_hash(v) for v in parser.read_packets()],
+            [self.hashes[0], self.hashes[1]],
+        )
+        self.assertEqual(parser.read_packets(), [])
+        # The stream continues:
+        packets = parser.feed(frame(self.packets[2]))
+        self.assertEqual([subtree_hash(v) for v in packets], self.hashes[2:])
+
+    def test_transport_messages(self):
+        iamalive = (
+            b'<?xml version="1.0" encoding="UTF-8"?>\n'
+            b'<trn:Transport role="iamalive" version="1.0" '
+            b'xmlns:trn="http://telescope-networks.org/schema/Transport/v1.1" '
+            b'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+            b'xsi:schemaLocation="http://telescope-networks.org/schema/Transport/'
+            b'v1.1 http://telescope-networks.org/schema/Transport-v1.1.xsd">'
+            b"<Origin>ivo://foo/bar</Origin>"
+            b"<TimeStamp>2020-01-01T00:00:00Z</TimeStamp>"
+            b"</trn:Transport>"
+        )
+        stream = frame(iamalive) + frame(self.packets[0]) + frame(iamalive)
+        parser = VoeventFeedParser(framed=True)
+        packets = parser.feed(stream)
+        self.assertEqual(
+            [v.tag for v in packets], ["Transport", "VOEvent", "Transport"]
+        )
+        self.assertEqual(packets[0].attrib["role"], "iamalive")
+        self.assertEqual(packets[0].Origin, "ivo://foo/bar")
+        self.assertEqual(subtree_hash(packets[1]), self.hashes[0])
+
+    def test_check_version(self):
+        raw = read(datapaths.swift_xrt_pos_v1)
+        parser = VoeventFeedParser(framed=True)
+        with self.assertRaises(ValueError):
+            parser.feed(frame(raw))
+        parser = VoeventFeedParser(framed=True, check_version=False)
+        self.assertEqual(len(parser.feed(frame(raw))), 1)
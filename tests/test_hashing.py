@@ -0,0 +1,60 @@
+import copy
+from unittest import TestCase
+
+from lxml import objectify
+
+import voeventparse as vp
+from voeventparse.fixtures import datapaths
+from voeventparse.hashing import subtree_digest, subtree_hash
+
+
+class TestSubtreeHash(TestCase):
+    def setUp(self):
+        with open(datapaths.swift_bat_grb_pos_v2, "rb") as f:
+            self.raw = f.read()
+        self.v = vp.loads(self.raw)
+
+    def test_independent_of_formatting(self):
+        h = subtree_hash(self.v)
+        self.assertEqual(len(h), 32)
+        # Pretty printing, annotations and a different namespace prefix:
+        pretty = vp.loads(vp.dumps(self.v, pretty_print=True))
+        self.assertEqual(subtree_hash(pretty), h)
+        annotated = copy.deepcopy(self.v)
+        objectify.annotate(annotated)
+        self.assertEqual(subtree_hash(annotated), h)
+        renamed = vp.loads(
+            self.raw.replace(b"voe:VOEvent", b"foo:VOEvent").replace(
+                b"xmlns:voe=", b"xmlns:foo="
+            )
+        )
+        self.assertEqual(subtree_hash(renamed), h)
+        # Attribute order:
+        reordered = copy.deepcopy(self.v)
+        param = reordered.What.Param[0]
+        attrib = dict(param.attrib)
+        param.attrib.clear()
+        for key in reversed(list(attrib)):
+            param.set(key, attrib[key])
+        self.assertEqual(subtree_hash(reordered), h)
+
+    def test_sensitive_to_content(self):
+        h = subtree_hash(self.v)
+        what_hash = subtree_hash(self.v.What)
+        other = copy.deepcopy(self.v)
+        other.What.Param[0].attrib["value"] = "62"
+        self.assertNotEqual(subtree_hash(other), h)
+        self.assertNotEqual(subtree_hash(other.What), what_hash)
+        self.assertEqual(subtree_hash(other.WhereWhen), subtree_hash(self.v.WhereWhen))
+        other = copy.deepcopy(self.v)
+        other.Who.Date = "2020-01-01T00:00:00"
+        self.assertNotEqual(subtree_hash(other), h)
+
+    def test_memo(self):
+        memo = {}
+        what = subtree_digest(self.v.What, memo)
+        n_entries = len(memo)
+        self.assertEqual(subtree_digest(self.v.What, memo), what)
+        self.assertEqual(len(memo), n_entries)
+        self.assertEqual(subtree_digest(self.v, memo), subtree_digest(self.v))
+        self.assertEqual(subtree_digest(self.v.What, memo), what)
@@ -0,0 +1,94 @@
+import copy
+import sys
+from unittest import TestCase, skipUnless
+
+import voeventparse as vp
+from voeventparse.fixtures import datapaths
+
+
+class TestParamIndex(TestCase):
+    def setUp(self):
+        with open(datapaths.swift_bat_grb_pos_v2, "rb") as f:
+            self.raw = f.read()
+        self.v = vp.loads(self.raw)
+
+    def test_lookups(self):
+        index = vp.ParamIndex(self.v)
+        self.assertEqual(index.value("Packet_Type"), "61")
+        self.assertIs(index.param("Packet_Type"), self.v.What.Param[0])
+        self.assertIsNone(index.param("Packet_Type", group="Misc_Flags"))
+        self.assertEqual(index.value("Nonexistent", default="x"), "x")
+        group = index.group("Misc_Flags")
+        self.assertEqual(group.attrib["name"], "Misc_Flags")
+        self.assertEqual(
+            index.value("Values_Out_of_Range", group="Misc_Flags"), "false"
+        )
+        self.assertEqual(len(index.params("Values_Out_of_Range")), 1)
+        self.assertEqual(index.params("Nonexistent"), [])
+        # Agrees with the convenience routines:
+        grouped = vp.get_grouped_params(self.v)
+        for group_name, params in grouped.items():
+            for name, attrib in params.items():
+                self.assertEqual(index.value(name, group=group_name), attrib["value"])
+        for name, attrib in vp.get_toplevel_params(self.v).items():
+            self.assertEqual(index.value(name), attrib.get("value"))
+
+    def test_other_trees(self):
+        view = vp.loads(self.raw, mode="etree")
+        index = vp.param_index(view)
+        self.assertIsInstance(index.param("Packet_Type"), vp.ElementView)
+        self.assertEqual(index.value("Packet_Type"), "61")
+        partial = vp.loads_partial(self.raw)
+        self.assertEqual(vp.param_index(partial).value("Packet_Type"), "61")
+        no_what = vp.voevent("foo", "1", vp.definitions.Roles.test)
+        no_what.remove(no_what.What)
+        self.assertIsNone(vp.param_index(no_what).param("Packet_Type"))
+
+    def test_cached(self):
+        index = vp.param_index(self.v)
+        self.assertIs(vp.param_index(self.v), index)
+        self.assertIsNot(vp.param_index(self.v, rebuild=True), index)
+        # Values are read on lookup:
+        self.v.What.Param[0].attrib["value"] = "62"
+        self.assertEqual(vp.param_index(self.v).value("Packet_Type"), "62")
+
+    def test_invalidation(self):
+        v = self.v
+        index = vp.param_index(v)
+        # Elements from the authoring helpers:
+        p = vp.param("Extra", value=1)
+        g = vp.group([vp.param("Inner", value=2)], name="Extra_Group")
+        self.assertFalse(index.stale)
+        v.What.append(p)
+        v.What.append(g)
+        self.assertTrue(index.stale)
+        index = vp.param_index(v)
+        self.assertEqual(index.value("Extra"), "1")
+        self.assertEqual(index.value("Inner", group="Extra_Group"), "2")
+        # Other additions and removals, found by the child counts:
+        v.What.remove(v.What.Param[0])
+        self.assertTrue(index.stale)
+        self.assertIsNone(vp.param_index(v).param("Packet_Type"))
+        group = vp.param_index(v).group("Misc_Flags")
+        group.append(copy.deepcopy(group.Param[0]))
+        self.assertEqual(len(vp.param_index(v).params("Values_Out_of_Range")), 2)
+        # Or a replaced What section:
+        what = copy.deepcopy(v.What)
+        v.remove(v.What)
+        what.remove(what.Param[0])
+        self.assertIsNone(vp.param_index(v).param("Pkt_Ser_Num"))
+        v.insert(1, what)
+        self.assertIsNone(vp.param_index(v).param("Pkt_Ser_Num"))
+        self.assertIsNotNone(vp.param_index(v).param("TrigID"))
+
+    @skipUnless(hasattr(sys, "getrefcount"), "needs reference counts")
+    def test_cache_releases_packets(self):
+        vp.param_index(self.v)
+        key = (id(self.v), False)
+        self.assertIn(key, vp.index._index_cache)
+        del self.v
+        # Dropped once another index is built:
+        other = vp.loads(self.raw)
+        vp.param_index(other)
+        self.assertNotIn(key, vp.index._index_cache)
+        self.assertIn((id(other), False), vp.index._index_cache)
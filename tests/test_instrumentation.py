@@ -0,0 +1,85 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import voeventparse as vp
+import voeventparse.instrumentation as vpi
+from voeventparse.fixtures import datapaths
+
+
+class TestInstrumentation(TestCase):
+    def setUp(self):
+        with open(datapaths.swift_bat_grb_pos_v2, "rb") as f:
+            self.raw = f.read()
+        self.original_loads = vp.loads
+        vpi.reset()
+
+    def tearDown(self):
+        vpi.disable()
+        vpi.reset()
+
+    def test_disabled_is_untouched(self):
+        self.assertFalse(vpi.is_enabled())
+        vp.loads(self.raw)
+        self.assertEqual(vpi.stats(), {})
+        vpi.enable()
+        self.assertIsNot(vp.loads, self.original_loads)
+        vpi.disable()
+        self.assertIs(vp.loads, self.original_loads)
+        self.assertIs(vpi._voevent_module.loads, self.original_loads)
+
+    def test_counts_and_bytes(self):
+        vpi.enable()
+        for _ in range(3):
+            v = vp.loads(self.raw)
+        out = vp.dumps(v)
+        vp.get_event_position(v)
+        stats = vpi.stats()
+        self.assertEqual(stats["loads"].calls, 3)
+        self.assertEqual(stats["loads"].bytes, 3 * len(self.raw))
+        self.assertEqual(stats["dumps"].bytes, len(out))
+        # Internal helpers are counted too, including calls made by loads
+        # and dumps:
+        self.assertEqual(stats["remove_root_tag_prefix"].calls, 3)
+        self.assertEqual(stats["_tostring_standard"].calls, 1)
+        self.assertEqual(stats["get_event_position"].calls, 1)
+        loads_stats = stats["loads"]
+        self.assertGreater(loads_stats.total_seconds, 0)
+        self.assertLessEqual(loads_stats.p50_seconds, loads_stats.p99_seconds)
+
+    def test_sections(self):
+        v = vp.loads(self.raw)
+        v.Who.Description = "annotated"  # So dumps works on a copy
+        vp.dumps(v)
+        vpi.enable()
+        vp.dumps(v)
+        vpi.disable()
+        vp.dumps(v)
+        stats = vpi.stats()
+        self.assertEqual(stats["dumps.deepcopy"].calls, 1)
+        self.assertLessEqual(
+            stats["dumps.deepcopy"].total_seconds, stats["dumps"].total_seconds
+        )
+        self.assertIsNone(vpi._voevent_module._record_section)
+
+    def test_callback(self):
+        calls = []
+        vpi.enable(callback=lambda *args: calls.append(args))
+        vp.loads(self.raw)
+        self.assertIn("loads", [c[0] for c in calls])
+        name, duration, nbytes = [c for c in calls if c[0] == "loads"][0]
+        self.assertEqual(nbytes, len(self.raw))
+
+    def test_write_prometheus(self):
+        vpi.enable()
+        vp.loads(self.raw)
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, "voeventparse.prom")
+            vpi.write_prometheus(path)
+            with open(path) as f:
+                text = f.read()
+        self.assertIn('voeventparse_call_seconds_count{function="loads"} 1', text)
+        self.assertIn(
+            f'voeventparse_bytes_total{{function="loads"}} {len(self.raw)}', text
+        )
+        self.assertIn('quantile="0.99"', text)
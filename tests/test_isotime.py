@@ -0,0 +1,85 @@
+import datetime
+from unittest import TestCase
+
+import iso8601
+import numpy as np
+
+import voeventparse as vp
+
+UTC = datetime.timezone.utc
+
+
+class TestParse(TestCase):
+    def test_matches_iso8601(self):
+        for s in (
+            "2012-09-07T00:24:23.08",
+            "2012-09-07T00:24:23",
+            "2012-09-07T00:24:23.123456",
+            "2016-09-25T11:16:48+00:00",
+            "2016-09-25T11:16:48Z",
+            "2016-09-25T11:16:48.5-05:30",
+            "  2016-09-25T11:16:48\n",
+            "2016-09-25",
+        ):
+            expected = iso8601.parse_date(s.strip())
+            parsed = vp.parse_isotime(s)
+            self.assertEqual(parsed, expected)
+            self.assertEqual(parsed.utcoffset(), expected.utcoffset())
+
+    def test_naive(self):
+        parsed = vp.parse_isotime("2012-09-07T00:24:23.08", default_timezone=None)
+        self.assertEqual(parsed, datetime.datetime(2012, 9, 7, 0, 24, 23, 80000))
+
+    def test_invalid(self):
+        for s in ("", "2012-13-07T00:24:23", "not a timestamp"):
+            with self.assertRaises(ValueError):
+                vp.parse_isotime(s)
+
+
+class TestFormat(TestCase):
+    def test_format(self):
+        dt = datetime.datetime(2016, 1, 16, 7, 52, 27, 80000)
+        self.assertEqual(vp.format_isotime(dt), "2016-01-16T07:52:27.080000")
+        self.assertEqual(
+            vp.format_isotime(dt, microseconds=False), "2016-01-16T07:52:27"
+        )
+        aware = dt.replace(tzinfo=datetime.timezone(datetime.timedelta(hours=1)))
+        self.assertEqual(vp.format_isotime(aware), "2016-01-16T06:52:27.080000")
+        self.assertEqual(
+            vp.format_isotime(aware, utc=False, microseconds=False),
+            "2016-01-16T07:52:27+01:00",
+        )
+
+    def test_roundtrip(self):
+        dt = datetime.datetime(2016, 1, 16, 7, 52, 27, 123456, tzinfo=UTC)
+        self.assertEqual(vp.parse_isotime(vp.format_isotime(dt)), dt)
+
+
+class TestParseArray(TestCase):
+    def test_parse_array(self):
+        strings = ["2012-09-07T00:24:23.08", "2016-01-16T07:52:27", None, ""]
+        parsed = vp.parse_isotime_array(strings)
+        self.assertEqual(parsed.dtype, np.dtype("datetime64[us]"))
+        expected = np.array(
+            ["2012-09-07T00:24:23.080", "2016-01-16T07:52:27", "NaT", "NaT"],
+            dtype="datetime64[us]",
+        )
+        np.testing.assert_array_equal(parsed, expected)
+
+    def test_timezone_designators(self):
+        parsed = vp.parse_isotime_array(
+            ["2016-09-25T11:16:48Z", "2016-09-25T11:16:48+01:00", None]
+        )
+        expected = np.array(
+            ["2016-09-25T11:16:48", "2016-09-25T10:16:48", "NaT"],
+            dtype="datetime64[us]",
+        )
+        np.testing.assert_array_equal(parsed, expected)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            vp.parse_isotime_array(["2016-09-25T11:16:48", "garbage"])
+        # Accepted by NumPy, but not ISO-8601 timestamps:
+        for word in ("now", "today", "NaT"):
+            with self.assertRaises(ValueError):
+                vp.parse_isotime_array(["2016-09-25T11:16:48", word])
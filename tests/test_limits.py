@@ -0,0 +1,85 @@
+import io
+from unittest import TestCase
+
+from lxml import etree
+
+import voeventparse as vp
+from voeventparse.fixtures import datapaths
+from voeventparse.limits import (
+    DTDForbiddenError,
+    PacketTooDeepError,
+    PacketTooLargeError,
+    ParseLimitError,
+    ParseTimeoutError,
+    TooManyElementsError,
+)
+
+
+class TestParseLimits(TestCase):
+    def setUp(self):
+        with open(datapaths.swift_bat_grb_pos_v2, "rb") as f:
+            self.raw = f.read()
+
+    def test_within_limits(self):
+        limits = vp.ParseLimits()
+        v = vp.loads(self.raw, limits=limits)
+        self.assertEqual(vp.dumps(v), vp.dumps(vp.loads(self.raw)))
+        self.assertEqual(v.What.Param[0].attrib["name"], "Packet_Type")
+        view = vp.loads(self.raw, mode="etree", limits=limits)
+        self.assertEqual(view.What.Param[0].attrib["name"], "Packet_Type")
+        with open(datapaths.swift_bat_grb_pos_v2, "rb") as f:
+            self.assertEqual(vp.dumps(vp.load(f, limits=limits)), vp.dumps(v))
+        # Strings, as for the standard parser:
+        text = self.raw.decode()
+        self.assertEqual(vp.dumps(vp.loads(text, limits=limits)), vp.dumps(v))
+        text = text.replace("?>", 'encoding="UTF-8" ?>', 1)
+        with self.assertRaises(ValueError):
+            vp.loads(text)
+        with self.assertRaises(ValueError):
+            vp.loads(text, limits=limits)
+        # All limits disabled:
+        vp.loads(self.raw, limits=vp.ParseLimits(None, None, None, None))
+
+    def test_violations(self):
+        for limits, error in (
+            (vp.ParseLimits(max_bytes=1000), PacketTooLargeError),
+            (vp.ParseLimits(max_depth=5), PacketTooDeepError),
+            (vp.ParseLimits(max_elements=50), TooManyElementsError),
+            (vp.ParseLimits(max_seconds=-1), ParseTimeoutError),
+        ):
+            with self.assertRaises(error):
+                vp.loads(self.raw, limits=limits)
+            self.assertTrue(issubclass(error, ParseLimitError))
+            self.assertTrue(issubclass(error, ValueError))
+        with self.assertRaises(PacketTooLargeError):
+            vp.load(io.BytesIO(self.raw), limits=vp.ParseLimits(max_bytes=1000))
+
+    def test_deep_nesting(self):
+        depth = 100000
+        raw = b"<a>" * depth + b"</a>" * depth
+        with self.assertRaises(PacketTooDeepError):
+            vp.loads(raw, limits=vp.ParseLimits())
+
+    def test_entities(self):
+        bomb = (
+            b'<!DOCTYPE VOEvent [<!ENTITY a "aaaaaaaaaa">'
+            b'<!ENTITY b "&a;&a;&a;&a;&a;&a;&a;&a;&a;&a;">]>'
+        ) + self.raw[self.raw.index(b"<voe:VOEvent") :].replace(
+            b"<Description>", b"<Description>&b;", 1
+        )
+        with self.assertRaises(DTDForbiddenError):
+            vp.loads(bomb, limits=vp.ParseLimits())
+
+    def test_malformed(self):
+        with self.assertRaises(etree.XMLSyntaxError):
+            vp.loads(self.raw[:-100], limits=vp.ParseLimits())
+        with self.assertRaises(etree.XMLSyntaxError):
+            vp.loads(b"", limits=vp.ParseLimits())
+
+    def test_parser_and_limits(self):
+        with self.assertRaises(ValueError):
+            vp.loads(
+                self.raw,
+                parser=vp.elements.make_parser(),
+                limits=vp.ParseLimits(),
+            )
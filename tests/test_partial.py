@@ -0,0 +1,85 @@
+from unittest import TestCase
+
+import voeventparse as vp
+from voeventparse.fixtures import datapaths
+from voeventparse.hashing import subtree_hash
+
+
+class TestLoadsPartial(TestCase):
+    def setUp(self):
+        self.raw = {}
+        for path in (
+            datapaths.swift_bat_grb_pos_v2,
+            datapaths.moa_lensing_event_path,
+            datapaths.gaia_alert_16aac_direct,
+            datapaths.asassn_scraped_example,
+            datapaths.no_namespace_test_packet,
+        ):
+            with open(path, "rb") as f:
+                self.raw[path] = f.read()
+        self.swift = self.raw[datapaths.swift_bat_grb_pos_v2]
+
+    def test_deferred_sections(self):
+        p = vp.loads_partial(self.swift)
+        self.assertEqual(
+            [name for name, _, _ in p.sections],
+            ["Who", "What", "WhereWhen", "How", "Why", "Description"],
+        )
+        self.assertEqual(p.deferred, ["What", "How", "Why", "Description"])
+        self.assertEqual(
+            [c.tag for c in p.voevent.iterchildren()], ["Who", "WhereWhen"]
+        )
+        for name, start, stop in p.sections:
+            section = self.swift[start:stop]
+            self.assertTrue(section.startswith(b"<" + name.encode()))
+        # Root attributes are available without loading anything:
+        self.assertEqual(
+            p.attrib["ivorn"], "ivo://nasa.gsfc.gcn/SWIFT#BAT_GRB_Pos_532871-729"
+        )
+        self.assertEqual(p.deferred, ["What", "How", "Why", "Description"])
+        # Loaded in place on first access:
+        self.assertEqual(p.What.Param[0].attrib["name"], "Packet_Type")
+        self.assertEqual(p.deferred, ["How", "Why", "Description"])
+        self.assertEqual(
+            [c.tag for c in p.voevent.iterchildren()], ["Who", "What", "WhereWhen"]
+        )
+        self.assertFalse(hasattr(p, "Citations"))
+
+    def test_convenience_routines(self):
+        p = vp.loads_partial(self.swift)
+        v = vp.loads(self.swift)
+        self.assertEqual(vp.get_event_position(p), vp.get_event_position(v))
+        self.assertEqual(vp.get_event_time_as_utc(p), vp.get_event_time_as_utc(v))
+        self.assertIn("What", p.deferred)
+
+    def test_materialize(self):
+        for raw in self.raw.values():
+            v = vp.loads(raw)
+            for sections in ((), vp.partial.DEFAULT_SECTIONS, ("What", "How")):
+                p = vp.loads_partial(raw, sections=sections)
+                self.assertEqual(subtree_hash(p.materialize()), subtree_hash(v))
+                self.assertEqual(p.deferred, [])
+            # Also from a buffer:
+            p = vp.loads_partial(memoryview(raw), sections=())
+            self.assertEqual(subtree_hash(p.materialize()), subtree_hash(v))
+
+    def test_skips_comments(self):
+        raw = self.swift.replace(
+            b"<What>", b"<!-- <How></How> --><![CDATA[<Why/>]]><What>", 1
+        )
+        p = vp.loads_partial(raw)
+        self.assertEqual(p.deferred, ["What", "How", "Why", "Description"])
+        self.assertEqual(
+            subtree_hash(p.materialize()), subtree_hash(vp.loads(self.swift))
+        )
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            vp.loads_partial(b"<foo/>")
+        with self.assertRaises(ValueError):
+            vp.loads_partial(self.swift[:-50])
+        with open(datapaths.swift_xrt_pos_v1, "rb") as f:
+            raw = f.read()
+        with self.assertRaises(ValueError):
+            vp.loads_partial(raw)
+        vp.loads_partial(raw, check_version=False)
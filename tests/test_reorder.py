@@ -0,0 +1,118 @@
+import datetime
+import random
+from unittest import TestCase
+
+import pytz
+
+import voeventparse as vp
+from voeventparse.fixtures import datapaths
+from voeventparse.reorder import ReorderBuffer, event_time, who_date
+
+T0 = datetime.datetime(2020, 1, 1, tzinfo=pytz.UTC)
+
+
+def t(seconds):
+    return T0 + datetime.timedelta(seconds=seconds)
+
+
+def push_all(buffer, seconds):
+    released = []
+    for s in seconds:
+        released.extend(buffer.push(None, item=s, time=t(s)))
+    return released
+
+
+class TestReorderBuffer(TestCase):
+    def test_time_keys(self):
+        with open(datapaths.swift_bat_grb_pos_v2, "rb") as f:
+            v = vp.load(f)
+        self.assertEqual(event_time(v), vp.get_event_time_as_utc(v))
+        self.assertEqual(
+            who_date(v), datetime.datetime(2012, 9, 7, 0, 24, 36, tzinfo=pytz.UTC)
+        )
+        v.remove(v.WhereWhen)
+        self.assertEqual(event_time(v), who_date(v))
+        v.remove(v.Who)
+        self.assertIsNone(event_time(v))
+        # With the VOEvent namespace as the default namespace:
+        with open(datapaths.swift_bat_grb_pos_v2, "rb") as f:
+            raw = f.read()
+        raw = raw.replace(b"voe:VOEvent", b"VOEvent").replace(b"xmlns:voe", b"xmlns")
+        self.assertEqual(
+            who_date(vp.loads(raw)),
+            datetime.datetime(2012, 9, 7, 0, 24, 36, tzinfo=pytz.UTC),
+        )
+
+    def test_reorder(self):
+        buffer = ReorderBuffer(max_delay=10)
+        released = push_all(buffer, [0, 5, 3, 12, 8, 11, 25])
+        self.assertEqual([p.item for p in released], [0, 3, 5, 8, 11, 12])
+        self.assertFalse(any(p.late for p in released))
+        self.assertEqual(buffer.watermark, t(15))
+        self.assertEqual(len(buffer), 1)
+        self.assertEqual([p.item for p in buffer.flush()], [25])
+        stats = buffer.stats()
+        self.assertEqual(stats.released, 7)
+        self.assertEqual(stats.late, 0)
+        self.assertEqual(stats.max_lateness_seconds, 4.0)
+
+    def test_randomised(self):
+        rng = random.Random(1)
+        times = [i + rng.uniform(0, 5) for i in range(1000)]
+        buffer = ReorderBuffer(max_delay=5)
+        released = push_all(buffer, times) + buffer.flush()
+        self.assertEqual([p.item for p in released], sorted(times))
+        self.assertEqual(buffer.stats().late, 0)
+
+    def test_late_packets(self):
+        buffer = ReorderBuffer(max_delay=2)
+        released = push_all(buffer, [10, 20, 5])
+        self.assertEqual([(p.item, p.late) for p in released], [(10, False), (5, True)])
+        dropping = ReorderBuffer(max_delay=2, late="drop")
+        released = push_all(dropping, [10, 20, 5])
+        self.assertEqual([p.item for p in released], [10])
+        stats = dropping.stats()
+        self.assertEqual((stats.late, stats.dropped, stats.released), (1, 1, 1))
+        self.assertEqual(stats.max_lateness_seconds, 15.0)
+        self.assertEqual(stats.p99_lateness_seconds, 15.0)
+        self.assertEqual(stats.p50_lateness_seconds, 0.0)
+
+    def test_max_size(self):
+        buffer = ReorderBuffer(max_delay=100, max_size=2)
+        released = push_all(buffer, [3, 1, 2, 0, 4])
+        # 0 arrived behind the watermark forced up to 1, so is late:
+        self.assertEqual(
+            [(p.item, p.late) for p in released], [(1, False), (0, True), (2, False)]
+        )
+        self.assertEqual(buffer.stats().forced, 2)
+        self.assertEqual(buffer.stats().late, 1)
+        self.assertEqual(len(buffer), 2)
+
+    def test_advance(self):
+        buffer = ReorderBuffer(max_delay=60)
+        push_all(buffer, [0, 10, 20])
+        self.assertEqual([p.item for p in buffer.advance(t(15))], [0, 10])
+        self.assertEqual(buffer.advance(t(5)), [])
+        self.assertEqual(buffer.watermark, t(15))
+
+    def test_untimed_and_keys(self):
+        buffer = ReorderBuffer(max_delay=10, key="who_date")
+        with open(datapaths.moa_lensing_event_path, "rb") as f:
+            v = vp.load(f)
+        no_who = vp.voevent("ivo://foo/bar#1", "1", vp.definitions.Roles.test)
+        no_who.remove(no_who.Who)
+        self.assertEqual(
+            buffer.push(no_who), [vp.reorder.ReorderedPacket(None, no_who, False)]
+        )
+        self.assertEqual(buffer.push(v), [])
+        self.assertEqual(buffer.flush()[0].time, who_date(v))
+        self.assertEqual(buffer.stats().untimed, 1)
+        by_ivorn = ReorderBuffer(0, key=lambda v: t(int(v.attrib["ivorn"][-1])))
+        self.assertEqual(len(by_ivorn.push(no_who)), 1)
+        with self.assertRaises(ValueError):
+            ReorderBuffer(10, key="foo")
+        with self.assertRaises(ValueError):
+            ReorderBuffer(10, late="foo")
+
+    def test_exported(self):
+        self.assertIs(vp.ReorderBuffer, ReorderBuffer)
@@ -0,0 +1,192 @@
+import multiprocessing
+from unittest import TestCase
+
+import voeventparse as vp
+from voeventparse.fixtures import datapaths
+from voeventparse.ring import PacketRing, RingOverrunError
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def consume(name, slot, count, ready, results):
+    ring = PacketRing.attach(name)
+    consumer = ring.consumer(slot, from_start=True)
+    ready.set()
+    ivorns = []
+    for _ in range(count):
+        record = consumer.get(timeout=10)
+        ivorns.append(None if record is None else record.header.ivorn)
+        del record
+    consumer.close()
+    ring.close()
+    results.put((slot, ivorns))
+
+
+class TestPacketRing(TestCase):
+    def setUp(self):
+        self.swift = read(datapaths.swift_bat_grb_pos_v2)
+        self.moa = read(datapaths.moa_lensing_event_path)
+        self.rings = []
+
+    def tearDown(self):
+        for ring in self.rings:
+            ring.unlink()
+
+    def make_ring(self, capacity=64 * 1024, **kwargs):
+        ring = PacketRing.create(capacity, **kwargs)
+        self.rings.append(ring)
+        return ring
+
+    def test_put_and_get(self):
+        ring = self.make_ring()
+        consumer = ring.consumer(0)
+        self.assertIsNone(consumer.get())
+        self.assertTrue(ring.put(self.swift))
+        v = vp.loads(self.moa)
+        self.assertTrue(ring.put(self.moa, voevent=v))
+        record = consumer.get()
+        self.assertEqual(record.seq, 0)
+        self.assertIsInstance(record.raw, memoryview)
+        self.assertEqual(bytes(record.raw), self.swift)
+        header = record.header
+        self.assertEqual(
+            header.ivorn, "ivo://nasa.gsfc.gcn/SWIFT#BAT_GRB_Pos_532871-729"
+        )
+        self.assertEqual(header.role, "observation")
+        self.assertEqual(header.time, vp.get_event_time_as_utc(vp.loads(self.swift)))
+        self.assertEqual(header.position, vp.get_event_position(vp.loads(self.swift)))
+        self.assertEqual(vp.dumps(record.voevent()), vp.dumps(vp.loads(self.swift)))
+        record = consumer.get()
+        self.assertEqual(record.seq, 1)
+        self.assertEqual(record.header.ivorn, v.attrib["ivorn"])
+        self.assertIsNone(consumer.get(timeout=0.01))
+        self.assertEqual(consumer.backlog, 0)
+
+    def test_consumers(self):
+        ring = self.make_ring()
+        ring.put(self.swift)
+        late = ring.consumer(0)
+        early = ring.consumer(1, from_start=True)
+        with self.assertRaises(ValueError):
+            ring.consumer(1)
+        with self.assertRaises(ValueError):
+            ring.consumer(8)
+        ring.put(self.moa)
+        self.assertEqual([early.get().seq, early.get().seq], [0, 1])
+        self.assertEqual(late.get().seq, 1)
+        # Consumers may attach separately, by name:
+        other = PacketRing.attach(ring.name)
+        consumer = other.consumer(2, from_start=True)
+        self.assertEqual(consumer.get().seq, 0)
+        del consumer
+        other.close()
+
+    def test_wraparound(self):
+        ring = self.make_ring(capacity=40000)
+        consumer = ring.consumer(0)
+        packets = [self.swift, self.moa] * 20
+        for i, raw in enumerate(packets):
+            self.assertTrue(ring.put(raw))
+            record = consumer.get()
+            self.assertEqual(record.seq, i)
+            self.assertEqual(bytes(record.raw), raw)
+            self.assertTrue(record.valid)
+        del record
+        self.assertEqual(consumer.lost, 0)
+
+    def test_large_records(self):
+        # Records of up to half the capacity, skipping to the start:
+        padding = b"<!--" + b"x" * 18000 + b"-->"
+        large = self.swift.replace(b"<Who>", b"<Who>" + padding)
+        for overflow in ("drop_oldest", "drop_newest", "block"):
+            ring = self.make_ring(overflow=overflow)
+            consumer = ring.consumer(0)
+            for i, raw in enumerate([self.swift, large, self.moa, large, large]):
+                self.assertTrue(ring.put(raw, timeout=1))
+                record = consumer.get()
+                self.assertEqual(record.seq, i)
+                self.assertEqual(bytes(record.raw), raw)
+            del record
+            self.assertEqual(consumer.lost, 0)
+            with self.assertRaises(ValueError):
+                ring.put(large + padding)
+
+    def test_drop_oldest(self):
+        ring = self.make_ring(capacity=40000)
+        consumer = ring.consumer(0)
+        ring.put(self.swift)
+        record = consumer.get()
+        for _ in range(10):
+            self.assertTrue(ring.put(self.swift))
+        self.assertFalse(record.valid)
+        with self.assertRaises(RingOverrunError):
+            record.voevent()
+        seqs = []
+        while (record := consumer.get()) is not None:
+            seqs.append(record.seq)
+        self.assertEqual(seqs[-1], 10)
+        self.assertEqual(consumer.lost + len(seqs), 10)
+        self.assertGreater(consumer.lost, 0)
+
+    def test_drop_newest(self):
+        ring = self.make_ring(capacity=40000, overflow="drop_newest")
+        consumer = ring.consumer(0)
+        results = [ring.put(self.swift) for _ in range(10)]
+        stored = results.count(True)
+        self.assertEqual(results, [True] * stored + [False] * (10 - stored))
+        self.assertEqual(ring.dropped, 10 - stored)
+        seqs = []
+        while (record := consumer.get()) is not None:
+            seqs.append(record.seq)
+            self.assertTrue(record.valid)
+        self.assertEqual(seqs, list(range(stored)))
+        self.assertEqual(consumer.lost, 0)
+        # All read, so there is room again:
+        self.assertTrue(ring.put(self.swift))
+
+    def test_block(self):
+        ring = self.make_ring(capacity=40000, overflow="block")
+        consumer = ring.consumer(0)
+        while ring.put(self.swift, timeout=0.01):
+            pass
+        self.assertEqual(ring.dropped, 1)
+        self.assertIsNotNone(consumer.get())
+        self.assertIsNotNone(consumer.get())
+        self.assertTrue(ring.put(self.swift, timeout=0.01))
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            self.make_ring(overflow="foo")
+        ring = self.make_ring(capacity=1000)
+        with self.assertRaises(ValueError):
+            ring.put(self.swift)
+        ring = self.make_ring(capacity=len(self.swift) + 1000)
+        with self.assertRaises(ValueError):
+            ring.put(self.swift)
+
+    def test_processes(self):
+        ring = self.make_ring(capacity=256 * 1024)
+        ctx = multiprocessing.get_context("spawn")
+        results = ctx.Queue()
+        events = [ctx.Event() for _ in range(2)]
+        procs = [
+            ctx.Process(
+                target=consume, args=(ring.name, slot, 6, events[slot], results)
+            )
+            for slot in range(2)
+        ]
+        for proc in procs:
+            proc.start()
+        for event in events:
+            self.assertTrue(event.wait(30))
+        for _ in range(3):
+            ring.put(self.swift)
+            ring.put(self.moa)
+        outcomes = dict(results.get(timeout=30) for _ in procs)
+        for proc in procs:
+            proc.join(30)
+        expected = [vp.loads(raw).attrib["ivorn"] for raw in (self.swift, self.moa) * 3]
+        self.assertEqual(outcomes, {0: expected, 1: expected})
@@ -0,0 +1,175 @@
+import random
+import threading
+from unittest import TestCase
+
+import voeventparse as vp
+from voeventparse.fixtures import datapaths
+from voeventparse.scheduling import PacketQueue, PriorityKeys, sniff_priority_keys
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def keys(role="observation", importance=None, ivorn="ivo://a/b#1", cites=()):
+    return PriorityKeys(
+        ivorn=ivorn,
+        role=role,
+        stream=ivorn.partition("#")[0],
+        importance=importance,
+        cite_types=list(cites),
+    )
+
+
+class TestPacketQueue(TestCase):
+    def test_sniff_priority_keys(self):
+        k = sniff_priority_keys(read(datapaths.swift_xrt_pos_v1))
+        self.assertEqual(k.role, "observation")
+        self.assertEqual(k.stream, "ivo://nasa.gsfc.gcn/SWIFT")
+        self.assertEqual(k.importance, 0.99)
+        self.assertEqual(k.cite_types, ["followup"])
+        k = sniff_priority_keys(b"<foo/>")
+        self.assertEqual(k, PriorityKeys(None, None, None, None, []))
+
+    def test_priority_order(self):
+        q = PacketQueue(stream_ranks={"ivo://urgent": -1})
+        q.put(b"test", keys=keys(role="test"))
+        q.put(b"utility", keys=keys(role="foo"))
+        q.put(b"low", keys=keys(importance=0.1))
+        q.put(b"high", keys=keys(importance=0.9))
+        q.put(b"none", keys=keys())
+        q.put(b"urgent stream", keys=keys(ivorn="ivo://urgent/x#1"))
+        q.put(b"retraction", keys=keys(role="test", cites=["retraction"]))
+        q.put(b"prediction", keys=keys(role="prediction"))
+        q.put(b"high 2", keys=keys(importance=0.9))
+        self.assertEqual(len(q), 9)
+        order = [q.get().item for _ in range(9)]
+        self.assertEqual(
+            order,
+            [
+                b"retraction",
+                b"urgent stream",
+                b"high",
+                b"high 2",
+                b"low",
+                b"none",
+                b"prediction",
+                b"utility",
+                b"test",
+            ],
+        )
+        self.assertIsNone(q.get(timeout=0.01))
+
+    def test_raw_packets(self):
+        q = PacketQueue()
+        swift = read(datapaths.swift_bat_grb_pos_v2)
+        xrt = read(datapaths.swift_xrt_pos_v1)
+        q.put(swift, item="swift")
+        q.put(xrt, item="xrt")
+        packet = q.get()
+        self.assertEqual(packet.item, "xrt")
+        self.assertEqual(packet.priority_class, "observation")
+        self.assertEqual(q.get().keys, sniff_priority_keys(swift))
+
+    def test_load_shedding(self):
+        q = PacketQueue(max_size=10)
+        results = [q.put(b"t", keys=keys(role="test")) for _ in range(6)]
+        self.assertEqual(results, [True] * 5 + [False])
+        results = [q.put(b"u", keys=keys(role="utility")) for _ in range(4)]
+        self.assertEqual(results, [True] * 3 + [False])
+        self.assertTrue(q.put(b"o", keys=keys()))
+        self.assertTrue(q.put(b"o", keys=keys()))
+        self.assertEqual(len(q), 10)
+        # Full: observations displace test packets...
+        for _ in range(5):
+            self.assertTrue(q.put(b"o", keys=keys()))
+        # ...then utility packets...
+        for _ in range(3):
+            self.assertTrue(q.put(b"o", keys=keys()))
+        # ...but not lower-importance observations, or equal ones queued
+        # earlier:
+        self.assertFalse(q.put(b"o", keys=keys(importance=-1)))
+        self.assertFalse(q.put(b"o", keys=keys()))
+        self.assertTrue(q.put(b"hi", keys=keys(importance=1)))
+        self.assertEqual(len(q), 10)
+        stats = q.stats()
+        self.assertEqual(stats["test"].shed, 6)
+        self.assertEqual(stats["utility"].shed, 4)
+        self.assertEqual(stats["observation"].shed, 3)
+        self.assertEqual(stats["observation"].queued, 10)
+        self.assertEqual(q.get().item, b"hi")
+
+    def test_max_size_must_be_positive(self):
+        for max_size in (0, -1):
+            with self.assertRaises(ValueError):
+                PacketQueue(max_size=max_size)
+        q = PacketQueue(max_size=1, shed_levels={})
+        self.assertTrue(q.put(b"t", keys=keys(role="test")))
+        self.assertTrue(q.put(b"o", keys=keys()))
+        self.assertFalse(q.put(b"t", keys=keys(role="test")))
+        self.assertEqual(q.get().item, b"o")
+
+    def test_displacement_randomised(self):
+        # Against a plain sorted list of (class, importance, seq):
+        rng = random.Random(1)
+        roles = ["observation", "prediction", "test"]
+        q = PacketQueue(max_size=50, shed_levels={})
+        model = []
+        for seq in range(5000):
+            if rng.random() < 0.3:
+                packet = q.get(timeout=0)
+                if model:
+                    self.assertEqual(packet.item, model.pop(0)[-1])
+                else:
+                    self.assertIsNone(packet)
+                continue
+            role = rng.choice(roles)
+            importance = rng.randint(0, 5)
+            entry = (roles.index(role), -importance, seq)
+            queued = q.put(b"", item=seq, keys=keys(role, importance))
+            if len(model) == 50:
+                self.assertEqual(queued, entry < model[-1])
+                if queued:
+                    model.pop()
+            if queued:
+                model.append(entry)
+                model.sort()
+            self.assertEqual(len(q), len(model))
+        for cls in q._classes:
+            self.assertLessEqual(len(cls.heap), 4 * cls.size + 64)
+
+    def test_latency_stats(self):
+        q = PacketQueue()
+        q.put(b"t", keys=keys(role="test"))
+        q.put(b"o", keys=keys())
+        q.get()
+        q.get()
+        stats = q.stats()
+        self.assertEqual(stats["observation"].dispatched, 1)
+        self.assertEqual(stats["test"].dispatched, 1)
+        self.assertGreaterEqual(
+            stats["test"].p50_seconds, stats["observation"].p50_seconds
+        )
+        self.assertIsNone(stats["prediction"].p99_seconds)
+        self.assertEqual(stats["prediction"].dispatched, 0)
+
+    def test_threads(self):
+        q = PacketQueue()
+        received = []
+
+        def worker():
+            while (packet := q.get(timeout=1)) is not None:
+                received.append(packet.item)
+
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for i in range(100):
+            q.put(b"", item=i, keys=keys())
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(received), list(range(100)))
+
+    def test_exported(self):
+        self.assertIs(vp.PacketQueue, PacketQueue)
@@ -0,0 +1,177 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from unittest import TestCase, skipUnless
+
+import voeventparse as vp
+from voeventparse.fixtures import datapaths
+from voeventparse.spool import SpoolWatcher
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@skipUnless(sys.platform.startswith("linux"), "inotify is Linux only")
+class TestSpoolWatcher(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.spool, self.done, self.failed = [
+            os.path.join(self.root, name) for name in ("spool", "done", "failed")
+        ]
+        for path in (self.spool, self.done, self.failed):
+            os.mkdir(path)
+        self.swift = read(datapaths.swift_bat_grb_pos_v2)
+
+    def write(self, name, data):
+        with open(os.path.join(self.spool, name), "wb") as f:
+            f.write(data)
+
+    def watcher(self, **kwargs):
+        watcher = SpoolWatcher(self.spool, self.done, self.failed, **kwargs)
+        self.addCleanup(watcher.close)
+        return watcher
+
+    def test_existing_files(self):
+        self.write("a.xml", self.swift)
+        self.write("b.xml", b"<not a voevent")
+        self.write("ignored.txt", self.swift)
+        watcher = self.watcher()
+        batches = list(watcher.batches(timeout=0.01))
+        self.assertEqual(len(batches), 1)
+        good, bad = batches[0]
+        self.assertEqual(good.path, os.path.join(self.spool, "a.xml"))
+        self.assertEqual(
+            good.voevent.attrib["ivorn"], vp.loads(self.swift).attrib["ivorn"]
+        )
+        self.assertIsNone(good.error)
+        self.assertIsNone(bad.voevent)
+        self.assertIn("XMLSyntaxError", bad.error)
+        self.assertEqual(os.listdir(self.spool), ["ignored.txt"])
+        self.assertEqual(sorted(os.listdir(self.done)), ["a.xml"])
+        self.assertEqual(os.listdir(self.failed), ["b.xml"])
+        self.assertEqual((watcher.processed, watcher.failed), (2, 1))
+
+    def test_new_files(self):
+        watcher = self.watcher(batch_size=4)
+
+        def produce():
+            time.sleep(0.05)
+            for i in range(10):
+                self.write(f"{i}.xml", self.swift)
+            # As written by tools which write, then rename into place:
+            tmp = os.path.join(self.root, "tmp")
+            with open(tmp, "wb") as f:
+                f.write(self.swift)
+            os.replace(tmp, os.path.join(self.spool, "renamed.xml"))
+
+        thread = threading.Thread(target=produce)
+        thread.start()
+        results = []
+        for batch in watcher.batches(timeout=1):
+            self.assertLessEqual(len(batch), 4)
+            results.extend(batch)
+        thread.join()
+        names = [os.path.basename(result.path) for result in results]
+        self.assertEqual(names, [f"{i}.xml" for i in range(10)] + ["renamed.xml"])
+        self.assertTrue(all(result.error is None for result in results))
+        self.assertEqual(len(os.listdir(self.done)), 11)
+        self.assertEqual(os.listdir(self.spool), [])
+
+    def test_interrupted(self):
+        self.write("a.xml", self.swift)
+        watcher = self.watcher()
+        for _ in watcher.batches(timeout=0.01):
+            break
+        watcher.close()
+        # Not handled, so still in the spool:
+        self.assertEqual(os.listdir(self.spool), ["a.xml"])
+        # A checkpoint left by interrupted moves is completed on start-up:
+        self.write("b.xml", self.swift)
+        # Interrupted after linking c.xml into place, but before removal:
+        self.write("c.xml", self.swift)
+        os.link(os.path.join(self.spool, "c.xml"), os.path.join(self.done, "c.xml"))
+        with open(os.path.join(self.done, ".spool-checkpoint"), "w") as f:
+            f.write(f"{self.done}\tb.xml\n{self.done}\tc.xml\n")
+        watcher = self.watcher()
+        self.assertEqual(sorted(os.listdir(self.done)), ["b.xml", "c.xml"])
+        self.assertFalse(os.path.exists(os.path.join(self.done, ".spool-checkpoint")))
+        results = [r for batch in watcher.batches(timeout=0.01) for r in batch]
+        self.assertEqual([os.path.basename(r.path) for r in results], ["a.xml"])
+
+    def test_other_files_ignored_while_waiting(self):
+        watcher = self.watcher()
+
+        def produce():
+            time.sleep(0.05)
+            self.write("a.xml.part", self.swift)
+            time.sleep(0.1)
+            self.write("a.xml", self.swift)
+
+        thread = threading.Thread(target=produce)
+        thread.start()
+        batches = watcher.batches()
+        batch = next(batches)
+        thread.join()
+        self.assertEqual([os.path.basename(r.path) for r in batch], ["a.xml"])
+        batches.close()
+
+    def test_replaced_while_handled(self):
+        moa = read(datapaths.moa_lensing_event_path)
+        # A file already handled, of the same name:
+        with open(os.path.join(self.done, "a.xml"), "wb") as f:
+            f.write(b"earlier")
+        self.write("a.xml", self.swift)
+        watcher = self.watcher()
+        ivorns = []
+        for batch in watcher.batches(timeout=0.1):
+            ivorns.extend(r.voevent.attrib["ivorn"] for r in batch)
+            if len(ivorns) == 1:
+                # Replaced, as by a writer renaming into place:
+                tmp = os.path.join(self.root, "tmp")
+                with open(tmp, "wb") as f:
+                    f.write(moa)
+                os.replace(tmp, os.path.join(self.spool, "a.xml"))
+        self.assertEqual(
+            ivorns, [vp.loads(raw).attrib["ivorn"] for raw in (self.swift, moa)]
+        )
+        # Counted once, though loaded twice:
+        self.assertEqual((watcher.processed, watcher.failed), (1, 0))
+        self.assertEqual(os.listdir(self.spool), [])
+        # The replaced file is gone, and the new one replaces no other:
+        self.assertEqual(sorted(os.listdir(self.done)), ["a.1.xml", "a.xml"])
+        self.assertEqual(read(os.path.join(self.done, "a.xml")), b"earlier")
+        self.assertEqual(read(os.path.join(self.done, "a.1.xml")), moa)
+
+    def test_pool_and_validation(self):
+        self.write("a.xml", self.swift)
+        invalid = self.swift.replace(b"<Who>", b"<Who><Foo/>")
+        self.write("b.xml", invalid)
+        watcher = self.watcher(processes=2, validate=vp.valid_as_v2_0)
+        results = [r for batch in watcher.batches(timeout=0.01) for r in batch]
+        self.assertEqual([r.error for r in results], [None, "failed validation"])
+        self.assertEqual(vp.dumps(results[0].voevent), vp.dumps(vp.loads(self.swift)))
+        self.assertEqual(os.listdir(self.failed), ["b.xml"])
+
+    def test_validate_raises(self):
+        self.write("a.xml", self.swift)
+        self.write("b.xml", self.swift)
+
+        def validate(v):
+            raise RuntimeError("validator broke")
+
+        watcher = self.watcher(validate=validate)
+        results = [r for batch in watcher.batches(timeout=0.01) for r in batch]
+        self.assertEqual(
+            [r.error for r in results], ["RuntimeError: validator broke"] * 2
+        )
+        self.assertEqual(sorted(os.listdir(self.failed)), ["a.xml", "b.xml"])
+        self.assertEqual((watcher.processed, watcher.failed), (2, 2))
+
+    def test_exported(self):
+        self.assertIs(vp.SpoolWatcher, SpoolWatcher)
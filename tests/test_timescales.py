@@ -0,0 +1,144 @@
+import datetime
+import random
+from unittest import TestCase
+
+import astropy.time
+import numpy as np
+import pytz
+
+from voeventparse import timescales
+
+ONE_US = datetime.timedelta(microseconds=1)
+
+
+def astropy_utc(dt, scale):
+    """Reference conversion, via astropy."""
+    if scale == "GPS":
+        # Astropy has no GPS scale - go via TAI:
+        dt = dt + datetime.timedelta(seconds=19)
+        scale = "TAI"
+    t = astropy.time.Time(dt, scale=scale.lower())
+    return t.utc.to_datetime().replace(tzinfo=pytz.UTC)
+
+
+class TestScalarConversion(TestCase):
+    def setUp(self):
+        rng = random.Random(42)
+        start = datetime.datetime(1995, 1, 1)
+        self.times = [
+            start
+            + datetime.timedelta(microseconds=rng.randrange(27 * 365 * 86400 * 10**6))
+            for _ in range(200)
+        ]
+
+    def test_matches_astropy(self):
+        for scale in ("TT", "TDB", "GPS"):
+            for dt in self.times:
+                converted = timescales.to_utc(dt, scale)
+                self.assertLessEqual(abs(converted - astropy_utc(dt, scale)), ONE_US)
+
+    def test_known_offsets(self):
+        # After the 2016-12-31 leap second, TAI - UTC = 37s:
+        dt = datetime.datetime(2020, 6, 1, 12, 0, 0)
+        expected = datetime.datetime(2020, 6, 1, 11, 59, 42, tzinfo=pytz.UTC)
+        self.assertEqual(timescales.to_utc(dt, "GPS"), expected)
+        tt = dt + datetime.timedelta(seconds=19 + 32.184)
+        self.assertEqual(timescales.to_utc(tt, "TT"), expected)
+
+    def test_across_leap_second(self):
+        # Leap second inserted at the end of 2016-12-31 (UTC):
+        before = datetime.datetime(2016, 12, 31, 23, 59, 59, tzinfo=pytz.UTC)
+        after = datetime.datetime(2017, 1, 1, tzinfo=pytz.UTC)
+        gps_before = datetime.datetime(2017, 1, 1, 0, 0, 16)
+        self.assertEqual(timescales.to_utc(gps_before, "GPS"), before)
+        gps_after = gps_before + datetime.timedelta(seconds=2)
+        self.assertEqual(timescales.to_utc(gps_after, "GPS"), after)
+        with self.assertRaises(ValueError):
+            timescales.to_utc(gps_before + datetime.timedelta(seconds=1), "GPS")
+
+    def test_before_1972(self):
+        # TAI - UTC drifted continuously, rather than by leap seconds:
+        for dt in (
+            datetime.datetime(1960, 1, 1),
+            datetime.datetime(1965, 6, 1, 3, 4, 5, 123456),
+            datetime.datetime(1971, 12, 31, 23, 59, 50),
+            datetime.datetime(1972, 1, 1, 0, 0, 5),
+        ):
+            for scale in ("TT", "TDB"):
+                converted = timescales.to_utc(dt, scale)
+                self.assertLessEqual(abs(converted - astropy_utc(dt, scale)), ONE_US)
+
+    def test_utc_passthrough(self):
+        dt = datetime.datetime(2016, 1, 16, 7, 52, 27)
+        self.assertEqual(timescales.to_utc(dt, "UTC"), dt.replace(tzinfo=pytz.UTC))
+
+    def test_bad_input(self):
+        dt = datetime.datetime(2016, 1, 16)
+        with self.assertRaises(ValueError):
+            timescales.to_utc(dt, "TCB")
+        with self.assertRaises(ValueError):
+            timescales.time_offset_to_utc(1.0, "TT", unit="fortnight")
+
+    def test_time_offset(self):
+        mjd = 57403.5
+        for scale in ("UTC", "TT", "TDB"):
+            t = astropy.time.Time(mjd, format="mjd", scale=scale.lower())
+            expected = t.utc.to_datetime().replace(tzinfo=pytz.UTC)
+            for offset, unit, origin in (
+                (mjd, "d", "MJD"),
+                (mjd * 86400, "s", "MJD"),
+                (mjd + 2400000.5, "d", "JD"),
+                (0.5 * 86400, "s", "2016-01-16T00:00:00"),
+                (0.5, "d", datetime.datetime(2016, 1, 16)),
+            ):
+                converted = timescales.time_offset_to_utc(offset, scale, unit, origin)
+                self.assertLessEqual(abs(converted - expected), ONE_US)
+
+
+class TestBatchConversion(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        start = np.datetime64("1995-01-01", "us").astype(np.int64)
+        span = 27 * 365 * 86400 * 10**6
+        self.times = (start + rng.integers(0, span, 1000)).astype("datetime64[us]")
+
+    def test_matches_scalar(self):
+        for scale in timescales.SCALES:
+            converted = timescales.to_utc_datetime64(self.times, scale)
+            self.assertEqual(converted.dtype, np.dtype("datetime64[us]"))
+            for dt64, result in zip(self.times[:200], converted[:200]):
+                dt = dt64.astype(datetime.datetime)
+                expected = timescales.to_utc(dt, scale).replace(tzinfo=None)
+                self.assertEqual(result.astype(datetime.datetime), expected)
+
+    def test_matches_astropy(self):
+        for scale in ("TT", "TDB"):
+            t = astropy.time.Time(self.times, scale=scale.lower())
+            expected = t.utc.to_value("datetime64").astype("datetime64[us]")
+            converted = timescales.to_utc_datetime64(self.times, scale)
+            diffs = np.abs((converted - expected).astype(np.int64))
+            self.assertLessEqual(diffs.max(), 1)
+
+    def test_unrepresentable(self):
+        times = np.array(
+            ["2017-01-01T00:00:17", "1960-01-01", "NaT", "2017-01-01T00:00:18"],
+            dtype="datetime64[us]",
+        )
+        converted = timescales.to_utc_datetime64(times, "GPS")
+        self.assertEqual(list(np.isnat(converted)), [True, False, True, False])
+        self.assertEqual(
+            converted[1].astype(datetime.datetime),
+            timescales.to_utc(datetime.datetime(1960, 1, 1), "GPS").replace(
+                tzinfo=None
+            ),
+        )
+
+    def test_time_offsets(self):
+        mjds = np.array([57403.5, 58000.25, np.nan])
+        converted = timescales.time_offsets_to_utc_datetime64(mjds, "TT", unit="d")
+        for mjd, result in zip(mjds[:2], converted[:2]):
+            expected = timescales.time_offset_to_utc(mjd, "TT", unit="d")
+            self.assertEqual(
+                result.astype(datetime.datetime), expected.replace(tzinfo=None)
+            )
+        self.assertTrue(np.isnat(converted[2]))
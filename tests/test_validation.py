@@ -0,0 +1,108 @@
+from unittest import TestCase
+
+import voeventparse as vp
+from voeventparse import validation
+from voeventparse.fixtures import datapaths
+
+
+def _breakages(swift_raw):
+    """Deliberately broken variants of the Swift packet, by name."""
+    citations = (
+        b"<Citations><EventIVORN cite='followup'>ivo://foo/bar#1</EventIVORN>"
+        b"</Citations>\n</voe:VOEvent>"
+    )
+    return {
+        "bad_role": swift_raw.replace(b'role="observation"', b'role="DeadParrot"'),
+        "missing_ivorn": swift_raw.replace(b"ivorn=", b"ivorm="),
+        "wrong_version": swift_raw.replace(b'version="2.0"', b'version="2.1"'),
+        "extra_root_child": swift_raw.replace(
+            b"</voe:VOEvent>", b"<Extra/></voe:VOEvent>"
+        ),
+        "duplicate_who": swift_raw.replace(b"</voe:VOEvent>", b"<Who/></voe:VOEvent>"),
+        "bad_who_child": swift_raw.replace(b"<Who>", b"<Who><BadChild/>"),
+        "bad_what_child": swift_raw.replace(b"<What>", b"<What><BadChild/>"),
+        "bad_datatype": swift_raw.replace(b'dataType="string"', b'dataType="long"', 1),
+        "empty_citations": swift_raw.replace(
+            b"</voe:VOEvent>", b"<Citations/></voe:VOEvent>"
+        ),
+        "bad_cite": swift_raw.replace(
+            b"</voe:VOEvent>", citations.replace(b"followup", b"parrot")
+        ),
+    }
+
+
+class TestStructuralValidation(TestCase):
+    def setUp(self):
+        self.valid = {}
+        for path in (
+            datapaths.swift_bat_grb_pos_v2,
+            datapaths.moa_lensing_event_path,
+            datapaths.gaia_alert_16aac_direct,
+            datapaths.asassn_scraped_example,
+        ):
+            with open(path, "rb") as f:
+                self.valid[path] = f.read()
+        self.broken = _breakages(self.valid[datapaths.swift_bat_grb_pos_v2])
+        with open(datapaths.no_namespace_test_packet, "rb") as f:
+            self.broken["no_namespace"] = f.read()
+
+    def test_tiers_agree(self):
+        for path, raw in self.valid.items():
+            v = vp.loads(raw)
+            self.assertEqual(validation.structural_errors(v), [], path)
+            self.assertTrue(vp.valid_as_v2_0(v), path)
+        # Whitespace around the version is collapsed, as for an xs:token:
+        raw = self.valid[datapaths.swift_bat_grb_pos_v2]
+        v = vp.loads(raw.replace(b'"2.0"', b'" 2.0 "', 1), check_version=False)
+        self.assertEqual(validation.structural_errors(v), [])
+        self.assertTrue(vp.valid_as_v2_0(v))
+        # An empty ivorn is a valid xs:anyURI:
+        v = vp.loads(raw)
+        v.attrib["ivorn"] = ""
+        self.assertEqual(validation.structural_errors(v), [])
+        self.assertTrue(vp.valid_as_v2_0(v))
+        for name, raw in self.broken.items():
+            v = vp.loads(raw, check_version=False)
+            self.assertNotEqual(validation.structural_errors(v), [], name)
+            self.assertFalse(vp.valid_as_v2_0(v), name)
+
+    def test_authored_packet(self):
+        v = vp.voevent(stream="voevent.foo.bar/TEST", stream_id="100", role="test")
+        v.What.append(vp.param(name="The Answer", value=42))
+        self.assertTrue(validation.structurally_valid(v))
+        self.assertTrue(vp.valid_as_v2_0(v))
+
+    def test_strict(self):
+        # Gaia16aac contains a Param with no name, which the schema permits:
+        v = vp.loads(self.valid[datapaths.gaia_alert_16aac_direct])
+        self.assertTrue(validation.structurally_valid(v))
+        self.assertFalse(validation.structurally_valid(v, strict=True))
+
+
+class TestTieredValidator(TestCase):
+    def setUp(self):
+        with open(datapaths.swift_bat_grb_pos_v2, "rb") as f:
+            self.raw = f.read()
+
+    def test_structural_rejection(self):
+        validator = validation.TieredValidator(sample_rate=1.0)
+        broken = vp.loads(_breakages(self.raw)["bad_role"])
+        self.assertFalse(validator.validate(broken))
+        self.assertEqual(validator.structural_failures, 1)
+        self.assertEqual(validator.schema_checked, 0)
+
+    def test_sampling(self):
+        validator = validation.TieredValidator(sample_rate=0.0)
+        self.assertTrue(validator.validate(vp.loads(self.raw)))
+        self.assertEqual(validator.schema_checked, 0)
+
+        validator = validation.TieredValidator(sample_rate=0.0, suspect=lambda v: True)
+        self.assertTrue(validator.validate(vp.loads(self.raw)))
+        self.assertEqual(validator.schema_checked, 1)
+
+    def test_schema_tier(self):
+        # A date that breaks the schema but not the structural rules:
+        raw = self.raw.replace(b"<Date>", b"<Date>not-a-date")
+        validator = validation.TieredValidator(sample_rate=1.0)
+        self.assertFalse(validator.validate(vp.loads(raw)))
+        self.assertEqual(validator.schema_failures, 1)
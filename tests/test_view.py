@@ -0,0 +1,89 @@
+import pickle
+from unittest import TestCase
+
+import numpy as np
+
+import voeventparse as vp
+from voeventparse.fixtures import datapaths
+from voeventparse.view import ElementView
+
+
+class TestEtreeMode(TestCase):
+    def setUp(self):
+        self.raw = {}
+        for path in (
+            datapaths.swift_bat_grb_pos_v2,
+            datapaths.moa_lensing_event_path,
+            datapaths.gaia_alert_16aac_direct,
+            datapaths.asassn_scraped_example,
+        ):
+            with open(path, "rb") as f:
+                self.raw[path] = f.read()
+        self.v = vp.loads(self.raw[datapaths.swift_bat_grb_pos_v2], mode="etree")
+
+    def test_dotted_access(self):
+        v = self.v
+        self.assertIsInstance(v, ElementView)
+        self.assertEqual(v.attrib["role"], "observation")
+        self.assertEqual(v.What.Param[0].attrib["name"], "Packet_Type")
+        self.assertEqual(v.What.Param[-1].attrib["name"], "Coords_String")
+        self.assertEqual(len(v.What.Param), 24)
+        self.assertEqual(len(list(v.What.Param)), 24)
+        self.assertEqual(len(v.What.Param[22:]), 2)
+        pos = v.WhereWhen.ObsDataLocation.ObservationLocation.AstroCoords.Position2D
+        self.assertEqual(float(pos.Value2.C1), 74.7412)
+        self.assertTrue(pos.Name1 == "RA")
+        self.assertEqual(hash(pos.Name1), hash("RA"))
+        self.assertIn(pos.Name1, {"RA"})
+        self.assertEqual(str(v.Who.Date), "2012-09-07T00:24:36")
+        self.assertEqual(v.What.find("Group").get("name"), "Merit_Values")
+        self.assertEqual(v.What.Group.getparent(), v.What)
+        self.assertFalse(hasattr(v.What, "Citations"))
+        with self.assertRaises(TypeError):
+            v.What.Param[0].attrib["value"] = "1"
+        with self.assertRaises((AttributeError, TypeError)):
+            v.What = None
+
+    def test_default_namespace(self):
+        raw = self.raw[datapaths.swift_bat_grb_pos_v2]
+        raw = raw.replace(b"voe:VOEvent", b"VOEvent").replace(b"xmlns:voe", b"xmlns")
+        v = vp.loads(raw, mode="etree")
+        self.assertEqual(v.What.Param[0].attrib["name"], "Packet_Type")
+        self.assertEqual(len(v.What.Param), 24)
+        self.assertEqual(str(v.Who.Date), "2012-09-07T00:24:36")
+
+    def test_pickle(self):
+        v = pickle.loads(pickle.dumps(self.v))
+        self.assertIsInstance(v, ElementView)
+        self.assertEqual(vp.prettystr(v), vp.prettystr(self.v))
+        self.assertEqual(vp.get_event_position(v), vp.get_event_position(self.v))
+        param = pickle.loads(pickle.dumps(self.v.What.Param[1]))
+        self.assertEqual(param.attrib["name"], "Pkt_Ser_Num")
+        self.assertIsNone(param.getparent())
+
+    def test_unsupported_version(self):
+        with open(datapaths.swift_xrt_pos_v1, "rb") as f:
+            raw = f.read()
+        with self.assertRaises(ValueError):
+            vp.loads(raw, mode="etree")
+        vp.loads(raw, mode="etree", check_version=False)
+        with self.assertRaises(ValueError):
+            vp.loads(raw, mode="foo")
+
+    def test_convenience_routines(self):
+        for raw in self.raw.values():
+            v = vp.loads(raw)
+            view = vp.loads(raw, mode="etree")
+            self.assertEqual(
+                vp.get_event_time_as_utc(view), vp.get_event_time_as_utc(v)
+            )
+            self.assertEqual(vp.get_event_position(view), vp.get_event_position(v))
+            self.assertEqual(vp.get_toplevel_params(view), vp.get_toplevel_params(v))
+            self.assertEqual(vp.get_grouped_params(view), vp.get_grouped_params(v))
+            for field, values in zip(
+                vp.Trajectory._fields, vp.get_event_trajectory(view)
+            ):
+                np.testing.assert_array_equal(
+                    values, getattr(vp.get_event_trajectory(v), field)
+                )
+            self.assertEqual(vp.prettystr(view.Who), vp.prettystr(v.Who))
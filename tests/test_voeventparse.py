@@ -1,5 +1,7 @@
 import datetime
+import pickle
 import tempfile
+import threading
 from unittest import TestCase
 
 from lxml import etree, objectify
@@ -100,6 +102,108 @@ class TestIO(TestCase):
             vfs.attrib["ivorn"], "ivo://nasa.gsfc.gcn/SWIFT#BAT_GRB_Pos_532871-729"
         )
 
+    def test_no_sentinel_element(self):
+        with open(datapaths.swift_bat_grb_pos_v2, "rb") as f:
+            v = vp.load(f)
+        # Only the packet's own sections appear as children of the root:
+        self.assertEqual(
+            [child.tag for child in v.iterchildren()],
+            ["Who", "What", "WhereWhen", "How", "Why", "Description"],
+        )
+        # The namespace declaration is retained, for use on output:
+        self.assertEqual(v.nsmap["voe"], "http://www.ivoa.net/xml/VOEvent/v2.0")
+
+    def test_dumps_leaves_tree_untouched(self):
+        def state(v):
+            return v.tag, v.nsmap, etree.tostring(v), objectify.dump(v)
+
+        for path in (
+            datapaths.swift_bat_grb_pos_v2,
+            # Declares namespaces below the root, so is output from a copy:
+            datapaths.swift_xrt_pos_v1,
+        ):
+            with open(path, "rb") as f:
+                v = vp.load(f, check_version=False)
+            before = state(v)
+            out = vp.dumps(v)
+            self.assertEqual(state(v), before)
+            self.assertEqual(v.tag, "VOEvent")
+            self.assertEqual(vp.loads(out, check_version=False).nsmap, v.nsmap)
+        # Including when the tree carries objectify annotations:
+        v.Who.Description = "Annotated"
+        annotated = state(v)
+        self.assertNotIn(b"pytype", vp.dumps(v))
+        self.assertEqual(state(v), annotated)
+
+    def test_dumps_threads(self):
+        # A tree may be shared between threads, e.g. by a PacketCache:
+        with open(datapaths.swift_bat_grb_pos_v2, "rb") as f:
+            v = vp.load(f)
+        expected = vp.dumps(v)
+        outputs = []
+
+        def worker():
+            outputs.extend(vp.dumps(v) for _ in range(300))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(outputs), 1200)
+        self.assertEqual(set(outputs), {expected})
+
+    def test_transport_root(self):
+        transport = (
+            b'<trn:Transport xmlns:trn="http://telescope-networks.org/schema/'
+            b'Transport/v1.1" version="1.0" role="iamalive">'
+            b"<Origin>ivo://foo</Origin></trn:Transport>"
+        )
+        v = vp.loads(transport, check_version=False)
+        self.assertEqual(v.tag, "Transport")
+        self.assertEqual(v.Origin, "ivo://foo")
+        self.assertEqual(vp.dumps(v, xml_declaration=False), transport)
+        # Roots not listed keep their namespace:
+        other = b'<x:Foo xmlns:x="urn:x"><Bar/></x:Foo>'
+        v = vp.loads(other, check_version=False)
+        self.assertEqual(v.tag, "{urn:x}Foo")
+        self.assertEqual(vp.dumps(v, xml_declaration=False), other)
+        # Unused namespace declarations are removed from the output, but not
+        # from the tree:
+        unused = b'<Foo xmlns:y="urn:y"><Bar/></Foo>'
+        v = vp.loads(unused, check_version=False)
+        self.assertEqual(vp.dumps(v, xml_declaration=False), b"<Foo><Bar/></Foo>")
+        self.assertEqual(v.nsmap, {"y": "urn:y"})
+
+    def test_pickle(self):
+        # Objectify trees pickle as XML, re-parsed on unpickling - including
+        # the root namespace declaration, for restoring the root tag on output.
+        for path in (
+            datapaths.swift_bat_grb_pos_v2,
+            datapaths.no_namespace_test_packet,
+        ):
+            with open(path, "rb") as f:
+                v = vp.load(f)
+            restored = pickle.loads(pickle.dumps(v))
+            self.assertEqual(restored.tag, "VOEvent")
+            self.assertEqual(restored.nsmap, v.nsmap)
+            self.assertEqual(vp.dumps(restored), vp.dumps(v))
+        # Annotated trees, and subtrees:
+        v.Who.Description = "Annotated"
+        self.assertEqual(vp.dumps(pickle.loads(pickle.dumps(v))), vp.dumps(v))
+        what = pickle.loads(pickle.dumps(v.What))
+        self.assertEqual(len(what.Param), len(v.What.Param))
+
+    def test_legacy_sentinel_element(self):
+        # Trees built by earlier versions stored the root prefix in an
+        # 'original_prefix' child element - these are still output correctly.
+        with open(datapaths.swift_bat_grb_pos_v2, "rb") as f:
+            v = vp.load(f)
+        sentinel = etree.SubElement(v, "original_prefix")
+        sentinel._setText("voe")
+        self.assertTrue(vp.valid_as_v2_0(v))
+        self.assertNotIn(b"original_prefix", vp.dumps(v))
+
     def test_dumps(self):
         """
         Note, the processed output does not match the raw input -